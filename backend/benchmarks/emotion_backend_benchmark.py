@@ -0,0 +1,156 @@
+"""
+Compare emotion classifier backends against the PyTorch model on a fixed image set.
+
+Every image is cropped to its largest detected face (or used whole when none
+is found), then classified by each backend. Candidates are scored on top-1
+agreement and probability drift against the torch reference, and timed at
+batch size 1 and at --batch-size. Exits 1 when a candidate agrees with the
+reference on fewer than --min-agreement of the faces.
+
+Usage (from backend/):
+    python -m benchmarks.emotion_backend_benchmark --images path/to/faces
+    python -m benchmarks.emotion_backend_benchmark --images faces --backends torch onnx-int8
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def load_faces(directory: str) -> List:
+    """Largest face crop of every image in directory, in file name order, as PIL images"""
+    import cv2
+    from PIL import Image
+
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    faces = []
+    for name in sorted(os.listdir(directory)):
+        if not name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        img = cv2.imread(os.path.join(directory, name), cv2.IMREAD_COLOR)
+        if img is None:
+            continue
+        found = cascade.detectMultiScale(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), 1.3, 5)
+        if len(found):
+            x, y, w, h = max(found, key=lambda f: f[2] * f[3])
+            img = img[y:y+h, x:x+w]
+        faces.append(Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB)))
+    return faces
+
+
+def probabilities(logits: np.ndarray) -> np.ndarray:
+    logits = logits.astype(np.float64)
+    exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def time_backend(backend, pixel_values: np.ndarray, batch_size: int, repeat: int) -> Dict:
+    """Per-face latency at batch size 1 and batch_size, fastest of repeat passes"""
+    def per_face_ms(size: int) -> float:
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for start in range(0, len(pixel_values), size):
+                backend.logits(pixel_values[start:start + size])
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return round(best / len(pixel_values) * 1000, 3)
+
+    return {'single_ms_per_face': per_face_ms(1), 'batched_ms_per_face': per_face_ms(batch_size)}
+
+
+def evaluate(names: List[str], faces: List, args) -> List[Dict]:
+    from src.services.emotion_backends import create_backend
+
+    results = []
+    reference = None
+    for name in names:
+        backend = create_backend(name, args.model, args.model_dir, threads=args.threads)
+        started = time.perf_counter()
+        backend.load()
+        load_seconds = time.perf_counter() - started
+
+        pixel_values = np.stack([
+            backend.image_processor(images=face, return_tensors='np')['pixel_values'][0] for face in faces
+        ]).astype(np.float32)
+        backend.logits(pixel_values[:1])  # first call pays for allocation and graph setup
+        probs = probabilities(backend.logits(pixel_values))
+        if reference is None:
+            reference = probs
+
+        drift = np.abs(probs - reference)
+        result = {
+            'backend': name,
+            'load_seconds': round(load_seconds, 3),
+            'top1_agreement': round(float(np.mean(probs.argmax(-1) == reference.argmax(-1))), 4),
+            'max_abs_prob_diff': round(float(drift.max()), 6),
+            'mean_abs_prob_diff': round(float(drift.mean()), 6),
+            **time_backend(backend, pixel_values, args.batch_size, args.repeat)
+        }
+        results.append(result)
+        print(f"{name:<10} agreement {result['top1_agreement']:.2%}  max drift {result['max_abs_prob_diff']:.4f}  "
+              f"{result['single_ms_per_face']:8.2f} ms/face  {result['batched_ms_per_face']:8.2f} ms/face "
+              f"(batch {args.batch_size})")
+    return results
+
+
+def main(argv=None) -> int:
+    from src.config import Config
+    from src.services.emotion_backends import BACKENDS
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--images', required=True, help='directory of face images')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS,
+                        help='the first one is the reference the others are scored against')
+    parser.add_argument('--model', default=Config.EMOTION_MODEL)
+    parser.add_argument('--model-dir', default=Config.EMOTION_MODEL_DIR)
+    parser.add_argument('--threads', type=int, default=Config.EMOTION_TORCH_THREADS)
+    parser.add_argument('--batch-size', type=int, default=Config.EMOTION_BATCH_SIZE)
+    parser.add_argument('--repeat', type=int, default=3, help='timed passes per backend; the fastest is kept')
+    parser.add_argument('--min-agreement', type=float, default=0.95,
+                        help='lowest acceptable top-1 agreement with the reference')
+    parser.add_argument('--output', default='emotion_backend_benchmark.json')
+    args = parser.parse_args(argv)
+
+    faces = load_faces(args.images)
+    if not faces:
+        print(f"No images found in {args.images}")
+        return 1
+
+    started = datetime.utcnow()
+    results = evaluate(args.backends, faces, args)
+    report = {
+        'meta': {
+            'started_at': started.isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'model': args.model,
+            'faces': len(faces),
+            'reference': args.backends[0],
+            'threads': args.threads,
+            'repeat': args.repeat
+        },
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    failing = [result for result in results[1:] if result['top1_agreement'] < args.min_agreement]
+    for result in failing:
+        print(f"PARITY {result['backend']}: top-1 agreement {result['top1_agreement']:.2%} "
+              f"below {args.min_agreement:.0%}")
+    return 1 if failing else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Measure face detection latency and accuracy across detectors and proxy sizes.
+
+The reference is the original path: full-resolution decode and a Haar cascade
+over the whole frame. Every other configuration runs FaceDetector.decode and
+detect on the same images and is scored on how often its largest face
+overlaps the reference's (IoU >= --iou) and on decode + detect time.
+
+Usage (from backend/):
+    python -m benchmarks.face_detection_benchmark --images path/to/photos
+    python -m benchmarks.face_detection_benchmark --images photos --detectors haar yunet --sizes 320 640
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+SIZES = [320, 480, 640, 960]
+
+
+def iou(a: Tuple, b: Tuple) -> float:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    overlap_w = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    overlap_h = max(0, min(ay + ah, by + bh) - max(ay, by))
+    overlap = overlap_w * overlap_h
+    union = aw * ah + bw * bh - overlap
+    return overlap / union if union else 0.0
+
+
+def reference_face(image_bytes: bytes, cascade) -> Tuple[Optional[Tuple], float]:
+    """Largest face at full resolution the way detection used to run, and its time"""
+    started = time.perf_counter()
+    img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    faces = cascade.detectMultiScale(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), 1.3, 5)
+    elapsed = time.perf_counter() - started
+    return (tuple(max(faces, key=lambda f: f[2] * f[3])) if len(faces) else None), elapsed
+
+
+def candidate_face(image_bytes: bytes, detector, full_size: Tuple[int, int]) -> Tuple[Optional[Tuple], float]:
+    """Largest face from FaceDetector, mapped to full-resolution coordinates, and its time"""
+    started = time.perf_counter()
+    img, _ = detector.decode(image_bytes)
+    faces = detector.detect(img)
+    elapsed = time.perf_counter() - started
+    if not faces:
+        return None, elapsed
+    x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+    sx, sy = full_size[0] / img.shape[1], full_size[1] / img.shape[0]
+    return (x * sx, y * sy, w * sx, h * sy), elapsed
+
+
+def summarize(name: str, times: List[float], matches: List[bool], found: int, total: int) -> Dict:
+    times = sorted(times)
+    return {
+        'config': name,
+        'p50_ms': round(times[len(times) // 2] * 1000, 2),
+        'mean_ms': round(sum(times) / len(times) * 1000, 2),
+        'faces_found': found,
+        'images': total,
+        'agreement': round(sum(matches) / len(matches), 4) if matches else None
+    }
+
+
+def run(args, images: List[bytes]) -> List[Dict]:
+    from src.services.face_detection import FaceDetector
+
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    references, reference_times = [], []
+    for image_bytes in images:
+        best = None
+        for _ in range(args.repeat):
+            face, elapsed = reference_face(image_bytes, cascade)
+            best = elapsed if best is None else min(best, elapsed)
+        references.append(face)
+        reference_times.append(best)
+    results = [summarize('haar/full', reference_times, [],
+                         sum(face is not None for face in references), len(images))]
+
+    sizes = [cv2.imdecode(np.frombuffer(b, np.uint8), cv2.IMREAD_COLOR).shape[1::-1] for b in images]
+    for detector_name in args.detectors:
+        for size in args.sizes:
+            detector = FaceDetector(detector_name, detect_size=size, yunet_model=args.yunet_model)
+            times, matches, found = [], [], 0
+            for image_bytes, full_size, reference in zip(images, sizes, references):
+                best = None
+                for _ in range(args.repeat):
+                    face, elapsed = candidate_face(image_bytes, detector, full_size)
+                    best = elapsed if best is None else min(best, elapsed)
+                times.append(best)
+                found += face is not None
+                if reference is not None:
+                    matches.append(face is not None and iou(face, reference) >= args.iou)
+            result = summarize(f"{detector_name}/{size}", times, matches, found, len(images))
+            results.append(result)
+    return results
+
+
+def main(argv=None) -> int:
+    from src.services.face_detection import DETECTORS
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--images', required=True, help='directory of sample photos')
+    parser.add_argument('--detectors', nargs='+', default=['haar'], choices=DETECTORS)
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES, help='detection proxy long sides')
+    parser.add_argument('--yunet-model', default='models/face_detection_yunet_2023mar.onnx')
+    parser.add_argument('--iou', type=float, default=0.5, help='overlap that counts as the same face')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per image; the fastest is kept')
+    parser.add_argument('--output', default='face_detection_benchmark.json')
+    args = parser.parse_args(argv)
+
+    images = []
+    for name in sorted(os.listdir(args.images)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            with open(os.path.join(args.images, name), 'rb') as f:
+                images.append(f.read())
+    if not images:
+        print(f"No images found in {args.images}")
+        return 1
+
+    started = datetime.utcnow()
+    results = run(args, images)
+    for result in results:
+        agreement = '-' if result['agreement'] is None else f"{result['agreement']:.0%}"
+        print(f"{result['config']:<12} p50 {result['p50_ms']:8.2f} ms  mean {result['mean_ms']:8.2f} ms  "
+              f"faces {result['faces_found']}/{result['images']}  agreement {agreement}")
+
+    report = {
+        'meta': {
+            'started_at': started.isoformat(),
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'platform': platform.platform(),
+            'images': len(images),
+            'repeat': args.repeat,
+            'iou': args.iou
+        },
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
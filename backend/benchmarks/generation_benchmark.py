@@ -0,0 +1,194 @@
+"""
+Benchmark MusicGenerator.generate_music across a parameter sweep.
+
+Every point runs in a fresh worker process so its peak RSS and scratch buffer
+allocation counts (over all repeats) are its own. Results
+go to a JSON file; pass --baseline with an earlier results file to flag points
+that got slower by more than --threshold.
+
+Usage (from backend/):
+    python -m benchmarks.generation_benchmark --output results.json
+    python -m benchmarks.generation_benchmark --baseline results.json
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+STYLES = ['ambient', 'rhythmic', 'melodic']
+DURATIONS = [15, 30, 60, 120]
+TEMPOS = [60, 120, 180]
+MOODS = [(0.2, 0.2), (0.2, 0.8), (0.5, 0.5), (0.8, 0.2), (0.8, 0.8)]
+STAGES = ['composition', 'midi_io', 'synthesis', 'encoding']
+
+
+def point_key(point: Dict) -> str:
+    return '{style}/{duration}s/{tempo}bpm/v{valence}/a{arousal}'.format(**point)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MiB, where the platform reports it"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_point(point: Dict, output_dir: str, write_midi: bool, repeat: int) -> Dict:
+    """Time one sweep point; runs inside a single-use worker process"""
+    from src.services.music_generator import MusicGenerator
+    from src.utils.timing import StageTimer
+
+    generator = MusicGenerator(output_dir, write_midi=write_midi)
+    runs = []
+    for _ in range(repeat):
+        timer = StageTimer()
+        started = time.perf_counter()
+        midi_path, wav_path = generator.generate_music(
+            valence=point['valence'], arousal=point['arousal'], duration=point['duration'],
+            tempo=point['tempo'], style=point['style'], seed=0, timer=timer
+        )
+        wall = time.perf_counter() - started
+
+        audio_seconds = (os.path.getsize(wav_path) - 44) / 2 / generator.synthesizer.sample_rate
+        runs.append((wall, audio_seconds, timer.as_dict()))
+        for path in (midi_path, wav_path):
+            if path:
+                os.remove(path)
+
+    # Report the fastest run; slower ones measure scheduler noise, not the code
+    wall, audio_seconds, stages = min(runs, key=lambda run: run[0])
+    rss = peak_rss_mb()
+    return {
+        **point,
+        'wall_seconds': round(wall, 4),
+        'audio_seconds': round(audio_seconds, 3),
+        'realtime_factor': round(wall / audio_seconds, 5) if audio_seconds else None,
+        'peak_rss_mb': round(rss, 1) if rss is not None else None,
+        'allocations': generator.synthesizer.allocation_stats(),
+        'stages': {name: round(stages.get(name, 0.0), 4) for name in STAGES},
+        'layers': {name.split(':', 1)[1]: round(seconds, 4)
+                   for name, seconds in stages.items() if name.startswith('layer:')}
+    }
+
+
+def sweep(args) -> List[Dict]:
+    points = [
+        {'style': style, 'duration': duration, 'tempo': tempo, 'valence': valence, 'arousal': arousal}
+        for style, duration, tempo, (valence, arousal)
+        in itertools.product(args.styles, args.durations, args.tempos, args.moods)
+    ]
+
+    output_dir = tempfile.mkdtemp(prefix='generation-benchmark-')
+    context = multiprocessing.get_context('spawn')
+    results = []
+    try:
+        with context.Pool(processes=1, maxtasksperchild=1) as pool:
+            for number, point in enumerate(points, start=1):
+                result = pool.apply(run_point, (point, output_dir, args.midi, args.repeat))
+                results.append(result)
+                print(f"[{number}/{len(points)}] {point_key(point):<40} "
+                      f"{result['wall_seconds']:8.3f}s  RTF {result['realtime_factor']:.4f}  "
+                      f"RSS {result['peak_rss_mb']} MiB  "
+                      f"buffers {result['allocations']['buffer_allocations']}/"
+                      f"{result['allocations']['blocks_rendered']} blocks")
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return results
+
+
+def compare(results: List[Dict], baseline: Dict, threshold: float) -> List[Dict]:
+    """Points whose wall time grew by more than threshold over the baseline"""
+    previous = {point_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        before = previous.get(point_key(result))
+        if before is None or not before['wall_seconds']:
+            continue
+        change = result['wall_seconds'] / before['wall_seconds'] - 1
+        if change > threshold:
+            regressions.append({
+                'point': point_key(result),
+                'baseline_seconds': before['wall_seconds'],
+                'wall_seconds': result['wall_seconds'],
+                'change': round(change, 4)
+            })
+    return regressions
+
+
+def parse_moods(value: str) -> List[tuple]:
+    moods = []
+    for pair in value.split(','):
+        valence, arousal = pair.split(':')
+        moods.append((float(valence), float(arousal)))
+    return moods
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--styles', nargs='+', default=STYLES, choices=STYLES)
+    parser.add_argument('--durations', nargs='+', type=int, default=DURATIONS)
+    parser.add_argument('--tempos', nargs='+', type=int, default=TEMPOS)
+    parser.add_argument('--moods', type=parse_moods, default=MOODS,
+                        help='valence:arousal pairs, e.g. 0.2:0.2,0.8:0.8')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per point; the fastest is kept')
+    parser.add_argument('--midi', action='store_true', help='also write MIDI files (times midi_io)')
+    parser.add_argument('--output', default='generation_benchmark.json')
+    parser.add_argument('--baseline', help='results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='allowed wall-time growth over the baseline (0.15 = 15%%)')
+    args = parser.parse_args(argv)
+
+    # Read before the sweep: --output may name the same file
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    import numpy as np
+    from src.services.music_generator import RENDER_VERSION
+
+    started = datetime.utcnow()
+    results = sweep(args)
+    report = {
+        'meta': {
+            'started_at': started.isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'render_version': RENDER_VERSION,
+            'repeat': args.repeat,
+            'write_midi': args.midi
+        },
+        'results': results
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression['point']}: {regression['baseline_seconds']:.3f}s -> "
+                  f"{regression['wall_seconds']:.3f}s (+{regression['change']:.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions over {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
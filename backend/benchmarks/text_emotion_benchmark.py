@@ -0,0 +1,128 @@
+"""
+Show that text emotion scoring stays linear in text length whatever the lexicon size.
+
+The lexicon is padded with synthetic terms up to each --lexicon-sizes value and
+texts of each --lengths are scored by TextEmotionAnalyzer. The per-character
+cost should be flat across both axes. The substring scan the analyzer
+replaced is timed alongside for contrast; its cost grows with the lexicon.
+
+Usage (from backend/):
+    python -m benchmarks.text_emotion_benchmark
+    python -m benchmarks.text_emotion_benchmark --lexicon-sizes 10000 100000 --lengths 1000 100000
+"""
+import argparse
+import json
+import random
+import string
+import sys
+import time
+from typing import Dict, List
+
+SENTENCES = [
+    "I'm so happy today, the sun is out and I finally finished the project!",
+    "Not feeling great, honestly a bit down and lonely since they left.",
+    "This traffic is driving me crazy, I'm fed up with being late every day.",
+    "Spent the evening reading with a cup of tea, feeling calm and at peace.",
+    "Exams next week and I can't sleep, my mind keeps racing about what if I fail.",
+    "We went to the market, bought some bread and walked home along the river.",
+    "I don't hate it, but it's not very exciting either.",
+]
+
+
+def synthetic_terms(count: int, seed: int = 0) -> List[str]:
+    """Made-up words that never occur in real text, so padding changes size but not matches"""
+    rng = random.Random(seed)
+    terms = set()
+    while len(terms) < count:
+        terms.add('zq' + ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10))))
+    return sorted(terms)
+
+
+def make_text(length: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts, size = [], 0
+    while size < length:
+        sentence = rng.choice(SENTENCES)
+        parts.append(sentence)
+        size += len(sentence) + 1
+    return ' '.join(parts)[:length]
+
+
+def substring_scan(text: str, keywords: Dict[str, List[str]]) -> str:
+    """The per-keyword substring scan analyze_text_emotion used before"""
+    text_lower = text.lower()
+    best, best_matches = 'neutral', 0
+    for emotion, words in keywords.items():
+        matches = sum(1 for word in words if word in text_lower)
+        if matches > best_matches:
+            best, best_matches = emotion, matches
+    return best
+
+
+def best_time(fn, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(args) -> List[Dict]:
+    from src.services.text_emotion import TextEmotionAnalyzer, load_lexicon
+
+    base = load_lexicon()
+    results = []
+    for lexicon_size in args.lexicon_sizes:
+        lexicon = dict(base)
+        for term in synthetic_terms(max(0, lexicon_size - len(base))):
+            lexicon[term] = ('happy', 1.0)
+        started = time.perf_counter()
+        analyzer = TextEmotionAnalyzer(lexicon)
+        compile_ms = (time.perf_counter() - started) * 1000
+
+        keywords = {}
+        for term, (emotion, _) in lexicon.items():
+            keywords.setdefault(emotion, []).append(term)
+
+        for length in args.lengths:
+            text = make_text(length)
+            engine = best_time(lambda: analyzer.analyze(text), args.repeat)
+            result = {
+                'lexicon_terms': len(lexicon),
+                'text_chars': len(text),
+                'compile_ms': round(compile_ms, 2),
+                'engine_ms': round(engine * 1000, 3),
+                'engine_us_per_kchar': round(engine * 1e6 / len(text) * 1000, 2)
+            }
+            if not args.skip_legacy:
+                legacy = best_time(lambda: substring_scan(text, keywords), args.repeat)
+                result['legacy_ms'] = round(legacy * 1000, 3)
+                result['legacy_us_per_kchar'] = round(legacy * 1e6 / len(text) * 1000, 2)
+            results.append(result)
+            legacy_column = f"  legacy {result['legacy_us_per_kchar']:10.1f} us/kchar" if 'legacy_ms' in result else ''
+            print(f"{result['lexicon_terms']:>7} terms  {result['text_chars']:>7} chars  "
+                  f"engine {result['engine_us_per_kchar']:8.1f} us/kchar{legacy_column}")
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lexicon-sizes', nargs='+', type=int, default=[10000, 30000, 100000])
+    parser.add_argument('--lengths', nargs='+', type=int, default=[10000, 30000, 100000])
+    parser.add_argument('--repeat', type=int, default=5, help='runs per point; the fastest is kept')
+    parser.add_argument('--skip-legacy', action='store_true', help="don't time the old substring scan")
+    parser.add_argument('--output', help='also write results to this JSON file')
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'results': results}, f, indent=2)
+        print(f"Wrote {len(results)} results to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,43 @@
+"""
+Gunicorn settings for production: gunicorn -c gunicorn.conf.py run:app
+
+The app is imported once in the master, which loads the emotion model before
+forking, so every worker shares the same weights copy-on-write instead of
+loading its own copy. With EMOTION_INFERENCE_MODE=worker the model lives in
+a separate inference process instead, started and stopped with the master.
+"""
+import gc
+import os
+import subprocess
+import sys
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+
+preload_app = True
+# Read by Config when the master imports the app below
+os.environ.setdefault('EMOTION_MODEL_LOADING', 'preload')
+
+
+def when_ready(server):
+    # Move everything the master allocated (model included) out of the
+    # collector's reach, so garbage collection in the workers doesn't touch
+    # those objects and turn shared pages into private copies
+    gc.freeze()
+
+
+def on_starting(server):
+    if os.getenv('EMOTION_INFERENCE_MODE') == 'worker':
+        server.inference_worker = subprocess.Popen(
+            [sys.executable, '-m', 'src.services.inference_worker'],
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+
+
+def on_exit(server):
+    worker = getattr(server, 'inference_worker', None)
+    if worker is not None:
+        worker.terminate()
+        worker.wait(timeout=30)
@@ -3,9 +3,19 @@ from flask_cors import CORS
 from src.config import Config
 from src.utils.db import init_db
 from src.services.emotion_service import EmotionService
+from src.services.face_detection import FaceDetector
+from src.services.emotion_cache import EmotionResultCache
+from src.services.emotion_stream import EmotionStreamService
+from src.services.inference_worker import InferenceClient
 from src.services.audius_service import AudiusService
+from src.services.audius_cache import AudiusResponseCache
 from src.services.recommender import BasicRecommender, EnhancedRecommender
-from src.services.music_generator import MusicGenerator
+from src.services.music_generator import MusicGenerator, RENDER_VERSION
+from src.services.generation_cache import GenerationCache
+from src.services.file_store import GeneratedFileStore
+from src.services.job_events import JobEventBus
+from src.utils.cache import LRUCache
+from src.services.generation_executor import GenerationExecutor
 from src.routes.auth import auth_bp
 from src.routes.emotion import emotion_bp, init_emotion_service
 from src.routes.music import music_bp, init_music_services
@@ -17,27 +27,133 @@ def create_app(config_class=Config):
     app.config.from_object(config_class)
 
     # Enable CORS
-    CORS(app, origins=config_class.CORS_ORIGINS, supports_credentials=True)
+    CORS(
+        app,
+        origins=config_class.CORS_ORIGINS,
+        supports_credentials=True,
+        # Let the browser see what it needs for seeking and revalidating audio
+        expose_headers=['Accept-Ranges', 'Content-Range', 'Content-Length', 'ETag', 'Last-Modified', 'X-Job-Id',
+                       'X-Generation-Seed', 'X-Preview-Cache']
+    )
 
     # Initialize MongoDB
     init_db(app.config['MONGODB_URI'])
 
     # Initialize services
-    emotion_service = EmotionService(app.config['EMOTION_MODEL'])
-    audius_service = AudiusService(app.config['AUDIUS_HOST'], app.config['AUDIUS_API_KEY'])
+    # Re-submitted selfies are answered from here without running the model
+    result_cache = None
+    if app.config['EMOTION_RESULT_CACHE_ENTRIES']:
+        distance = app.config['EMOTION_PERCEPTUAL_DISTANCE']
+        result_cache = EmotionResultCache(
+            max_entries=app.config['EMOTION_RESULT_CACHE_ENTRIES'],
+            max_bytes=app.config['EMOTION_RESULT_CACHE_MB'] * 1024 * 1024,
+            perceptual_distance=distance if distance >= 0 else None
+        )
+    # In worker mode a separate process owns the model (src/services/inference_worker.py)
+    inference_client = None
+    if app.config['EMOTION_INFERENCE_MODE'] == 'worker':
+        inference_client = InferenceClient(
+            app.config['EMOTION_INFERENCE_SOCKET'],
+            app.config['SECRET_KEY'].encode('utf-8'),
+            timeout=app.config['EMOTION_INFERENCE_TIMEOUT']
+        )
+    emotion_service = EmotionService(
+        app.config['EMOTION_MODEL'],
+        batch_size=app.config['EMOTION_BATCH_SIZE'],
+        batch_wait_ms=app.config['EMOTION_BATCH_WAIT_MS'],
+        torch_threads=app.config['EMOTION_TORCH_THREADS'],
+        ready_timeout=app.config['EMOTION_READY_TIMEOUT'],
+        retry_after=app.config['EMOTION_RETRY_AFTER'],
+        backend=app.config['EMOTION_BACKEND'],
+        model_dir=os.path.join(app.root_path, '..', app.config['EMOTION_MODEL_DIR']),
+        face_detector=FaceDetector(
+            app.config['EMOTION_FACE_DETECTOR'],
+            detect_size=app.config['EMOTION_DETECT_SIZE'],
+            yunet_model=os.path.join(app.root_path, '..', app.config['EMOTION_YUNET_MODEL'])
+        ),
+        result_cache=result_cache,
+        decode_threads=app.config['EMOTION_DECODE_THREADS'],
+        inference_client=inference_client
+    )
+    # The model takes tens of seconds to load; don't make the app wait for it
+    # unless a pre-forking master is loading it once for all its workers.
+    # A separate inference worker may not be up yet, so that is never waited for here
+    loading = app.config['EMOTION_MODEL_LOADING']
+    if loading == 'preload' and inference_client is None:
+        emotion_service.load()
+    elif loading in ('preload', 'background'):
+        emotion_service.start_warmup()
+    emotion_streams = EmotionStreamService(
+        emotion_service,
+        classify_every=app.config['EMOTION_STREAM_CLASSIFY_EVERY'],
+        window=app.config['EMOTION_STREAM_WINDOW'],
+        track_threshold=app.config['EMOTION_STREAM_TRACK_THRESHOLD'],
+        idle_seconds=app.config['EMOTION_STREAM_IDLE_SECONDS'],
+        max_sessions=app.config['EMOTION_STREAM_MAX_SESSIONS']
+    )
+    # Recommendations repeat the same artist searches for every user
+    audius_cache = None
+    if app.config['AUDIUS_CACHE_ENTRIES']:
+        audius_cache = AudiusResponseCache(
+            ttls={
+                'search': app.config['AUDIUS_CACHE_TTL_SEARCH'],
+                'trending': app.config['AUDIUS_CACHE_TTL_TRENDING'],
+                'track': app.config['AUDIUS_CACHE_TTL_TRACK']
+            },
+            max_entries=app.config['AUDIUS_CACHE_ENTRIES'],
+            stale_seconds=app.config['AUDIUS_CACHE_STALE_SECONDS']
+        )
+    audius_service = AudiusService(app.config['AUDIUS_HOST'], app.config['AUDIUS_API_KEY'], cache=audius_cache)
     
     # Initialize both recommenders
     # BasicRecommender now uses EnhancedRecommender internally for backward compatibility
-    recommender = BasicRecommender(audius_service)
-    enhanced_recommender = EnhancedRecommender(audius_service)
+    enhanced_recommender = EnhancedRecommender(
+        audius_service,
+        latency_budget=app.config['RECOMMEND_LATENCY_BUDGET_MS'] / 1000,
+        fanout_threads=app.config['RECOMMEND_FANOUT_THREADS']
+    )
+    recommender = BasicRecommender(audius_service, enhanced_recommender)
     
-    music_generator = MusicGenerator(os.path.join(app.root_path, '..', app.config['GENERATION_OUTPUT_DIR']))
+    output_dir = os.path.join(app.root_path, '..', app.config['GENERATION_OUTPUT_DIR'])
+    file_store = GeneratedFileStore(
+        output_dir,
+        ttl_seconds=app.config['GENERATION_CLEANUP_HOURS'] * 3600,
+        max_bytes=app.config['GENERATION_DISK_BUDGET_MB'] * 1024 * 1024
+    )
+    file_store.adopt_legacy_files()
+    file_store.start_sweeper(app.config['GENERATION_SWEEP_INTERVAL'])
+    
+    music_generator = MusicGenerator(
+        output_dir,
+        write_midi=app.config['GENERATION_WRITE_MIDI'],
+        preview_sample_rate=app.config['GENERATION_PREVIEW_SAMPLE_RATE']
+    )
+    generation_cache = GenerationCache(
+        os.path.join(music_generator.output_dir, 'cache'),
+        max_entries=app.config['GENERATION_CACHE_MAX_ENTRIES'],
+        max_bytes=app.config['GENERATION_CACHE_MAX_MB'] * 1024 * 1024,
+        version=RENDER_VERSION
+    )
+    # Preview renders are small and short-lived; they stay in memory
+    preview_cache = LRUCache(
+        max_entries=app.config['GENERATION_PREVIEW_CACHE_ENTRIES'],
+        max_size=app.config['GENERATION_PREVIEW_CACHE_MB'] * 1024 * 1024,
+        sizeof=len
+    )
+    generation_executor = GenerationExecutor(
+        music_generator,
+        max_workers=app.config['GENERATION_WORKERS'] or None,
+        max_queue=app.config['GENERATION_QUEUE_SIZE'],
+        retry_after=app.config['GENERATION_RETRY_AFTER'],
+        mode=app.config['GENERATION_EXECUTOR']
+    )
 
     # Initialize routes/services
-    init_emotion_service(emotion_service)
+    init_emotion_service(emotion_service, emotion_streams)
     # Pass both recommenders to music routes
     init_music_services(audius_service, recommender, enhanced_recommender)
-    init_generator_service(music_generator)
+    init_generator_service(music_generator, generation_executor, generation_cache, file_store,
+                           preview_cache, JobEventBus())
 
     # Register blueprints
     app.register_blueprint(auth_bp)
@@ -60,16 +176,25 @@ def create_app(config_class=Config):
             ]
         }), 200
 
-    # Health check
+    # Health check (liveness): answers as soon as the app is up
     @app.route('/api/health', methods=['GET'])
     def health_check():
         return jsonify({
             'status': 'healthy', 
             'service': 'MuseAIka Backend', 
             'version': '2.0.0',
-            'recommender': 'Enhanced with Bollywood & Pop focus'
+            'recommender': 'Enhanced with Bollywood & Pop focus',
+            'emotion_model': emotion_service.state
         }), 200
 
+    # Readiness: 503 until the emotion model has loaded
+    @app.route('/api/health/ready', methods=['GET'])
+    def readiness_check():
+        model = emotion_service.status()
+        if not emotion_service.ready:
+            return jsonify({'status': 'not ready', 'emotion_model': model}), 503
+        return jsonify({'status': 'ready', 'emotion_model': model}), 200
+
     # Favicon route
     @app.route('/favicon.ico')
     def favicon():
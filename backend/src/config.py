@@ -9,7 +9,41 @@ class Config:
     JWT_EXPIRATION = timedelta(days=7)
     AUDIUS_API_KEY = os.getenv('AUDIUS_API_KEY', '')
     AUDIUS_HOST = 'https://discoveryprovider.audius.co'
+    AUDIUS_CACHE_ENTRIES = int(os.getenv('AUDIUS_CACHE_ENTRIES', 2048))  # 0 = no response cache
+    AUDIUS_CACHE_TTL_SEARCH = float(os.getenv('AUDIUS_CACHE_TTL_SEARCH', 900))  # seconds a search/artist response stays fresh
+    AUDIUS_CACHE_TTL_TRENDING = float(os.getenv('AUDIUS_CACHE_TTL_TRENDING', 300))
+    AUDIUS_CACHE_TTL_TRACK = float(os.getenv('AUDIUS_CACHE_TTL_TRACK', 3600))
+    AUDIUS_CACHE_STALE_SECONDS = float(os.getenv('AUDIUS_CACHE_STALE_SECONDS', 3600))  # served past the TTL while refreshing
+    RECOMMEND_LATENCY_BUDGET_MS = int(os.getenv('RECOMMEND_LATENCY_BUDGET_MS', 2500))  # Audius sources slower than this are left out
+    RECOMMEND_FANOUT_THREADS = int(os.getenv('RECOMMEND_FANOUT_THREADS', 16))  # concurrent Audius calls per process
     EMOTION_MODEL = 'trpakov/vit-face-expression'
+    EMOTION_BATCH_SIZE = int(os.getenv('EMOTION_BATCH_SIZE', 8))  # faces per forward pass
+    EMOTION_BATCH_WAIT_MS = float(os.getenv('EMOTION_BATCH_WAIT_MS', 5))  # longest a batch waits to fill
+    EMOTION_TORCH_THREADS = int(os.getenv('EMOTION_TORCH_THREADS', 0))  # inference threads, 0 = backend default
+    EMOTION_BACKEND = os.getenv('EMOTION_BACKEND', 'torch')  # 'torch', 'onnx' or 'onnx-int8'
+    EMOTION_MODEL_DIR = os.getenv('EMOTION_MODEL_DIR', 'models')  # where ONNX exports are kept
+    EMOTION_FACE_DETECTOR = os.getenv('EMOTION_FACE_DETECTOR', 'haar')  # 'haar' or 'yunet'
+    EMOTION_DETECT_SIZE = int(os.getenv('EMOTION_DETECT_SIZE', 640))  # px, long side detection runs at; 0 = full size
+    EMOTION_YUNET_MODEL = os.getenv('EMOTION_YUNET_MODEL', 'models/face_detection_yunet_2023mar.onnx')
+    EMOTION_RESULT_CACHE_ENTRIES = int(os.getenv('EMOTION_RESULT_CACHE_ENTRIES', 1024))  # 0 = no result cache
+    EMOTION_RESULT_CACHE_MB = int(os.getenv('EMOTION_RESULT_CACHE_MB', 8))
+    EMOTION_PERCEPTUAL_DISTANCE = int(os.getenv('EMOTION_PERCEPTUAL_DISTANCE', -1))  # max differing dHash bits, -1 = exact matches only
+    EMOTION_BATCH_MAX_IMAGES = int(os.getenv('EMOTION_BATCH_MAX_IMAGES', 32))  # images per /analyze/batch request
+    EMOTION_DECODE_THREADS = int(os.getenv('EMOTION_DECODE_THREADS', 0))  # 0 = one per CPU core
+    EMOTION_TEXT_BATCH_MAX = int(os.getenv('EMOTION_TEXT_BATCH_MAX', 100))  # texts per /analyze/text/batch request
+    EMOTION_STREAM_CLASSIFY_EVERY = int(os.getenv('EMOTION_STREAM_CLASSIFY_EVERY', 5))  # classify one webcam frame in N
+    EMOTION_STREAM_WINDOW = int(os.getenv('EMOTION_STREAM_WINDOW', 5))  # classifications averaged into the live mood
+    EMOTION_STREAM_TRACK_THRESHOLD = float(os.getenv('EMOTION_STREAM_TRACK_THRESHOLD', 0.5))  # template match score, below = re-detect
+    EMOTION_STREAM_IDLE_SECONDS = int(os.getenv('EMOTION_STREAM_IDLE_SECONDS', 60))
+    EMOTION_STREAM_MAX_SESSIONS = int(os.getenv('EMOTION_STREAM_MAX_SESSIONS', 256))  # per worker process
+    EMOTION_STREAM_MAX_FRAMES = int(os.getenv('EMOTION_STREAM_MAX_FRAMES', 30))  # frames per upload
+    EMOTION_INFERENCE_MODE = os.getenv('EMOTION_INFERENCE_MODE', 'local')  # 'local' or 'worker' (separate inference process)
+    EMOTION_INFERENCE_SOCKET = os.getenv('EMOTION_INFERENCE_SOCKET', '/tmp/museaika-emotion.sock')
+    EMOTION_INFERENCE_PROCESSES = int(os.getenv('EMOTION_INFERENCE_PROCESSES', 1))  # forked worker processes sharing the model
+    EMOTION_INFERENCE_TIMEOUT = float(os.getenv('EMOTION_INFERENCE_TIMEOUT', 30))  # seconds to wait for a worker reply
+    EMOTION_MODEL_LOADING = os.getenv('EMOTION_MODEL_LOADING', 'background')  # 'background', 'preload' or 'lazy'
+    EMOTION_READY_TIMEOUT = float(os.getenv('EMOTION_READY_TIMEOUT', 0))  # seconds a request waits for a loading model
+    EMOTION_RETRY_AFTER = int(os.getenv('EMOTION_RETRY_AFTER', 5))  # seconds, hint on 503 while loading
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:5173').split(',')
@@ -21,4 +55,25 @@ class Config:
     SUPPORTED_AUDIO_FORMATS = ['wav', 'mp3']
     DEFAULT_AUDIO_FORMAT = 'wav'
     GENERATION_CLEANUP_HOURS = int(os.getenv('GENERATION_CLEANUP_HOURS', 24))  # hours
+    GENERATION_DISK_BUDGET_MB = int(os.getenv('GENERATION_DISK_BUDGET_MB', 2048))  # generated files, excluding the cache
+    GENERATION_SWEEP_INTERVAL = int(os.getenv('GENERATION_SWEEP_INTERVAL', 60))  # seconds between expiry sweeps
+    GENERATION_EXECUTOR = os.getenv('GENERATION_EXECUTOR', 'process')  # 'process' or 'thread'
+    GENERATION_WORKERS = int(os.getenv('GENERATION_WORKERS', 0))  # 0 = one per CPU core
+    GENERATION_QUEUE_SIZE = int(os.getenv('GENERATION_QUEUE_SIZE', 32))  # jobs waiting for a worker
+    GENERATION_RETRY_AFTER = int(os.getenv('GENERATION_RETRY_AFTER', 5))  # seconds, minimum hint on 503
+    GENERATION_DETERMINISTIC = os.getenv('GENERATION_DETERMINISTIC', 'false').lower() == 'true'  # seed unseeded requests from quantized mood
+    GENERATION_SEED_QUANTUM = float(os.getenv('GENERATION_SEED_QUANTUM', 0.05))  # valence/arousal grid step
+    GENERATION_CACHE_MAX_ENTRIES = int(os.getenv('GENERATION_CACHE_MAX_ENTRIES', 500))
+    GENERATION_CACHE_MAX_MB = int(os.getenv('GENERATION_CACHE_MAX_MB', 1024))
+    GENERATION_BATCH_MAX_VARIANTS = int(os.getenv('GENERATION_BATCH_MAX_VARIANTS', 16))
+    GENERATION_BATCH_THREADS = int(os.getenv('GENERATION_BATCH_THREADS', 0))  # 0 = one per CPU core
+    GENERATION_DOWNLOAD_MAX_AGE = int(os.getenv('GENERATION_DOWNLOAD_MAX_AGE', 365 * 24 * 3600))  # seconds
+    GENERATION_STREAM_BLOCK_SAMPLES = int(os.getenv('GENERATION_STREAM_BLOCK_SAMPLES', 16384))  # ~0.37 s at 44.1 kHz
+    GENERATION_PREVIEW_SAMPLE_RATE = int(os.getenv('GENERATION_PREVIEW_SAMPLE_RATE', 22050))  # Hz
+    GENERATION_PREVIEW_SECONDS = float(os.getenv('GENERATION_PREVIEW_SECONDS', 6))  # length of the preview excerpt
+    GENERATION_PREVIEW_CACHE_ENTRIES = int(os.getenv('GENERATION_PREVIEW_CACHE_ENTRIES', 256))
+    GENERATION_PREVIEW_CACHE_MB = int(os.getenv('GENERATION_PREVIEW_CACHE_MB', 64))  # in-memory
+    GENERATION_EVENTS_KEEPALIVE = int(os.getenv('GENERATION_EVENTS_KEEPALIVE', 15))  # seconds between SSE keepalives
+    GENERATION_EVENTS_RETRY_MS = int(os.getenv('GENERATION_EVENTS_RETRY_MS', 2000))  # SSE reconnect delay for jobs owned elsewhere
+    GENERATION_WRITE_MIDI = os.getenv('GENERATION_WRITE_MIDI', 'false').lower() == 'true'  # keep .mid alongside .wav
 
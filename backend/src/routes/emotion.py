@@ -1,15 +1,29 @@
+from datetime import datetime
 from flask import Blueprint, request, jsonify
 from src.models.mood_entry import MoodEntry
-from src.services.emotion_service import EmotionService
+from src.services.emotion_service import EmotionService, ModelNotReadyError, group_mood
+from src.services.emotion_stream import EmotionStreamService
+from src.utils.db import get_db
 from src.utils.helpers import require_auth, map_emotion_to_mood
 from src.config import Config
 
 emotion_bp = Blueprint('emotion', __name__, url_prefix='/api/v1/emotion')
 emotion_service = None
+stream_service = None
 
-def init_emotion_service(service: EmotionService):
-    global emotion_service
+def init_emotion_service(service: EmotionService, streams: EmotionStreamService = None):
+    global emotion_service, stream_service
     emotion_service = service
+    stream_service = streams
+
+def model_not_ready_response(error: ModelNotReadyError):
+    response = jsonify({
+        'error': 'Emotion model is still loading. Please try again shortly.',
+        'model_state': error.state,
+        'retry_after': error.retry_after
+    })
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
 
 @emotion_bp.route('/analyze/image', methods=['POST'])
 @require_auth
@@ -31,12 +45,65 @@ def analyze_image():
             confidence=result['confidence']
         )
         return jsonify({'analysis': result, 'mood_entry': mood_entry}), 200
+    except ModelNotReadyError as e:
+        return model_not_ready_response(e)
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error analyzing image: {e}")
         return jsonify({'error': 'Failed to analyze image'}), 500
 
+def save_mood_entries(user_id: str, analyses: list, source: str) -> list:
+    """Insert one mood entry per analysis in a single write; returns their ids"""
+    if not analyses:
+        return []
+    now = datetime.utcnow()
+    documents = [{
+        'user_id': user_id,
+        'emotion': analysis['emotion'],
+        'valence': analysis['valence'],
+        'arousal': analysis['arousal'],
+        'source': source,
+        'confidence': analysis['confidence'],
+        'timestamp': now
+    } for analysis in analyses]
+    result = get_db().mood_entries.insert_many(documents)
+    return [str(inserted_id) for inserted_id in result.inserted_ids]
+
+@emotion_bp.route('/analyze/batch', methods=['POST'])
+@require_auth
+def analyze_batch():
+    """
+    Analyze every face in several images at once.
+
+    Takes 'images' files in a multipart body. Each image's largest face is
+    saved as a mood entry; pass group=true to also get one mood for all the
+    faces together.
+    """
+    try:
+        files = [image for image in request.files.getlist('images') if image.filename]
+        if not files:
+            return jsonify({'error': 'No images provided'}), 400
+        if len(files) > Config.EMOTION_BATCH_MAX_IMAGES:
+            return jsonify({'error': f'At most {Config.EMOTION_BATCH_MAX_IMAGES} images per request'}), 400
+
+        results = emotion_service.analyze_images([image.read() for image in files])
+        for image, result in zip(files, results):
+            result['filename'] = image.filename
+        analyzed = [result['faces'][0] for result in results if result.get('faces')]
+        response = {
+            'results': results,
+            'mood_entries': save_mood_entries(request.user_id, analyzed, 'image')
+        }
+        if request.form.get('group', 'false').lower() == 'true':
+            response['group'] = group_mood([face for result in results for face in result.get('faces', [])])
+        return jsonify(response), 200
+    except ModelNotReadyError as e:
+        return model_not_ready_response(e)
+    except Exception as e:
+        print(f"Error analyzing image batch: {e}")
+        return jsonify({'error': 'Failed to analyze images'}), 500
+
 @emotion_bp.route('/analyze/text', methods=['POST'])
 @require_auth
 def analyze_text():
@@ -59,6 +126,94 @@ def analyze_text():
         print(f"Error analyzing text: {e}")
         return jsonify({'error': 'Failed to analyze text'}), 500
 
+@emotion_bp.route('/stream', methods=['POST'])
+@require_auth
+def open_stream():
+    try:
+        session = stream_service.open(request.user_id)
+        return jsonify({
+            'session_id': session.id,
+            'classify_every': stream_service.classify_every,
+            'window': stream_service.window,
+            'max_frames': Config.EMOTION_STREAM_MAX_FRAMES
+        }), 201
+    except Exception as e:
+        print(f"Error opening emotion stream: {e}")
+        return jsonify({'error': 'Failed to open stream'}), 500
+
+@emotion_bp.route('/stream/<session_id>/frames', methods=['POST'])
+@require_auth
+def stream_frames(session_id):
+    """
+    Analyze one or more webcam frames, in order.
+
+    Frames come as 'frame' files in a multipart body, or as a single image
+    in the raw request body. A mood entry is saved each time the smoothed
+    mood changes.
+    """
+    try:
+        session = stream_service.get(session_id, request.user_id)
+        if session is None:
+            return jsonify({'error': 'Stream not found'}), 404
+        frames = [frame.read() for frame in request.files.getlist('frame')] or [request.get_data()]
+        frames = [frame for frame in frames if frame]
+        if not frames:
+            return jsonify({'error': 'No frames provided'}), 400
+        if len(frames) > Config.EMOTION_STREAM_MAX_FRAMES:
+            return jsonify({'error': f'At most {Config.EMOTION_STREAM_MAX_FRAMES} frames per request'}), 400
+
+        results = []
+        try:
+            for frame in frames:
+                results.append(stream_service.process_frame(session, frame))
+        finally:
+            # Only changes of mood are persisted, in one write per upload. The
+            # frames before a bad one have already moved the session's mood,
+            # so their changes are saved even when the upload fails part way
+            mood_entries = save_mood_entries(
+                request.user_id, [result['mood'] for result in results if result['changed']], 'stream'
+            )
+        return jsonify({'results': results, 'mood': session.mood, 'mood_entries': mood_entries}), 200
+    except ModelNotReadyError as e:
+        return model_not_ready_response(e)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error analyzing stream frames: {e}")
+        return jsonify({'error': 'Failed to analyze frames'}), 500
+
+@emotion_bp.route('/stream/<session_id>', methods=['DELETE'])
+@require_auth
+def close_stream(session_id):
+    try:
+        session = stream_service.get(session_id, request.user_id)
+        if session is None:
+            return jsonify({'error': 'Stream not found'}), 404
+        stream_service.close(session_id)
+        return jsonify(session.summary()), 200
+    except Exception as e:
+        print(f"Error closing emotion stream: {e}")
+        return jsonify({'error': 'Failed to close stream'}), 500
+
+@emotion_bp.route('/analyze/text/batch', methods=['POST'])
+@require_auth
+def analyze_text_batch():
+    try:
+        data = request.get_json() or {}
+        texts = data.get('texts')
+        if not isinstance(texts, list) or not texts or not all(isinstance(text, str) and text for text in texts):
+            return jsonify({'error': 'texts must be a non-empty list of strings'}), 400
+        if len(texts) > Config.EMOTION_TEXT_BATCH_MAX:
+            return jsonify({'error': f'At most {Config.EMOTION_TEXT_BATCH_MAX} texts per request'}), 400
+        results = emotion_service.analyze_texts(texts)
+        return jsonify({
+            'analyses': results,
+            'mood_entries': save_mood_entries(request.user_id, results, 'text')
+        }), 200
+    except Exception as e:
+        print(f"Error analyzing texts: {e}")
+        return jsonify({'error': 'Failed to analyze texts'}), 500
+
 @emotion_bp.route('/manual', methods=['POST'])
 @require_auth
 def manual_entry():
@@ -81,6 +236,17 @@ def manual_entry():
         print(f"Error creating manual entry: {e}")
         return jsonify({'error': 'Failed to save mood'}), 500
 
+@emotion_bp.route('/stats', methods=['GET'])
+@require_auth
+def get_stats():
+    try:
+        stats = emotion_service.stats()
+        stats['streams'] = stream_service.stats() if stream_service else None
+        return jsonify(stats), 200
+    except Exception as e:
+        print(f"Error fetching emotion stats: {e}")
+        return jsonify({'error': 'Failed to fetch stats'}), 500
+
 @emotion_bp.route('/history', methods=['GET'])
 @require_auth
 def get_history():
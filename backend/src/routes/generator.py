@@ -1,103 +1,403 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Response, request, jsonify, send_file, stream_with_context
+from werkzeug.exceptions import HTTPException
 from src.services.music_generator import MusicGenerator
+from src.services.generation_executor import GenerationExecutor, QueueFullError
+from src.services.generation_cache import GenerationCache, deterministic_parameters
+from src.services.file_store import GeneratedFileStore, sharded_path
+from src.services.job_events import JobEventBus
 from src.models.generation_job import GenerationJob
 from src.models.mood_entry import MoodEntry
-from src.utils.helpers import require_auth
+from src.utils.cache import LRUCache
+from src.utils.helpers import require_auth, content_etag
+from src.utils.timing import StageTimer
 from src.config import Config
 import os
-import threading
+import json
+import queue
+import secrets
+from functools import partial
+from itertools import product
 
 generator_bp = Blueprint('generator', __name__, url_prefix='/api/v1/generate')
 music_generator = None
+generation_executor = None
+generation_cache = None
+file_store = None
+preview_cache = None
+job_events = None
 
-def init_generator_service(generator: MusicGenerator):
-    global music_generator
+def init_generator_service(generator: MusicGenerator, executor: GenerationExecutor,
+                           cache: GenerationCache, store: GeneratedFileStore, previews: LRUCache,
+                           events: JobEventBus):
+    global music_generator, generation_executor, generation_cache, file_store, preview_cache, job_events
     music_generator = generator
+    generation_executor = executor
+    generation_cache = cache
+    file_store = store
+    preview_cache = previews
+    job_events = events
 
-def process_generation(job_id: str, valence: float, arousal: float, 
-                      duration: int, tempo: int, style: str):
-    """Background task to process music generation"""
+def create_job(user_id: str, parameters: dict) -> str:
+    """Create a generation job and open its event channel"""
+    job_id = GenerationJob.create(user_id, parameters)
+    job_events.register(job_id, user_id)
+    job_events.publish(job_id, 'queued')
+    return job_id
+
+def mark_processing(job_id: str):
+    GenerationJob.update_status(job_id, 'processing')
+    job_events.publish(job_id, 'processing')
+
+def mark_completed(job_id: str, file_path: str, timings: dict = None, cached: bool = False):
+    GenerationJob.update_status(job_id, 'completed', file_path=file_path)
+    event = {'download_url': f"/api/v1/generate/{job_id}/download", 'cached': cached}
+    if timings:
+        event['render_timings'] = timings
+    job_events.publish(job_id, 'completed', **event)
+
+def mark_failed(job_id: str, error: Exception):
+    GenerationJob.update_status(job_id, 'failed', error_message=str(error))
+    job_events.publish(job_id, 'failed', error=str(error))
+
+def on_generation_progress(job_id: str, percent: int, timings: dict):
+    """Executor callback: part of the job's audio has been rendered"""
+    job_events.publish(job_id, 'progress', percent=percent, timings=format_timings(timings))
+
+def keep_artifact(path: str, cache_key: str = None) -> str:
+    """Hand a finished render to the cache if it is cacheable, otherwise to the expiring store"""
+    if cache_key:
+        return generation_cache.put(cache_key, path)
+    return file_store.register(path)
+
+def on_generation_started(job_id: str):
+    """Executor callback: a worker picked the job up"""
+    mark_processing(job_id)
+
+def on_generation_finished(job_id: str, result, error, cache_key: str = None, timings: dict = None):
+    """Executor callback: record the outcome of a generation job"""
+    if error is not None:
+        print(f"Generation error: {error}")
+        mark_failed(job_id, error)
+        return
+    
+    midi_path, wav_path = result
+    if midi_path:
+        file_store.register(midi_path)
+    wav_path = keep_artifact(wav_path, cache_key)
+    mark_completed(job_id, wav_path, write_render_timings(job_id, timings))
+
+def render_timings_path(job_id: str) -> str:
+    return sharded_path(music_generator.output_dir, f"timings_{job_id}", 'json')
+
+def format_timings(timings: dict) -> dict:
+    """Split StageTimer output into overall stages and per-layer render times"""
+    stages = {name: round(seconds, 4) for name, seconds in timings.items() if ':' not in name}
+    layers = {name.split(':', 1)[1]: round(seconds, 4)
+              for name, seconds in timings.items() if name.startswith('layer:')}
+    return {'stages': stages, 'layers': layers}
+
+def write_render_timings(job_id: str, timings: dict):
+    """Keep a job's stage and per-layer render times next to its files"""
+    if not timings:
+        return None
+    formatted = format_timings(timings)
+    path = render_timings_path(job_id)
+    with open(path, 'w') as f:
+        json.dump(formatted, f)
+    file_store.register(path)
+    return formatted
+
+def read_render_timings(job_id: str):
+    path = render_timings_path(job_id)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def cache_key_for(parameters: dict):
+    """Cache key for seeded requests; unseeded ones are never cached"""
+    if parameters.get('seed') is None:
+        return None
+    return generation_cache.key_for(parameters)
+
+def send_generated_file(file_path: str, as_attachment: bool = False):
+    """
+    Send a finished render with range, ETag and conditional-GET support.
+    
+    Completed renders never change, so they are cacheable for a year; they are
+    marked private because every download sits behind auth.
+    """
+    response = send_file(
+        file_path,
+        mimetype='audio/wav',
+        as_attachment=as_attachment,
+        download_name=os.path.basename(file_path),
+        conditional=True,
+        etag=content_etag(file_path),
+        max_age=Config.GENERATION_DOWNLOAD_MAX_AGE
+    )
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    return response
+
+def preview_response(parameters: dict, user_seed: int = None):
+    """
+    Render a preview excerpt, or reuse a cached one, and return the audio directly.
+    
+    Previews never touch the job store, the executor or the disk; they are
+    rendered in-request on the low-rate preview synthesizer.
+    """
+    key = cache_key_for(dict(
+        parameters,
+        preview=[Config.GENERATION_PREVIEW_SAMPLE_RATE, Config.GENERATION_PREVIEW_SECONDS]
+    ))
+    audio = preview_cache.get(key) if key else None
+    hit = audio is not None
+    if not hit:
+        audio = music_generator.preview_music(**parameters, excerpt=Config.GENERATION_PREVIEW_SECONDS)
+        if key:
+            preview_cache.put(key, audio)
+    
+    headers = {'X-Preview-Cache': 'hit' if hit else 'miss', 'Cache-Control': 'no-store'}
+    # Committing with this seed renders the final version of the same piece
+    if user_seed is not None:
+        headers['X-Generation-Seed'] = str(user_seed)
+    return Response(audio, mimetype='audio/wav', headers=headers)
+
+def queue_full_response(retry_after: int):
+    response = jsonify({
+        'error': 'Generation queue is full. Please try again shortly.',
+        'retry_after': retry_after
+    })
+    response.headers['Retry-After'] = str(retry_after)
+    return response, 503
+
+def parse_generation_request(data: dict, user_id: str) -> dict:
+    """Validate a generation request body into job parameters"""
+    parameters, user_seed = parse_base_parameters(data, user_id)
+    return seed_parameters(parameters, user_seed)
+
+def seed_parameters(parameters: dict, user_seed: int = None, variation: int = 0) -> dict:
+    """Attach the composer seed: derived from the mood for deterministic or client-seeded requests, else none"""
+    if Config.GENERATION_DETERMINISTIC or user_seed is not None:
+        return deterministic_parameters(parameters, Config.GENERATION_SEED_QUANTUM, user_seed, variation)
+    return dict(parameters, seed=None)
+
+def parse_number(value, field: str, cast=float):
+    """value as an int or float, or a ValueError naming the field"""
+    # bool is an int subclass, but true/false is never a meaningful number here
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f'{field} must be a number')
     try:
-        # Update status to processing
-        GenerationJob.update_status(job_id, 'processing')
-        
-        # Generate music
-        midi_path, wav_path = music_generator.generate_music(
-            valence=valence,
-            arousal=arousal,
-            duration=duration,
-            tempo=tempo,
-            style=style
-        )
-        
-        # Update status to completed
-        GenerationJob.update_status(job_id, 'completed', file_path=wav_path)
-        
-    except Exception as e:
-        print(f"Generation error: {e}")
-        GenerationJob.update_status(job_id, 'failed', error_message=str(e))
+        number = float(value)
+    except ValueError:
+        raise ValueError(f'{field} must be a number')
+    if cast is int:
+        if not number.is_integer():
+            raise ValueError(f'{field} must be an integer')
+        return int(number)
+    return number
+
+def parse_number_list(values, field: str) -> list:
+    if not isinstance(values, list) or not values:
+        raise ValueError(f'{field} must be a non-empty list of numbers')
+    return [parse_number(value, f'{field}[{index}]') for index, value in enumerate(values)]
+
+def parse_base_parameters(data: dict, user_id: str):
+    """Validate the mood and musical parameters of a request; returns (parameters, user_seed)"""
+    # Get mood parameters
+    use_current_mood = data.get('use_current_mood', True)
+    
+    if use_current_mood:
+        # Get user's latest mood
+        mood = MoodEntry.get_latest(user_id)
+        if not mood:
+            raise ValueError('No mood data found. Please check your mood first.')
+        valence = mood['valence']
+        arousal = mood['arousal']
+    else:
+        # Use provided mood parameters
+        valence = data.get('valence', 0.5)
+        arousal = data.get('arousal', 0.5)
+    
+    # Validate mood parameters
+    valence = max(0.0, min(1.0, parse_number(valence, 'valence')))
+    arousal = max(0.0, min(1.0, parse_number(arousal, 'arousal')))
+    
+    # Get generation parameters
+    duration = data.get('duration', 30)
+    duration = max(Config.MIN_GENERATION_DURATION, 
+                  min(Config.MAX_GENERATION_DURATION, parse_number(duration, 'duration', int)))
+    
+    tempo = data.get('tempo')
+    if tempo:
+        tempo = max(60, min(180, parse_number(tempo, 'tempo', int)))
+    
+    style = data.get('style', 'auto')
+    if style not in ['auto', 'ambient', 'rhythmic', 'melodic']:
+        style = 'auto'
+    
+    user_seed = data.get('seed')
+    if user_seed is not None:
+        user_seed = parse_number(user_seed, 'seed', int)
+    
+    parameters = {
+        'valence': valence,
+        'arousal': arousal,
+        'duration': duration,
+        'tempo': tempo,
+        'style': style
+    }
+    
+    return parameters, user_seed
+
+def expand_batch_variants(data: dict, base: dict, user_seed: int = None) -> list:
+    """
+    Expand a batch request into per-variant parameters.
+    
+    The optional grid ({'valence': [...], 'arousal': [...], 'style': [...]})
+    is crossed with itself and each point is repeated `variations` times with
+    distinct seeds. Axes left out keep the base value.
+    """
+    grid = data.get('grid') or {}
+    if not isinstance(grid, dict):
+        raise ValueError('grid must be an object')
+    
+    valences = [max(0.0, min(1.0, v)) for v in parse_number_list(grid.get('valence', [base['valence']]), 'grid.valence')]
+    arousals = [max(0.0, min(1.0, a)) for a in parse_number_list(grid.get('arousal', [base['arousal']]), 'grid.arousal')]
+    styles = grid.get('style', [base['style']])
+    if not isinstance(styles, list) or not styles:
+        raise ValueError('grid.style must be a non-empty list of styles')
+    for style in styles:
+        if style not in ['auto', 'ambient', 'rhythmic', 'melodic']:
+            raise ValueError(f'Unsupported style in grid: {style}')
+    
+    variations = parse_number(data.get('variations', 1), 'variations', int)
+    total = len(valences) * len(arousals) * len(styles) * variations
+    if variations < 1 or total < 1 or total > Config.GENERATION_BATCH_MAX_VARIANTS:
+        raise ValueError(f'A batch must contain between 1 and {Config.GENERATION_BATCH_MAX_VARIANTS} variants')
+    
+    variants = []
+    for valence, arousal, style in product(valences, arousals, styles):
+        point = dict(base, valence=valence, arousal=arousal, style=style)
+        for variation in range(variations):
+            variants.append(seed_parameters(point, user_seed, variation))
+    return variants
+
+def write_batch_manifest(job_id: str, variants: list, paths: list) -> str:
+    """Record where each variant of a batch job was written"""
+    manifest_path = sharded_path(music_generator.output_dir, f"batch_{job_id}", 'json')
+    manifest = [
+        {'index': index, 'parameters': parameters, 'file_path': path}
+        for index, (parameters, path) in enumerate(zip(variants, paths))
+    ]
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+    return file_store.register(manifest_path)
+
+def read_batch_manifest(job: dict) -> list:
+    # The manifest expires with the rest of the job's files
+    if not os.path.exists(job['file_path']):
+        return []
+    with open(job['file_path']) as f:
+        return json.load(f)
+
+def on_batch_finished(job_id: str, result, error, variants: list, paths: list,
+                      cache_keys: list, pending: list, timings: dict = None):
+    """Executor callback: merge rendered variants with cached ones and finish the job"""
+    if error is not None:
+        print(f"Batch generation error: {error}")
+        mark_failed(job_id, error)
+        return
+    
+    paths = list(paths)
+    for index, (midi_path, wav_path) in zip(pending, result):
+        if midi_path:
+            file_store.register(midi_path)
+        paths[index] = keep_artifact(wav_path, cache_keys[index])
+    
+    manifest_path = write_batch_manifest(job_id, variants, paths)
+    mark_completed(job_id, manifest_path, write_render_timings(job_id, timings))
+
+def variant_downloads(job_id: str, job: dict) -> list:
+    return [
+        {
+            'index': entry['index'],
+            'parameters': entry['parameters'],
+            'download_url': f"/api/v1/generate/{job_id}/download?variant={entry['index']}"
+        }
+        for entry in read_batch_manifest(job)
+    ]
 
 @generator_bp.route('', methods=['POST'])
 @require_auth
 def start_generation():
-    """Start a new music generation job"""
+    """
+    Start a new music generation job.
+    
+    With quality 'preview' a short low-rate excerpt is returned immediately
+    instead; 'final' (the default) queues the full-quality render.
+    """
     try:
-        data = request.get_json()
-        
-        # Get mood parameters
-        use_current_mood = data.get('use_current_mood', True)
-        
-        if use_current_mood:
-            # Get user's latest mood
-            mood = MoodEntry.get_latest(request.user_id)
-            if not mood:
-                return jsonify({'error': 'No mood data found. Please check your mood first.'}), 400
-            valence = mood['valence']
-            arousal = mood['arousal']
-        else:
-            # Use provided mood parameters
-            valence = data.get('valence', 0.5)
-            arousal = data.get('arousal', 0.5)
-        
-        # Validate mood parameters
-        valence = max(0.0, min(1.0, float(valence)))
-        arousal = max(0.0, min(1.0, float(arousal)))
-        
-        # Get generation parameters
-        duration = data.get('duration', 30)
-        duration = max(Config.MIN_GENERATION_DURATION, 
-                      min(Config.MAX_GENERATION_DURATION, int(duration)))
-        
-        tempo = data.get('tempo')
-        if tempo:
-            tempo = max(60, min(180, int(tempo)))
-        
-        style = data.get('style', 'auto')
-        if style not in ['auto', 'ambient', 'rhythmic', 'melodic']:
-            style = 'auto'
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
+        
+        quality = data.get('quality', 'final')
+        if quality not in ('preview', 'final'):
+            return jsonify({'error': "quality must be 'preview' or 'final'"}), 400
+        
+        try:
+            base, user_seed = parse_base_parameters(data, request.user_id)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if quality == 'preview':
+            # Unseeded previews get a seed the client can commit with
+            if user_seed is None and not Config.GENERATION_DETERMINISTIC:
+                user_seed = secrets.randbelow(2 ** 31)
+            return preview_response(seed_parameters(base, user_seed), user_seed)
+        
+        parameters = seed_parameters(base, user_seed)
+        
+        # Identical deterministic requests complete straight from the cache
+        cache_key = cache_key_for(parameters)
+        cached_path = generation_cache.get(cache_key) if cache_key else None
+        if cached_path:
+            job_id = create_job(request.user_id, parameters)
+            mark_completed(job_id, cached_path, cached=True)
+            return jsonify({
+                'job_id': job_id,
+                'status': 'completed',
+                'cached': True,
+                'download_url': f"/api/v1/generate/{job_id}/download",
+                'message': 'Music generation completed from cache'
+            }), 200
+        
+        # Shed load before creating a job that could not be queued
+        retry_after = generation_executor.retry_after_if_full()
+        if retry_after is not None:
+            return queue_full_response(retry_after)
         
         # Create job
-        parameters = {
-            'valence': valence,
-            'arousal': arousal,
-            'duration': duration,
-            'tempo': tempo,
-            'style': style
-        }
-        
-        job_id = GenerationJob.create(request.user_id, parameters)
-        
-        # Start generation in background thread
-        thread = threading.Thread(
-            target=process_generation,
-            args=(job_id, valence, arousal, duration, tempo, style)
-        )
-        thread.daemon = True
-        thread.start()
+        job_id = create_job(request.user_id, parameters)
+        
+        # Hand off to the generation workers
+        try:
+            queue_position = generation_executor.submit(
+                job_id, parameters, on_generation_started,
+                partial(on_generation_finished, cache_key=cache_key),
+                on_progress=on_generation_progress
+            )
+        except QueueFullError as e:
+            mark_failed(job_id, e)
+            return queue_full_response(e.retry_after)
         
         return jsonify({
             'job_id': job_id,
-            'status': 'pending',
+            'status': 'processing' if queue_position == 0 else 'pending',
+            'queue_position': queue_position,
             'message': 'Music generation started'
         }), 202
         
@@ -105,6 +405,175 @@ def start_generation():
         print(f"Error starting generation: {e}")
         return jsonify({'error': 'Failed to start generation'}), 500
 
+@generator_bp.route('/batch', methods=['POST'])
+@require_auth
+def start_batch_generation():
+    """Start one job that renders several variations or a grid of moods"""
+    try:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
+        
+        try:
+            base, user_seed = parse_base_parameters(data, request.user_id)
+            variants = expand_batch_variants(data, base, user_seed)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Variants already in the cache are reused; only the rest get rendered
+        cache_keys = [cache_key_for(variant) for variant in variants]
+        paths = [generation_cache.get(key) if key else None for key in cache_keys]
+        pending = [index for index, path in enumerate(paths) if path is None]
+        
+        if pending:
+            retry_after = generation_executor.retry_after_if_full()
+            if retry_after is not None:
+                return queue_full_response(retry_after)
+        
+        job_id = create_job(request.user_id, {'batch': True, 'variants': variants})
+        
+        if not pending:
+            manifest_path = write_batch_manifest(job_id, variants, paths)
+            mark_completed(job_id, manifest_path, cached=True)
+            job = GenerationJob.get_by_id(job_id)
+            return jsonify({
+                'job_id': job_id,
+                'status': 'completed',
+                'cached': True,
+                'variants': variant_downloads(job_id, job),
+                'message': 'Batch generation completed from cache'
+            }), 200
+        
+        try:
+            queue_position = generation_executor.submit(
+                job_id,
+                {
+                    'variants': [variants[index] for index in pending],
+                    'max_workers': Config.GENERATION_BATCH_THREADS or None
+                },
+                on_generation_started,
+                partial(on_batch_finished, variants=variants, paths=paths,
+                        cache_keys=cache_keys, pending=pending),
+                method='generate_batch',
+                on_progress=on_generation_progress
+            )
+        except QueueFullError as e:
+            mark_failed(job_id, e)
+            return queue_full_response(e.retry_after)
+        
+        return jsonify({
+            'job_id': job_id,
+            'status': 'processing' if queue_position == 0 else 'pending',
+            'queue_position': queue_position,
+            'variant_count': len(variants),
+            'cached_variants': len(variants) - len(pending),
+            'message': 'Batch generation started'
+        }), 202
+        
+    except Exception as e:
+        print(f"Error starting batch generation: {e}")
+        return jsonify({'error': 'Failed to start batch generation'}), 500
+
+@generator_bp.route('/stream', methods=['POST'])
+@require_auth
+def stream_generation():
+    """Generate music and stream the WAV while it is being synthesized"""
+    try:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
+        
+        try:
+            parameters = parse_generation_request(data, request.user_id)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # A cached render is already complete; just send it
+        cache_key = cache_key_for(parameters)
+        cached_path = generation_cache.get(cache_key) if cache_key else None
+        if cached_path:
+            job_id = create_job(request.user_id, parameters)
+            mark_completed(job_id, cached_path, cached=True)
+            response = send_generated_file(cached_path)
+            response.headers['X-Job-Id'] = job_id
+            return response
+        
+        # Streams render on this thread, but take a generation worker's slot
+        # so they are admitted against the same capacity as queued jobs. The
+        # slot is claimed before the job exists, so a rejected stream leaves
+        # nothing in the user's history
+        slot = secrets.token_hex(8)
+        retry_after = generation_executor.reserve(slot)
+        if retry_after is not None:
+            return queue_full_response(retry_after)
+        
+        timer = StageTimer()
+        try:
+            job_id = create_job(request.user_id, parameters)
+            mark_processing(job_id)
+            chunks = music_generator.stream_music(
+                **parameters,
+                block_size=Config.GENERATION_STREAM_BLOCK_SAMPLES,
+                timer=timer
+            )
+            wav_path = music_generator.new_wav_path()
+        except Exception:
+            generation_executor.release(slot)
+            raise
+        
+        body_started = []
+        
+        def generate():
+            # The same blocks are teed to disk so the job can be downloaded later
+            body_started.append(True)
+            error = None
+            wav_file = open(wav_path, 'wb')
+            try:
+                for chunk in chunks:
+                    wav_file.write(chunk)
+                    yield chunk
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                # The client may have gone away mid-stream; finish the file anyway
+                if error is None:
+                    try:
+                        for chunk in chunks:
+                            wav_file.write(chunk)
+                    except Exception as e:
+                        error = e
+                wav_file.close()
+                
+                if error is None:
+                    path = keep_artifact(wav_path, cache_key)
+                    mark_completed(job_id, path, write_render_timings(job_id, timer.as_dict()))
+                else:
+                    os.remove(wav_path)
+                    print(f"Streaming generation error: {error}")
+                    mark_failed(job_id, error)
+        
+        def close():
+            # Closing the response finishes the render, then frees the slot.
+            # A body that was never read leaves nothing to finish the job
+            try:
+                if not body_started:
+                    mark_failed(job_id, ConnectionAbortedError('Stream closed before rendering started'))
+            finally:
+                generation_executor.release(slot)
+        
+        response = Response(
+            stream_with_context(generate()),
+            mimetype='audio/wav',
+            headers={'X-Job-Id': job_id, 'Cache-Control': 'no-store'}
+        )
+        response.call_on_close(close)
+        return response
+        
+    except Exception as e:
+        print(f"Error streaming generation: {e}")
+        return jsonify({'error': 'Failed to stream generation'}), 500
+
 @generator_bp.route('/<job_id>', methods=['GET'])
 @require_auth
 def get_generation_status(job_id):
@@ -127,9 +596,19 @@ def get_generation_status(job_id):
             'updated_at': job['updated_at'].isoformat()
         }
         
+        if job['status'] == 'pending':
+            queue_position = generation_executor.queue_position(job_id)
+            if queue_position is not None:
+                response['queue_position'] = queue_position
+        
         if job['status'] == 'completed':
             response['download_url'] = f"/api/v1/generate/{job_id}/download"
             response['completed_at'] = job['completed_at'].isoformat()
+            if job['parameters'].get('batch'):
+                response['variants'] = variant_downloads(job_id, job)
+            render_timings = read_render_timings(job_id)
+            if render_timings:
+                response['render_timings'] = render_timings
         
         if job['status'] == 'failed':
             response['error_message'] = job.get('error_message', 'Unknown error')
@@ -140,6 +619,69 @@ def get_generation_status(job_id):
         print(f"Error getting job status: {e}")
         return jsonify({'error': 'Failed to get job status'}), 500
 
+def format_event(event) -> str:
+    """Serialize a job event in text/event-stream format"""
+    return f"id: {event.id}\nevent: {event.type}\ndata: {json.dumps(dict(event.data, job_id=event.job_id))}\n\n"
+
+@generator_bp.route('/<job_id>/events', methods=['GET'])
+@require_auth
+def generation_events(job_id):
+    """
+    Stream a job's state changes as server-sent events.
+    
+    Emits queued, processing, progress (percent plus stage timings so far),
+    and finally completed or failed, after which the stream ends. Ownership is
+    checked once, when the stream opens.
+    """
+    try:
+        owner = job_events.owner(job_id)
+        if owner is None:
+            # Not a job this process has seen: report its stored state once and
+            # let the client's reconnect act as a slow poll
+            job = GenerationJob.get_by_id(job_id)
+            if not job:
+                return jsonify({'error': 'Job not found'}), 404
+            if job['user_id'] != request.user_id:
+                return jsonify({'error': 'Unauthorized'}), 403
+            data = {'job_id': job_id}
+            if job['status'] == 'completed':
+                data['download_url'] = f"/api/v1/generate/{job_id}/download"
+            if job['status'] == 'failed':
+                data['error'] = job.get('error_message', 'Unknown error')
+            body = f"retry: {Config.GENERATION_EVENTS_RETRY_MS}\nevent: {job['status']}\ndata: {json.dumps(data)}\n\n"
+            return Response(body, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+        
+        if owner != request.user_id:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        last_event_id = request.headers.get('Last-Event-ID', type=int)
+        subscriber = job_events.subscribe(job_id, last_event_id)
+        
+        def stream():
+            try:
+                while True:
+                    try:
+                        event = subscriber.get(timeout=Config.GENERATION_EVENTS_KEEPALIVE)
+                    except queue.Empty:
+                        # Comment line keeps proxies from closing an idle stream
+                        yield ': keepalive\n\n'
+                        continue
+                    yield format_event(event)
+                    if event.terminal:
+                        return
+            finally:
+                job_events.unsubscribe(job_id, subscriber)
+        
+        return Response(
+            stream_with_context(stream()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+        
+    except Exception as e:
+        print(f"Error streaming job events: {e}")
+        return jsonify({'error': 'Failed to stream job events'}), 500
+
 @generator_bp.route('/<job_id>/download', methods=['GET'])
 @require_auth
 def download_generation(job_id):
@@ -159,18 +701,22 @@ def download_generation(job_id):
         
         file_path = job['file_path']
         
+        # Batch jobs serve one variant at a time, the first by default
+        if job['parameters'].get('batch'):
+            variant = request.args.get('variant', 0, type=int)
+            manifest = read_batch_manifest(job)
+            if not 0 <= variant < len(manifest):
+                return jsonify({'error': 'Variant not found'}), 404
+            file_path = manifest[variant]['file_path']
+        
         if not file_path or not os.path.exists(file_path):
             return jsonify({'error': 'Generated file not found'}), 404
         
-        filename = os.path.basename(file_path)
-        
-        return send_file(
-            file_path,
-            mimetype='audio/wav',
-            as_attachment=True,
-            download_name=filename
-        )
+        return send_generated_file(file_path, as_attachment=True)
         
+    except HTTPException:
+        # Unsatisfiable ranges surface as 416
+        raise
     except Exception as e:
         print(f"Error downloading file: {e}")
         return jsonify({'error': 'Failed to download file'}), 500
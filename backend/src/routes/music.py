@@ -87,3 +87,14 @@ def get_custom_recommendations():
     except Exception as e:
         print(f"Error getting custom recommendations: {e}")
         return jsonify({'error': 'Failed to get recommendations'}), 500
+
+@music_bp.route('/stats', methods=['GET'])
+@require_auth
+def get_stats():
+    try:
+        stats = audius_service.stats()
+        stats['recommender'] = enhanced_recommender.stats()
+        return jsonify(stats), 200
+    except Exception as e:
+        print(f"Error fetching music stats: {e}")
+        return jsonify({'error': 'Failed to fetch stats'}), 500
@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Tuple
+from src.utils.batching import percentiles
+from src.utils.cache import LRUCache
+
+# Parameters the discovery provider matches case-insensitively
+CASE_INSENSITIVE_PARAMS = frozenset({'query'})
+
+
+def response_key(endpoint: str, params: Dict) -> Tuple:
+    """Cache key for a call: the endpoint plus its parameters, normalised so
+    "Arijit  Singh" and "arijit singh" share an entry"""
+    normalised = []
+    for name, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = ' '.join(value.split())
+            if name in CASE_INSENSITIVE_PARAMS:
+                value = value.lower()
+        normalised.append((name, value))
+    return (endpoint, tuple(sorted(normalised)))
+
+
+class AudiusResponseCache:
+    """
+    Recent Audius API responses, with per-endpoint freshness.
+
+    A response younger than its endpoint's TTL is served as is. For
+    stale_seconds past the TTL it is still served, while one background
+    refresh fetches a new copy, so a popular key never makes a caller wait
+    on the network once it has been fetched. Older entries are refetched
+    inline. Failed fetches are never cached, and a failed refresh keeps
+    serving the stale copy until it ages out.
+
+    Args:
+        ttls: Seconds a response stays fresh, per endpoint name
+        default_ttl: TTL for endpoints missing from ttls
+        max_entries: Responses kept; the least recently used go first
+        stale_seconds: How long past its TTL a response may still be served
+        refresh_threads: Background refreshes run at the same time
+    """
+
+    def __init__(self, ttls: Dict[str, float] = None, default_ttl: float = 300,
+                 max_entries: int = 1024, stale_seconds: float = 600, refresh_threads: int = 2):
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self.stale_seconds = stale_seconds
+        self.refresh_threads = max(1, refresh_threads)
+        self._entries = LRUCache(max_entries=max_entries)  # key -> (value, fetched_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+        self._fetch_times = deque(maxlen=1024)
+        self._counts = {}  # endpoint -> {'hits', 'stale_hits', 'misses'}
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def get_or_fetch(self, endpoint: str, params: Dict, fetch: Callable[[], Any]) -> Any:
+        """
+        The cached response for endpoint and params, or fetch()'s result.
+
+        Raises:
+            Exception: Whatever fetch raises when there is nothing cached to fall back on
+        """
+        key = response_key(endpoint, params)
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, fetched_at = entry
+            age = time.time() - fetched_at
+            ttl = self.ttls.get(endpoint, self.default_ttl)
+            if age < ttl:
+                self._count(endpoint, 'hits')
+                return value
+            if age < ttl + self.stale_seconds:
+                self._count(endpoint, 'stale_hits')
+                self._schedule_refresh(key, fetch)
+                return value
+
+        self._count(endpoint, 'misses')
+        return self._fetch(key, fetch)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        entries = self._entries.stats()
+        with self._lock:
+            totals = {name: sum(counts[name] for counts in self._counts.values())
+                      for name in ('hits', 'stale_hits', 'misses')}
+            lookups = sum(totals.values())
+            return {
+                'entries': entries['entries'],
+                'evictions': entries['evictions'],
+                **totals,
+                'hit_rate': (totals['hits'] + totals['stale_hits']) / lookups if lookups else 0.0,
+                'refreshes': self.refreshes,
+                'refresh_errors': self.refresh_errors,
+                'refreshing': len(self._refreshing),
+                'upstream_ms': percentiles(sorted(self._fetch_times)),
+                'endpoints': {endpoint: dict(counts) for endpoint, counts in sorted(self._counts.items())},
+                'ttls': {**self.ttls, 'default': self.default_ttl},
+                'stale_seconds': self.stale_seconds
+            }
+
+    def _fetch(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        value = fetch()
+        with self._lock:
+            self._fetch_times.append((time.perf_counter() - started) * 1000)
+        self._entries.put(key, (value, time.time()))
+        return value
+
+    def _schedule_refresh(self, key: Hashable, fetch: Callable[[], Any]):
+        with self._lock:
+            # Created on first use in each process: a pre-forking master's
+            # pool would have no threads in the workers
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.refresh_threads,
+                                                    thread_name_prefix='audius-refresh')
+                self._executor_pid = os.getpid()
+                self._refreshing = set()
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            executor = self._executor
+        executor.submit(self._refresh, key, fetch)
+
+    def _refresh(self, key: Hashable, fetch: Callable[[], Any]):
+        try:
+            self._fetch(key, fetch)
+            outcome = 'refreshes'
+        except Exception as e:
+            print(f"Error refreshing Audius response {key}: {e}")
+            outcome = 'refresh_errors'
+        with self._lock:
+            self._refreshing.discard(key)
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def _count(self, endpoint: str, counter: str):
+        with self._lock:
+            counts = self._counts.setdefault(endpoint, {'hits': 0, 'stale_hits': 0, 'misses': 0})
+            counts[counter] += 1
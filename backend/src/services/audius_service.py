@@ -1,10 +1,20 @@
 import requests
-from typing import List, Dict
+from typing import Any, List, Dict
+from src.services.audius_cache import AudiusResponseCache
 
 class AudiusService:
-    def __init__(self, host: str, api_key: str = None):
+    """
+    Audius discovery provider client.
+
+    With a cache, responses are kept per endpoint ('search', 'trending',
+    'track') and normalised parameters, so repeated searches for the same
+    artists are answered without a network call.
+    """
+
+    def __init__(self, host: str, api_key: str = None, cache: AudiusResponseCache = None):
         self.host = host
         self.api_key = api_key
+        self.cache = cache
         self.session = requests.Session()
         if api_key:
             self.session.headers['X-API-Key'] = api_key
@@ -21,14 +31,7 @@ class AudiusService:
             if mood:
                 params['mood'] = mood
             
-            response = self.session.get(
-                f'{self.host}/v1/tracks/search',
-                params=params,
-                timeout=10
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data.get('data', [])
+            return self._get('search', '/v1/tracks/search', params, [])
         except Exception as e:
             print(f"Audius API error in search_tracks: {e}")
             return []
@@ -40,14 +43,7 @@ class AudiusService:
             if genre:
                 params['genre'] = genre
             
-            response = self.session.get(
-                f'{self.host}/v1/tracks/trending',
-                params=params,
-                timeout=10
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data.get('data', [])
+            return self._get('trending', '/v1/tracks/trending', params, [])
         except Exception as e:
             print(f"Audius API error in get_trending_tracks: {e}")
             return []
@@ -55,13 +51,7 @@ class AudiusService:
     def get_track(self, track_id: str) -> Dict:
         """Get details for a specific track by ID"""
         try:
-            response = self.session.get(
-                f'{self.host}/v1/tracks/{track_id}',
-                timeout=10
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data.get('data', {})
+            return self._get('track', f'/v1/tracks/{track_id}', {}, {})
         except Exception as e:
             print(f"Audius API error in get_track: {e}")
             return {}
@@ -69,14 +59,28 @@ class AudiusService:
     def search_by_artist(self, artist_name: str, limit: int = 20) -> List[Dict]:
         """Search tracks by artist name"""
         try:
+            # Same request as search_tracks(query=artist_name), so they share cache entries
+            return self._get('search', '/v1/tracks/search', {'query': artist_name, 'limit': limit}, [])
+        except Exception as e:
+            print(f"Audius API error in search_by_artist: {e}")
+            return []
+    
+    def stats(self) -> Dict:
+        return {'cache': self.cache.stats() if self.cache else None}
+    
+    def _get(self, endpoint: str, path: str, params: Dict, empty: Any) -> Any:
+        """The response's 'data', through the cache when there is one; raises on failure"""
+        def fetch():
             response = self.session.get(
-                f'{self.host}/v1/tracks/search',
-                params={'query': artist_name, 'limit': limit},
+                f'{self.host}{path}',
+                params=params or None,
                 timeout=10
             )
             response.raise_for_status()
             data = response.json()
-            return data.get('data', [])
-        except Exception as e:
-            print(f"Audius API error in search_by_artist: {e}")
-            return []
\ No newline at end of file
+            return data.get('data', empty)
+        
+        if self.cache is None:
+            return fetch()
+        # The path carries the track id, so it is part of the key
+        return self.cache.get_or_fetch(endpoint, {'path': path, **params}, fetch)
\ No newline at end of file
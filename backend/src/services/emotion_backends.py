@@ -0,0 +1,134 @@
+import os
+import numpy as np
+from typing import Dict
+
+BACKENDS = ('torch', 'onnx', 'onnx-int8')
+ONNX_OPSET = 14
+
+
+class TorchBackend:
+    """The Hugging Face model run in full precision by PyTorch"""
+
+    name = 'torch'
+
+    def __init__(self, model_name: str, threads: int = 0):
+        self.model_name = model_name
+        self.threads = threads
+        self.image_processor = None
+        self.id2label = None
+        self._model = None
+
+    def load(self):
+        import torch
+        from transformers import AutoImageProcessor, AutoModelForImageClassification
+
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        self.image_processor = AutoImageProcessor.from_pretrained(self.model_name)
+        self._model = AutoModelForImageClassification.from_pretrained(self.model_name).eval()
+        self.id2label = self._model.config.id2label
+
+    def logits(self, pixel_values: np.ndarray) -> np.ndarray:
+        import torch
+
+        with torch.inference_mode():
+            return self._model(pixel_values=torch.from_numpy(pixel_values)).logits.numpy()
+
+
+class OnnxBackend:
+    """
+    The same model exported to ONNX and run by ONNX Runtime on the CPU.
+
+    The export (and, with quantize, a dynamic int8 copy of the weights) is
+    made on first load and kept under model_dir, so later loads need neither
+    torch nor the export step.
+    """
+
+    def __init__(self, model_name: str, model_dir: str, quantize: bool = False, threads: int = 0):
+        self.model_name = model_name
+        self.model_dir = os.path.join(model_dir, model_name.replace('/', '--'))
+        self.quantize = quantize
+        self.threads = threads
+        self.name = 'onnx-int8' if quantize else 'onnx'
+        self.image_processor = None
+        self.id2label = None
+        self._session = None
+
+    @property
+    def model_path(self) -> str:
+        return os.path.join(self.model_dir, 'model.int8.onnx' if self.quantize else 'model.onnx')
+
+    def load(self):
+        import onnxruntime
+        from transformers import AutoConfig, AutoImageProcessor
+
+        self.image_processor = AutoImageProcessor.from_pretrained(self.model_name)
+        self.id2label = AutoConfig.from_pretrained(self.model_name).id2label
+        if not os.path.exists(self.model_path):
+            self.export()
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        self._session = onnxruntime.InferenceSession(self.model_path, options,
+                                                     providers=['CPUExecutionProvider'])
+
+    def export(self):
+        """Write model.onnx (and model.int8.onnx when quantizing) for this model"""
+        os.makedirs(self.model_dir, exist_ok=True)
+        fp32_path = os.path.join(self.model_dir, 'model.onnx')
+        if not os.path.exists(fp32_path):
+            import torch
+            from transformers import AutoModelForImageClassification
+
+            model = AutoModelForImageClassification.from_pretrained(self.model_name).eval()
+            size = self.image_processor.size
+            height, width = size.get('height', 224), size.get('width', 224)
+            # Written aside and renamed, so a concurrent loader never reads half a file
+            partial = f"{fp32_path}.{os.getpid()}.tmp"
+            with torch.inference_mode():
+                torch.onnx.export(
+                    model, (torch.zeros(1, 3, height, width),), partial,
+                    input_names=['pixel_values'], output_names=['logits'],
+                    dynamic_axes={'pixel_values': {0: 'batch'}, 'logits': {0: 'batch'}},
+                    opset_version=ONNX_OPSET
+                )
+            os.replace(partial, fp32_path)
+
+        if self.quantize and not os.path.exists(self.model_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            partial = f"{self.model_path}.{os.getpid()}.tmp"
+            quantize_dynamic(fp32_path, partial, weight_type=QuantType.QInt8)
+            os.replace(partial, self.model_path)
+
+    def logits(self, pixel_values: np.ndarray) -> np.ndarray:
+        return self._session.run(['logits'], {'pixel_values': pixel_values.astype(np.float32)})[0]
+
+
+def create_backend(name: str, model_name: str, model_dir: str = 'models', threads: int = 0):
+    """
+    Inference backend by name: 'torch', 'onnx' or 'onnx-int8'.
+
+    Raises:
+        ValueError: If the name is not one of BACKENDS
+    """
+    if name == 'torch':
+        return TorchBackend(model_name, threads=threads)
+    if name in ('onnx', 'onnx-int8'):
+        return OnnxBackend(model_name, model_dir, quantize=name == 'onnx-int8', threads=threads)
+    raise ValueError(f"Unknown emotion backend '{name}', expected one of {', '.join(BACKENDS)}")
+
+
+def top_k_scores(logits: np.ndarray, id2label: Dict, k: int) -> list:
+    """Softmax each row of logits and keep the k best labels, as the pipeline reports them"""
+    logits = logits.astype(np.float32)
+    exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    probabilities = exp / exp.sum(axis=-1, keepdims=True)
+    k = min(k, probabilities.shape[-1])
+    order = np.argsort(-probabilities, axis=-1, kind='stable')[:, :k]
+    return [
+        [{'label': id2label[int(i)], 'score': float(row[i])} for i in row_order]
+        for row, row_order in zip(probabilities, order)
+    ]
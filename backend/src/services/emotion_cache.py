@@ -0,0 +1,111 @@
+import hashlib
+import json
+import threading
+import cv2
+import numpy as np
+from typing import Callable, Dict, Optional
+from src.utils.cache import LRUCache
+
+
+def content_hash(image_bytes: bytes) -> str:
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def dhash(img: np.ndarray) -> int:
+    """64-bit difference hash: which neighbouring pixels get brighter on a 9x8 thumbnail"""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    thumbnail = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = np.packbits(thumbnail[:, 1:] > thumbnail[:, :-1])
+    return int.from_bytes(bits.tobytes(), 'big')
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class EmotionResultCache:
+    """
+    Analysis results of recently seen images.
+
+    Results are keyed by the SHA-256 of the uploaded bytes. With
+    perceptual_distance set, each entry also keeps a difference hash of the
+    decoded image, and an exact miss falls back to the nearest entry within
+    that many differing bits, so a re-encoded or slightly re-cropped copy of
+    the same selfie is recognised too.
+
+    Args:
+        max_entries: Maximum number of results kept
+        max_bytes: Bound on the JSON size of all kept results
+        perceptual_distance: Largest Hamming distance counted as the same image (None = exact only)
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 8 * 1024 * 1024,
+                 perceptual_distance: Optional[int] = None):
+        self.perceptual_distance = perceptual_distance
+        self._entries = LRUCache(
+            max_entries=max_entries,
+            max_size=max_bytes,
+            sizeof=lambda entry: len(json.dumps(entry[1]))
+        )
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.perceptual_hits = 0
+        self.misses = 0
+
+    @property
+    def perceptual(self) -> bool:
+        return self.perceptual_distance is not None
+
+    def get(self, digest: str, fingerprint: Callable[[], int] = None) -> Optional[Dict]:
+        """
+        Cached result for an image, or None.
+
+        Args:
+            digest: content_hash of the image
+            fingerprint: Returns the image's dhash; only called after an exact
+                miss, so an exact hit never decodes the image
+        """
+        entry = self._entries.get(digest)
+        if entry is not None:
+            self._count('exact_hits')
+            return dict(entry[1])
+
+        if self.perceptual and fingerprint is not None:
+            target = fingerprint()
+            nearest = None
+            for key, (candidate, _) in self._entries.items():
+                if candidate is None:
+                    continue
+                distance = hamming(target, candidate)
+                if distance <= self.perceptual_distance and (nearest is None or distance < nearest[0]):
+                    nearest = (distance, key)
+            if nearest is not None:
+                entry = self._entries.get(nearest[1])
+                if entry is not None:
+                    self._count('perceptual_hits')
+                    return dict(entry[1])
+
+        self._count('misses')
+        return None
+
+    def put(self, digest: str, result: Dict, fingerprint: int = None):
+        self._entries.put(digest, (fingerprint, dict(result)))
+
+    def stats(self) -> Dict:
+        entries = self._entries.stats()
+        with self._lock:
+            lookups = self.exact_hits + self.perceptual_hits + self.misses
+            return {
+                'entries': entries['entries'],
+                'bytes': entries['size'],
+                'evictions': entries['evictions'],
+                'exact_hits': self.exact_hits,
+                'perceptual_hits': self.perceptual_hits,
+                'misses': self.misses,
+                'hit_rate': (self.exact_hits + self.perceptual_hits) / lookups if lookups else 0.0,
+                'perceptual_distance': self.perceptual_distance
+            }
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
@@ -1,63 +1,349 @@
+import os
+import threading
+import time
 import cv2
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
-from transformers import pipeline
+from typing import Dict, List, Optional
+from src.services.emotion_backends import create_backend, top_k_scores
+from src.services.emotion_cache import EmotionResultCache, content_hash, dhash
+from src.services.face_detection import FaceDetector
+from src.services.inference_worker import InferenceClient, InferenceWorkerError
+from src.services.text_emotion import TextEmotionAnalyzer
+from src.utils.batching import MicroBatcher
 from src.utils.helpers import map_emotion_to_mood
 
+
+class ModelNotReadyError(Exception):
+    """Raised when a face needs classifying before the emotion model has loaded"""
+
+    def __init__(self, state: str, retry_after: int):
+        super().__init__(f'Emotion model is {state}')
+        self.state = state
+        self.retry_after = retry_after
+
+
 class EmotionService:
-    def __init__(self, model_name: str):
-        self.classifier = pipeline("image-classification", model=model_name)
-        self.face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        )
-    
+    """
+    Facial and text emotion analysis.
+
+    Face crops are preprocessed on the request thread and classified by a
+    micro-batching worker, so concurrent uploads share one forward pass
+    instead of competing for inference threads with batch-size-1 calls. The
+    forward pass runs on the configured backend (see emotion_backends).
+
+    Model libraries are only imported when the model loads, so
+    constructing the service is cheap; call start_warmup() (or load()) to
+    bring the model up and check ready before routing faces to it. With an
+    inference_client, the model lives in a separate worker process instead
+    and loading means waiting for that worker to report ready.
+    """
+
+    def __init__(self, model_name: str, batch_size: int = 8, batch_wait_ms: float = 5.0,
+                 torch_threads: int = 0, top_k: int = 5, ready_timeout: float = 0,
+                 retry_after: int = 5, backend: str = 'torch', model_dir: str = 'models',
+                 face_detector: FaceDetector = None, result_cache: EmotionResultCache = None,
+                 decode_threads: int = 0, text_analyzer: TextEmotionAnalyzer = None,
+                 inference_client: InferenceClient = None, worker_timeout: float = 120):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.batch_wait_ms = batch_wait_ms
+        self.backend = create_backend(backend, model_name, model_dir, threads=torch_threads)
+        self.top_k = top_k
+        self.ready_timeout = ready_timeout
+        self.retry_after = retry_after
+        self.face_detector = face_detector or FaceDetector()
+        self.result_cache = result_cache
+        self.decode_threads = decode_threads or os.cpu_count() or 1
+        self.text_analyzer = text_analyzer or TextEmotionAnalyzer.from_file()
+        self.inference_client = inference_client
+        self.worker_timeout = worker_timeout
+
+        self.state = 'pending'
+        self.error = None
+        self.load_seconds = None
+        self._settled = threading.Event()
+        self._load_lock = threading.Lock()
+        self._batcher = None
+        self._batcher_pid = None
+        self._batcher_lock = threading.Lock()
+        self._resume_warmup = False
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    @property
+    def ready(self) -> bool:
+        if self._resume_warmup:
+            self._resume_warmup = False
+            self.start_warmup()
+        return self.state == 'ready'
+
+    def start_warmup(self):
+        """Load the model on a daemon thread; a no-op once loading has started"""
+        with self._load_lock:
+            if self.state in ('loading', 'ready'):
+                return
+            self.state = 'loading'
+            self._settled.clear()
+        threading.Thread(target=self.load, kwargs={'warm': True},
+                         name='emotion-warmup', daemon=True).start()
+
+    def _after_fork(self):
+        # Locks may have been held by a parent thread that doesn't exist
+        # here, and a warm-up still running in the parent never finishes in
+        # this process, so it is started again on the next readiness check
+        self._load_lock = threading.Lock()
+        self._batcher_lock = threading.Lock()
+        self._settled = threading.Event()
+        if self.state == 'loading':
+            self.state = 'pending'
+            self._resume_warmup = True
+        elif self.state != 'pending':
+            self._settled.set()
+
+    def load(self, warm: bool = False):
+        """
+        Import the backend's libraries and load the model, exporting it first
+        if the backend needs a converted copy that doesn't exist yet.
+
+        Args:
+            warm: Also run one forward pass, so the first real request does not
+                pay for allocator and kernel warm-up. Leave off when loading in
+                a process that will fork afterwards.
+        """
+        with self._load_lock:
+            if self.state == 'ready':
+                return
+            self.state = 'loading'
+            self._settled.clear()
+            started = time.perf_counter()
+            try:
+                if self.inference_client is not None:
+                    self._wait_for_worker()
+                else:
+                    self.backend.load()
+                    if warm:
+                        self._classify_batch([self._preprocess(Image.new('RGB', (224, 224)))])
+                self.error = None
+                self.state = 'ready'
+            except Exception as e:
+                print(f"Error loading emotion model: {e}")
+                self.error = str(e)
+                self.state = 'failed'
+            finally:
+                self.load_seconds = round(time.perf_counter() - started, 3)
+                self._settled.set()
+
+    def _wait_for_worker(self):
+        deadline = time.time() + self.worker_timeout
+        while True:
+            try:
+                status = self.inference_client.status()
+                if status['state'] == 'ready':
+                    return
+                if status['state'] == 'failed':
+                    raise RuntimeError(status['error'])
+            except InferenceWorkerError as e:
+                if time.time() >= deadline:
+                    raise RuntimeError(str(e))
+            if time.time() >= deadline:
+                raise RuntimeError(f"Inference worker not ready after {self.worker_timeout}s")
+            time.sleep(1)
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        """Block until loading has finished (or timeout); True if the model is ready"""
+        self._settled.wait(timeout)
+        return self.ready
+
+    def status(self) -> Dict:
+        return {
+            'model': self.model_name,
+            'backend': self.backend.name,
+            'inference': 'worker' if self.inference_client is not None else 'local',
+            'state': self.state,
+            'load_seconds': self.load_seconds,
+            'error': self.error
+        }
+
     def detect_emotion_from_image(self, image_bytes: bytes) -> dict:
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        if img is None:
-            raise ValueError("Invalid image")
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
-        if len(faces) == 0:
-            raise ValueError("No face detected in image")
-        x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
-        face_img = img[y:y+h, x:x+w]
+        decoded = None
+        if self.result_cache is not None:
+            digest = content_hash(image_bytes)
+
+            def fingerprint() -> int:
+                nonlocal decoded
+                decoded = self.face_detector.decode(image_bytes)
+                return dhash(decoded[0])
+
+            cached = self.result_cache.get(digest, fingerprint)
+            if cached is not None:
+                return cached
+
+        # Fail fast rather than detecting for a model that isn't there
+        self._require_model()
+        decoded = decoded or self.face_detector.decode(image_bytes)
+        face_img = self.face_detector.largest_face(image_bytes, decoded)
         face_rgb = cv2.cvtColor(face_img, cv2.COLOR_BGR2RGB)
-        pil_img = Image.fromarray(face_rgb)
-        results = self.classifier(pil_img)
-        top_emotion = results[0]
-        emotion = top_emotion['label'].lower()
-        confidence = top_emotion['score']
-        mood_coords = map_emotion_to_mood(emotion)
+        result = emotion_result(self.classify_face(face_rgb))
+        if self.result_cache is not None:
+            self.result_cache.put(digest, result, dhash(decoded[0]) if self.result_cache.perceptual else None)
+        return result
+    
+    def analyze_images(self, images: List[bytes]) -> List[Dict]:
+        """
+        Every face in every image, largest first within each image.
+
+        Images are decoded, searched and prepared for the classifier on a
+        thread pool, then all their faces go to the micro-batcher together,
+        so they share forward passes. An image that fails to decode gets an
+        'error' instead of 'faces'; one without faces gets an empty list.
+        """
+        self._require_model()
+        with ThreadPoolExecutor(max_workers=max(1, min(self.decode_threads, len(images))),
+                                thread_name_prefix='emotion-decode') as pool:
+            prepared = list(pool.map(self._prepare_faces, images))
+
+        batcher = self._get_batcher()
+        pending = [
+            [(box, batcher.submit(face)) for box, face in faces] if faces is not None else None
+            for faces, _ in prepared
+        ]
+        results = []
+        for (_, error), faces in zip(prepared, pending):
+            if faces is None:
+                results.append({'error': error})
+                continue
+            results.append({'faces': [
+                {'box': box, **emotion_result(self._result(future))} for box, future in faces
+            ]})
+        return results
+    
+    def _prepare_faces(self, image_bytes: bytes):
+        """([(full-resolution box, classifier input)] or None, error) for one image"""
+        try:
+            img, reduction = self.face_detector.decode(image_bytes)
+        except ValueError as e:
+            return None, str(e)
+        faces = sorted(self.face_detector.detect(img), key=lambda f: f[2] * f[3], reverse=True)
+        prepared = []
+        for box in faces:
+            crop = self.face_detector.crop(image_bytes, img, reduction, box)
+            face = self._face_input(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB))
+            prepared.append(([int(v * reduction) for v in box], face))
+        return prepared, None
+    
+    def classify_face(self, face) -> List[Dict]:
+        """Top-k emotion labels for one RGB face crop (array or PIL image), classified in a shared batch"""
+        return self.classify_faces([face])[0]
+    
+    def classify_faces(self, faces: list) -> List[List[Dict]]:
+        """classify_face for several crops, submitted together so they can share a batch"""
+        self._require_model()
+        batcher = self._get_batcher()
+        futures = [batcher.submit(self._face_input(face)) for face in faces]
+        return [self._result(future) for future in futures]
+    
+    def _face_input(self, face):
+        """What the batcher takes for a face: pixel values here, raw RGB for the worker"""
+        if self.inference_client is not None:
+            return np.asarray(face.convert('RGB') if isinstance(face, Image.Image) else face, dtype=np.uint8)
+        return self._preprocess(face if isinstance(face, Image.Image) else Image.fromarray(face))
+    
+    def _result(self, future) -> List[Dict]:
+        try:
+            return future.result()
+        except InferenceWorkerError as e:
+            if e.state is None:
+                raise
+            # The worker went away or lost its model: report not ready and
+            # wait for it in the background
+            with self._load_lock:
+                if self.state == 'ready':
+                    self.state = 'failed'
+                    self.error = str(e)
+            self.start_warmup()
+            raise ModelNotReadyError(self.state, self.retry_after)
+    
+    def _preprocess(self, face: Image.Image) -> np.ndarray:
+        return self.backend.image_processor(images=face, return_tensors='np')['pixel_values'][0]
+    
+    def _classify_batch(self, pixel_values: List[np.ndarray]) -> List[List[Dict]]:
+        """One forward pass over a batch of preprocessed faces, scored like the pipeline"""
+        logits = self.backend.logits(np.stack(pixel_values))
+        return top_k_scores(logits, self.backend.id2label, self.top_k)
+    
+    def _require_model(self):
+        if self.ready:
+            return
+        if self.state == 'pending':
+            # Lazy loading: nobody started a warm-up, so this request pays for it
+            self.load()
+        elif self.state == 'failed':
+            # Try again in the background; this request still gets turned away
+            self.start_warmup()
+        elif self.ready_timeout:
+            self.wait_ready(self.ready_timeout)
+        if self.state != 'ready':
+            raise ModelNotReadyError(self.state, self.retry_after)
+    
+    def _get_batcher(self) -> MicroBatcher:
+        # Created on first use in each process: a batcher built in a
+        # pre-forking master would have no worker thread in the children
+        with self._batcher_lock:
+            if self._batcher is None or self._batcher_pid != os.getpid():
+                self._batcher = MicroBatcher(
+                    self._classify_batch if self.inference_client is None else self.inference_client.classify,
+                    max_batch_size=self.batch_size,
+                    max_wait_ms=self.batch_wait_ms,
+                    name='emotion-batcher'
+                )
+                self._batcher_pid = os.getpid()
+            return self._batcher
+    
+    def stats(self) -> Dict:
+        batcher = self._batcher if self._batcher_pid == os.getpid() else None
         return {
-            'emotion': emotion,
-            'confidence': confidence,
-            'valence': mood_coords['valence'],
-            'arousal': mood_coords['arousal'],
-            'all_emotions': results
+            'model': self.status(),
+            'batching': batcher.stats() if batcher else None,
+            'result_cache': self.result_cache.stats() if self.result_cache else None
         }
     
     def analyze_text_emotion(self, text: str) -> dict:
-        text_lower = text.lower()
-        emotion_keywords = {
-            'happy': ['happy', 'joy', 'excited', 'great', 'wonderful', 'love'],
-            'sad': ['sad', 'unhappy', 'down', 'depressed', 'miserable'],
-            'angry': ['angry', 'mad', 'furious', 'annoyed', 'frustrated'],
-            'calm': ['calm', 'peaceful', 'relaxed', 'serene'],
-            'anxious': ['anxious', 'worried', 'nervous', 'stressed']
-        }
-        detected_emotion = 'neutral'
-        max_matches = 0
-        for emotion, keywords in emotion_keywords.items():
-            matches = sum(1 for keyword in keywords if keyword in text_lower)
-            if matches > max_matches:
-                max_matches = matches
-                detected_emotion = emotion
-        mood_coords = map_emotion_to_mood(detected_emotion)
-        confidence = min(0.5 + (max_matches * 0.1), 0.95)
-        return {
-            'emotion': detected_emotion,
-            'confidence': confidence,
-            'valence': mood_coords['valence'],
-            'arousal': mood_coords['arousal']
-        }
+        return self.text_analyzer.analyze(text)
+    
+    def analyze_texts(self, texts: List[str]) -> List[Dict]:
+        return self.text_analyzer.analyze_many(texts)
+
+def emotion_result(scores: List[Dict]) -> Dict:
+    """Analysis result for one face from its top-k classifier scores"""
+    emotion = scores[0]['label'].lower()
+    mood_coords = map_emotion_to_mood(emotion)
+    return {
+        'emotion': emotion,
+        'confidence': scores[0]['score'],
+        'valence': mood_coords['valence'],
+        'arousal': mood_coords['arousal'],
+        'all_emotions': scores
+    }
+
+
+def group_mood(faces: List[Dict]) -> Optional[Dict]:
+    """
+    One mood for a group of faces: the emotion with the highest mean score
+    across them, and their mean valence and arousal.
+    """
+    if not faces:
+        return None
+    totals = {}
+    for face in faces:
+        for item in face['all_emotions']:
+            label = item['label'].lower()
+            totals[label] = totals.get(label, 0.0) + item['score']
+    emotion = max(totals, key=totals.get)
+    return {
+        'emotion': emotion,
+        'confidence': totals[emotion] / len(faces),
+        'valence': sum(face['valence'] for face in faces) / len(faces),
+        'arousal': sum(face['arousal'] for face in faces) / len(faces),
+        'faces': len(faces)
+    }
@@ -0,0 +1,182 @@
+import threading
+import time
+import uuid
+import cv2
+import numpy as np
+from collections import deque
+from typing import Dict, Optional
+from src.services.emotion_service import EmotionService
+from src.utils.cache import LRUCache
+from src.utils.helpers import map_emotion_to_mood
+
+# Search area around the last face box, as a fraction of its size on each side
+TRACK_MARGIN = 0.5
+
+
+class StreamSession:
+    """Tracking and smoothing state for one user's frame stream"""
+
+    def __init__(self, session_id: str, user_id: str, window: int):
+        self.id = session_id
+        self.user_id = user_id
+        self.lock = threading.Lock()
+        self.last_seen = time.time()
+        self.frames = 0
+        self.detections = 0
+        self.classifications = 0
+        self.frame_shape = None
+        self.box = None  # (x, y, w, h) in decoded-frame coordinates
+        self.template = None
+        self.frames_since_classify = None
+        self.window = deque(maxlen=window)  # label -> score, one per classification
+        self.mood = None
+        self.persisted_emotion = None
+
+    def summary(self) -> Dict:
+        return {
+            'session_id': self.id,
+            'frames': self.frames,
+            'detections': self.detections,
+            'classifications': self.classifications,
+            'mood': self.mood
+        }
+
+
+class EmotionStreamService:
+    """
+    Live mood tracking over a stream of webcam frames.
+
+    The face found in one frame is followed into the next by template
+    matching around its last position; the detector only runs again when
+    the match is lost. The classifier sees every classify_every-th frame,
+    and the reported mood is the average of the last window classifications,
+    flagged as changed only when its top emotion differs from the one last
+    persisted. Sessions live in this process, so a multi-worker deployment
+    needs sticky routing by session id.
+
+    Args:
+        emotion_service: Detector and classifier the frames go through
+        classify_every: Classify one frame in this many
+        window: Classifications averaged into the reported mood
+        track_threshold: Lowest normalised match score that counts as still tracking
+        idle_seconds: Sessions without frames for this long are closed
+        max_sessions: Open sessions kept; the least recently used is dropped beyond it
+    """
+
+    def __init__(self, emotion_service: EmotionService, classify_every: int = 5, window: int = 5,
+                 track_threshold: float = 0.5, idle_seconds: float = 60, max_sessions: int = 256):
+        self.emotion_service = emotion_service
+        self.classify_every = max(1, classify_every)
+        self.window = max(1, window)
+        self.track_threshold = track_threshold
+        self.idle_seconds = idle_seconds
+        self._sessions = LRUCache(max_entries=max_sessions)
+
+    def open(self, user_id: str) -> StreamSession:
+        session = StreamSession(uuid.uuid4().hex, user_id, self.window)
+        self._sessions.put(session.id, session)
+        return session
+
+    def get(self, session_id: str, user_id: str) -> Optional[StreamSession]:
+        """The user's open session, or None if it is unknown, someone else's or idle too long"""
+        session = self._sessions.get(session_id)
+        if session is None or session.user_id != user_id:
+            return None
+        if time.time() - session.last_seen > self.idle_seconds:
+            self._sessions.pop(session_id)
+            return None
+        return session
+
+    def close(self, session_id: str):
+        self._sessions.pop(session_id)
+
+    def process_frame(self, session: StreamSession, image_bytes: bytes) -> Dict:
+        """
+        Track, and when due classify, one encoded frame.
+
+        Raises:
+            ValueError: If the frame is not a decodable image
+            ModelNotReadyError: If a classification is due before the model has loaded
+        """
+        detector = self.emotion_service.face_detector
+        with session.lock:
+            session.last_seen = time.time()
+            img, reduction = detector.decode(image_bytes)
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            if gray.shape != session.frame_shape:
+                session.frame_shape = gray.shape
+                session.box = None
+
+            tracked = session.box is not None and self._track(session, gray)
+            if not tracked:
+                faces = detector.detect(img)
+                session.detections += 1
+                if not faces:
+                    session.box = session.template = None
+                else:
+                    session.box = max(faces, key=lambda f: f[2] * f[3])
+                    x, y, w, h = session.box
+                    session.template = gray[y:y+h, x:x+w].copy()
+            session.frames += 1
+
+            classified = changed = False
+            if session.box is not None:
+                due = session.frames_since_classify is None or session.frames_since_classify + 1 >= self.classify_every
+                if due:
+                    face = detector.crop(image_bytes, img, reduction, session.box)
+                    scores = self.emotion_service.classify_face(cv2.cvtColor(face, cv2.COLOR_BGR2RGB))
+                    session.window.append({item['label'].lower(): item['score'] for item in scores})
+                    session.classifications += 1
+                    session.frames_since_classify = 0
+                    session.mood = self._smoothed(session.window)
+                    classified = True
+                    changed = session.mood['emotion'] != session.persisted_emotion
+                    if changed:
+                        session.persisted_emotion = session.mood['emotion']
+                else:
+                    session.frames_since_classify += 1
+
+            return {
+                'frame': session.frames,
+                'face': session.box is not None,
+                'box': [int(v * reduction) for v in session.box] if session.box is not None else None,
+                'tracked': tracked,
+                'classified': classified,
+                'mood': session.mood,
+                'changed': changed
+            }
+
+    def stats(self) -> Dict:
+        return {
+            'sessions': len(self._sessions),
+            'classify_every': self.classify_every,
+            'window': self.window
+        }
+
+    def _track(self, session: StreamSession, gray: np.ndarray) -> bool:
+        """Move session.box to the best template match near its last position"""
+        x, y, w, h = session.box
+        margin_x, margin_y = int(w * TRACK_MARGIN), int(h * TRACK_MARGIN)
+        x0, y0 = max(0, x - margin_x), max(0, y - margin_y)
+        x1, y1 = min(gray.shape[1], x + w + margin_x), min(gray.shape[0], y + h + margin_y)
+        if x1 - x0 < w or y1 - y0 < h:
+            return False
+        match = cv2.matchTemplate(gray[y0:y1, x0:x1], session.template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (dx, dy) = cv2.minMaxLoc(match)
+        if score < self.track_threshold:
+            return False
+        session.box = (x0 + dx, y0 + dy, w, h)
+        return True
+
+    def _smoothed(self, window: deque) -> Dict:
+        labels = set().union(*window)
+        averages = {label: sum(scores.get(label, 0.0) for scores in window) / len(window) for label in labels}
+        emotion = max(averages, key=averages.get)
+        mood_coords = map_emotion_to_mood(emotion)
+        return {
+            'emotion': emotion,
+            'confidence': averages[emotion],
+            'valence': mood_coords['valence'],
+            'arousal': mood_coords['arousal'],
+            'samples': len(window)
+        }
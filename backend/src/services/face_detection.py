@@ -0,0 +1,134 @@
+import io
+import threading
+import cv2
+import numpy as np
+from PIL import Image
+from typing import List, Optional, Tuple
+
+DETECTORS = ('haar', 'yunet')
+# imdecode flags that let the JPEG decoder skip detail it would throw away
+REDUCED_DECODE = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                  4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+
+def image_size(image_bytes: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) from the image header, without decoding pixels"""
+    try:
+        return Image.open(io.BytesIO(image_bytes)).size
+    except Exception:
+        return None
+
+
+class FaceDetector:
+    """
+    Finds faces on a bounded-size proxy of the upload.
+
+    The image is decoded at the largest power-of-two reduction that still
+    covers detect_size on its long side, then scaled down to detect_size for
+    detection, so the cost no longer grows with the camera's resolution. A
+    box is mapped back to full resolution (decoding the full image) only
+    when the reduced image would give a crop smaller than min_crop.
+
+    Args:
+        detector: 'haar' (Haar cascade) or 'yunet' (OpenCV's DNN detector)
+        detect_size: Long side of the image detection runs on; 0 = no limit
+        min_crop: Smallest face crop, in pixels, worth classifying as is
+        yunet_model: Path to the YuNet ONNX model, for the 'yunet' detector
+        score_threshold: Lowest YuNet confidence kept as a face
+    """
+
+    def __init__(self, detector: str = 'haar', detect_size: int = 640, min_crop: int = 224,
+                 yunet_model: str = None, score_threshold: float = 0.7):
+        if detector not in DETECTORS:
+            raise ValueError(f"Unknown face detector '{detector}', expected one of {', '.join(DETECTORS)}")
+        if detector == 'yunet' and not (yunet_model and hasattr(cv2, 'FaceDetectorYN')):
+            raise ValueError("The yunet face detector needs OpenCV 4.5.4+ and a model path")
+        self.detector = detector
+        self.detect_size = detect_size
+        self.min_crop = min_crop
+        self.yunet_model = yunet_model
+        self.score_threshold = score_threshold
+        self.face_cascade = cv2.CascadeClassifier(
+            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        )
+        # FaceDetectorYN keeps its input size as state, so each thread gets its own
+        self._local = threading.local()
+
+    def decode(self, image_bytes: bytes) -> Tuple[np.ndarray, int]:
+        """
+        Decode at the largest reduction that keeps detect_size on the long side.
+
+        Returns:
+            (BGR image, reduction factor)
+
+        Raises:
+            ValueError: If the bytes are not a decodable image
+        """
+        size = image_size(image_bytes)
+        reduction = 1
+        if size and self.detect_size:
+            while reduction < 8 and max(size) / (reduction * 2) >= self.detect_size:
+                reduction *= 2
+        img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), REDUCED_DECODE[reduction])
+        if img is None:
+            raise ValueError("Invalid image")
+        return img, reduction
+
+    def detect(self, img: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """(x, y, w, h) boxes in img's coordinates, found on a proxy of at most detect_size"""
+        height, width = img.shape[:2]
+        scale = min(1.0, self.detect_size / max(height, width)) if self.detect_size else 1.0
+        proxy = img if scale == 1.0 else cv2.resize(img, (max(1, round(width * scale)), max(1, round(height * scale))),
+                                                  interpolation=cv2.INTER_AREA)
+        boxes = self._detect_yunet(proxy) if self.detector == 'yunet' else self._detect_haar(proxy)
+
+        faces = []
+        for x, y, w, h in boxes:
+            x0, y0 = max(0, int(x / scale)), max(0, int(y / scale))
+            x1, y1 = min(width, int((x + w) / scale)), min(height, int((y + h) / scale))
+            if x1 > x0 and y1 > y0:
+                faces.append((x0, y0, x1 - x0, y1 - y0))
+        return faces
+
+    def largest_face(self, image_bytes: bytes, decoded: Tuple[np.ndarray, int] = None) -> np.ndarray:
+        """
+        BGR crop of the largest face in an encoded image.
+
+        Args:
+            image_bytes: The encoded image
+            decoded: What decode(image_bytes) returned, if the caller already has it
+
+        Raises:
+            ValueError: If the image is invalid or has no face
+        """
+        img, reduction = decoded or self.decode(image_bytes)
+        faces = self.detect(img)
+        if len(faces) == 0:
+            raise ValueError("No face detected in image")
+        return self.crop(image_bytes, img, reduction, max(faces, key=lambda f: f[2] * f[3]))
+
+    def crop(self, image_bytes: bytes, img: np.ndarray, reduction: int,
+             box: Tuple[int, int, int, int]) -> np.ndarray:
+        """Crop box (in img's coordinates), from the full-resolution image if img is too coarse"""
+        x, y, w, h = box
+        if reduction > 1 and min(w, h) < self.min_crop:
+            full = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+            if full is not None:
+                sy, sx = full.shape[0] / img.shape[0], full.shape[1] / img.shape[1]
+                img = full
+                x, y, w, h = int(x * sx), int(y * sy), int(w * sx), int(h * sy)
+        return img[y:y+h, x:x+w]
+
+    def _detect_haar(self, proxy: np.ndarray) -> list:
+        gray = cv2.cvtColor(proxy, cv2.COLOR_BGR2GRAY)
+        return list(self.face_cascade.detectMultiScale(gray, 1.3, 5))
+
+    def _detect_yunet(self, proxy: np.ndarray) -> list:
+        height, width = proxy.shape[:2]
+        detector = getattr(self._local, 'yunet', None)
+        if detector is None:
+            detector = cv2.FaceDetectorYN.create(self.yunet_model, '', (width, height), self.score_threshold)
+            self._local.yunet = detector
+        detector.setInputSize((width, height))
+        _, found = detector.detect(proxy)
+        return [] if found is None else [tuple(row[:4]) for row in found]
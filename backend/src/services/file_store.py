@@ -0,0 +1,187 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+# Generated artifacts live under one of 256 subdirectories of the output root
+SHARD_CHARS = 2
+
+
+def sharded_path(root: str, stem: str, extension: str) -> str:
+    """
+    Path for a generated artifact, sharded by a hash of its stem.
+
+    Files that share a stem (a render's .wav and .mid) land in the same shard.
+    """
+    shard = hashlib.sha1(stem.encode('utf-8')).hexdigest()[:SHARD_CHARS]
+    directory = os.path.join(root, shard)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{stem}.{extension}")
+
+
+class GeneratedFileStore:
+    """
+    Expiry index for generated artifacts, with a background sweeper.
+
+    Every artifact is registered with its size and expiry time in a SQLite
+    index ordered by expiry, so a sweep reads only the rows that are due and
+    never lists or stats the output directory. A running byte total kept in
+    the same database enforces the disk budget by expiring the soonest-due
+    files early. The index is shared safely by every process on the host.
+    """
+
+    def __init__(self, root: str, ttl_seconds: int = 24 * 3600, max_bytes: Optional[int] = None,
+                 index_path: str = None, batch_size: int = 500):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        os.makedirs(root, exist_ok=True)
+
+        self.index_path = index_path or os.path.join(root, 'index.sqlite')
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS files ('
+                             'path TEXT PRIMARY KEY, size INTEGER NOT NULL, expires_at REAL NOT NULL)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS files_by_expiry ON files (expires_at)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS totals (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            self._db.execute("INSERT OR IGNORE INTO totals VALUES ('bytes', 0)")
+
+        self.files_removed = 0
+        self.bytes_removed = 0
+        self._stop = threading.Event()
+        self._sweeper = None
+
+    def register(self, path: str, ttl_seconds: int = None) -> str:
+        """Start tracking a finished artifact; it is deleted once its TTL has passed"""
+        size = os.path.getsize(path)
+        expires_at = time.time() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock, self._db:
+            previous = self._db.execute('SELECT size FROM files WHERE path = ?', (path,)).fetchone()
+            self._db.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?)', (path, size, expires_at))
+            self._add_bytes(size - (previous[0] if previous else 0))
+        return path
+
+    def adopt_legacy_files(self):
+        """
+        Index artifacts left flat in the output root by earlier versions.
+
+        This is the one place the store lists a directory, and it only looks at
+        the root level: shards and the generation cache are not scanned.
+        """
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.name.startswith(('generated_', 'batch_')):
+                stat = entry.stat()
+                with self._lock, self._db:
+                    inserted = self._db.execute(
+                        'INSERT OR IGNORE INTO files VALUES (?, ?, ?)',
+                        (entry.path, stat.st_size, stat.st_mtime + self.ttl_seconds)
+                    ).rowcount
+                    if inserted:
+                        self._add_bytes(stat.st_size)
+
+    def sweep(self, now: float = None) -> int:
+        """
+        Delete one batch of expired files, then one batch over the disk budget.
+
+        Returns:
+            Number of files removed
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = self._db.execute(
+                'SELECT path, size FROM files WHERE expires_at <= ? ORDER BY expires_at LIMIT ?',
+                (now, self.batch_size)
+            ).fetchall()
+        removed = self._remove(expired)
+
+        if self.max_bytes is not None:
+            with self._lock:
+                over = self._total_bytes() - self.max_bytes
+                candidates = self._db.execute(
+                    'SELECT path, size FROM files ORDER BY expires_at LIMIT ?', (self.batch_size,)
+                ).fetchall() if over > 0 else []
+            evict = []
+            for path, size in candidates:
+                if over <= 0:
+                    break
+                evict.append((path, size))
+                over -= size
+            removed += self._remove(evict)
+        return removed
+
+    def start_sweeper(self, interval: float = 60):
+        """Sweep on a daemon thread every interval seconds until stop() is called"""
+        if self._sweeper is not None:
+            return
+        self._sweeper = threading.Thread(target=self._sweep_loop, args=(interval,),
+                                         name='file-store-sweeper', daemon=True)
+        self._sweeper.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            files = self._db.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+            total = self._total_bytes()
+        return {
+            'files': files,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'files_removed': self.files_removed,
+            'bytes_removed': self.bytes_removed
+        }
+
+    def _sweep_loop(self, interval: float):
+        while not self._stop.is_set():
+            try:
+                # Keep going while full batches come back, so a backlog drains quickly
+                while self.sweep() >= self.batch_size and not self._stop.is_set():
+                    pass
+            except Exception as e:
+                print(f"Error sweeping generated files: {e}")
+            self._stop.wait(interval)
+
+    def _remove(self, rows: list) -> int:
+        removed = 0
+        for path, size in rows:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"Error removing file {path}: {e}")
+                continue
+
+            with self._lock, self._db:
+                # Another process may have swept the same row first
+                if self._db.execute('DELETE FROM files WHERE path = ?', (path,)).rowcount:
+                    self._add_bytes(-size)
+                    removed += 1
+                    self.files_removed += 1
+                    self.bytes_removed += size
+        return removed
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        # SQLite connections must not cross a fork, so a store built in a
+        # pre-forking master reconnects in each worker
+        if self._connection_pid != os.getpid():
+            self._connection = sqlite3.connect(self.index_path, timeout=30, check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection_pid = os.getpid()
+        return self._connection
+
+    def _add_bytes(self, delta: int):
+        self._db.execute("UPDATE totals SET value = value + ? WHERE name = 'bytes'", (delta,))
+
+    def _total_bytes(self) -> int:
+        return self._db.execute("SELECT value FROM totals WHERE name = 'bytes'").fetchone()[0]
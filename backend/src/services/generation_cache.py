@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+from src.utils.cache import LRUCache
+
+
+class GenerationCache:
+    """
+    Content-addressed store of rendered WAV files.
+
+    Deterministic generations are fully described by their parameters (including
+    the seed), so the parameter hash addresses the rendered output. Entries are
+    kept in LRU order and evicted, file included, past the count or byte bounds.
+    Recency lives in the in-memory index only; files are never touched on a
+    hit, so their mtime (and with it Last-Modified and the ETag memo) stays
+    fixed. After a restart the index starts out in write order.
+    """
+
+    def __init__(self, cache_dir: str, max_entries: int = 500, max_bytes: int = 1024 * 1024 * 1024,
+                 version: int = 1):
+        self.cache_dir = cache_dir
+        self.version = version
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.index = LRUCache(
+            max_entries=max_entries,
+            max_size=max_bytes,
+            sizeof=lambda entry: entry[1],
+            on_evict=lambda key, entry: self._remove(entry[0])
+        )
+        self._load()
+
+    def key_for(self, parameters: Dict) -> str:
+        """Cache key for a deterministic generation request"""
+        payload = json.dumps(
+            {'version': self.version, 'parameters': parameters},
+            sort_keys=True, separators=(',', ':')
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Path of the cached WAV for key, or None on a miss"""
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        path = entry[0]
+        if not os.path.exists(path):
+            # Removed behind our back (manual cleanup, another worker's eviction)
+            self.index.pop(key)
+            return None
+        return path
+
+    def put(self, key: str, wav_path: str) -> str:
+        """Move a freshly rendered WAV into the cache and return its new path"""
+        path = self._path_for(key)
+        os.replace(wav_path, path)
+        self.index.put(key, (path, os.path.getsize(path)))
+        return path
+
+    def stats(self) -> Dict:
+        return self.index.stats()
+
+    def _path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def _load(self):
+        """Rebuild the index from disk, oldest render first"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.wav'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-4], entry.path, stat.st_size))
+
+        for _, key, path, size in sorted(entries):
+            self.index.put(key, (path, size))
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def deterministic_parameters(parameters: Dict, quantum: float, user_seed: int = None,
+                             variation: int = 0) -> Dict:
+    """
+    Attach a seed derived from the mood coordinates snapped to the cache grid.
+
+    Requests that land in the same bucket with the same user seed and variation
+    number get the same seed, so nearby moods compose the same piece. The
+    coordinates themselves are left as sent: they are what gets rendered, and
+    snapping them could move a value across a scale or octave threshold.
+    """
+    snapped = dict(parameters)
+    for name in ('valence', 'arousal'):
+        steps = round(snapped[name] / quantum)
+        snapped[name] = round(min(1.0, max(0.0, steps * quantum)), 6)
+
+    material = {'parameters': snapped, 'user_seed': user_seed}
+    if variation:
+        material['variation'] = variation
+    material = json.dumps(material, sort_keys=True, separators=(',', ':'))
+    return dict(parameters, seed=int(hashlib.sha256(material.encode('utf-8')).hexdigest()[:8], 16))
@@ -0,0 +1,368 @@
+import math
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional
+from functools import partial
+from src.services.music_generator import MusicGenerator
+from src.utils.timing import StageTimer
+
+# Progress is reported in steps of this many percent
+PROGRESS_STEP = 5
+
+# Per-process generator used by pool workers, built once by _init_worker
+_worker_generator = None
+# Carries (job_id, percent, timings) from pool workers back to the web process
+_progress_queue = None
+
+
+def _init_worker(output_dir: str, write_midi: bool, progress_queue=None):
+    global _worker_generator, _progress_queue
+    _worker_generator = MusicGenerator(output_dir, write_midi=write_midi)
+    _progress_queue = progress_queue
+
+
+def _run_in_worker(job_id: str, method: str, kwargs: Dict):
+    report = partial(_send_progress, job_id) if _progress_queue is not None else None
+    return _timed_call(_worker_generator, method, kwargs, report)
+
+
+def _send_progress(job_id: str, percent: int, timings: Dict):
+    _progress_queue.put((job_id, percent, timings))
+
+
+def _timed_call(generator: MusicGenerator, method: str, kwargs: Dict,
+                report: Callable[[int, Dict], None] = None):
+    """
+    Run a MusicGenerator method; returns (result, stage timings).
+
+    report, if given, receives (percent, timings so far) every PROGRESS_STEP percent.
+    """
+    timer = StageTimer()
+    progress = None
+    if report is not None:
+        reported = [-PROGRESS_STEP]
+
+        def progress(fraction: float):
+            percent = int(fraction * 100)
+            if percent - reported[0] >= PROGRESS_STEP:
+                reported[0] = percent
+                report(percent, timer.as_dict())
+
+    result = getattr(generator, method)(timer=timer, progress=progress, **kwargs)
+    return result, timer.as_dict()
+
+
+class QueueFullError(Exception):
+    """Raised when the admission queue cannot take another generation job"""
+
+    def __init__(self, retry_after: int):
+        super().__init__('Generation queue is full')
+        self.retry_after = retry_after
+
+
+class GenerationExecutor:
+    """
+    Runs generation jobs on a fixed pool of worker processes.
+
+    Jobs wait in a bounded FIFO admission queue and are handed to the pool only
+    when a worker is free, so the queue position of every waiting job is known
+    exactly. Status callbacks run in the web process; workers only synthesize
+    and send progress back over a multiprocessing queue. on_done callbacks run
+    on their own thread, so a slow database write never holds up the pool's
+    result handling.
+    """
+
+    def __init__(self, generator: MusicGenerator, max_workers: int = None,
+                 max_queue: int = 32, retry_after: int = 5, mode: str = 'process'):
+        self.generator = generator
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.mode = mode
+
+        self._pool = None
+        self._queue = deque()  # (job_id, method, kwargs, on_start, on_done)
+        self._running = set()
+        self._progress_callbacks = {}  # job_id -> on_progress
+        self._progress_queue = None
+        self._progress_listener = None
+        self._callbacks = None
+        self._callbacks_pid = None
+        self._lock = threading.Lock()
+        self._avg_runtime = None
+        self._closed = False
+
+    def submit(self, job_id: str, kwargs: Dict,
+               on_start: Callable[[str], None],
+               on_done: Callable[..., None],
+               method: str = 'generate_music',
+               on_progress: Callable[[str, int, Dict], None] = None) -> int:
+        """
+        Admit a job.
+
+        Args:
+            job_id: Generation job ID
+            kwargs: Keyword arguments for the MusicGenerator method
+            on_start: Called with job_id when a worker picks the job up
+            on_done: Called with (job_id, result, error, timings=...) when the job
+                finishes; timings maps stage names to seconds, and error is a
+                CancelledError if the job was dropped by a shutdown
+            method: MusicGenerator method to run ('generate_music' or 'generate_batch')
+            on_progress: Called with (job_id, percent, timings) as the job renders
+
+        Returns:
+            Queue position (1-based), or 0 if the job started immediately
+
+        Raises:
+            QueueFullError: If the admission queue is full
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Generation executor is shut down')
+            if len(self._queue) >= self.max_queue:
+                raise QueueFullError(self._estimate_wait())
+            self._queue.append((job_id, method, kwargs, on_start, on_done))
+            if on_progress is not None:
+                self._progress_callbacks[job_id] = on_progress
+            position = len(self._queue)
+            started = self._dispatch()
+        self._launch(started)
+
+        return 0 if any(entry[0] == job_id for entry, _ in started) else position
+
+    def retry_after_if_full(self) -> Optional[int]:
+        """Retry hint in seconds if the admission queue is full, otherwise None"""
+        with self._lock:
+            if len(self._queue) >= self.max_queue:
+                return self._estimate_wait()
+        return None
+
+    def reserve(self, job_id: str) -> Optional[int]:
+        """
+        Claim a worker slot for work that runs outside the pool (a streamed
+        render on the request thread), so it counts against the same capacity.
+
+        Returns:
+            None if the slot was claimed, otherwise a retry hint in seconds.
+            A claimed slot must be given back with release(job_id).
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Generation executor is shut down')
+            if self._queue or len(self._running) >= self.max_workers:
+                return self._estimate_wait()
+            self._running.add(job_id)
+        return None
+
+    def release(self, job_id: str):
+        """Give back a slot claimed with reserve() and start the next queued job"""
+        with self._lock:
+            self._running.discard(job_id)
+            started = self._dispatch()
+        self._launch(started)
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """1-based position of a waiting job, 0 if running, None if unknown"""
+        with self._lock:
+            if job_id in self._running:
+                return 0
+            for position, entry in enumerate(self._queue, start=1):
+                if entry[0] == job_id:
+                    return position
+        return None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'workers': self.max_workers,
+                'running': len(self._running),
+                'queued': len(self._queue),
+                'max_queue': self.max_queue
+            }
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            self._closed = True
+            dropped = list(self._queue)
+            self._queue.clear()
+            for entry in dropped:
+                self._progress_callbacks.pop(entry[0], None)
+            pool, self._pool = self._pool, None
+        for job_id, _, _, _, on_done in dropped:
+            self._call_done(on_done, job_id, None, CancelledError(f'Generation job {job_id} was cancelled'), None)
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+        with self._lock:
+            callbacks, self._callbacks = self._callbacks, None
+        if callbacks is not None:
+            callbacks.shutdown(wait=wait)
+        if self._progress_listener is not None:
+            self._progress_queue.put(None)
+            self._progress_listener.join()
+            self._progress_listener = None
+
+    def _dispatch(self) -> list:
+        """
+        Take queued jobs for free workers; caller holds the lock.
+
+        Returns (queue entry, pool) pairs for _launch to start once the lock
+        is released, so slow callbacks never hold up the executor.
+        """
+        started = []
+        while not self._closed and self._queue and len(self._running) < self.max_workers:
+            entry = self._queue.popleft()
+            self._running.add(entry[0])
+            started.append((entry, self._get_pool()))
+        return started
+
+    def _launch(self, started: list):
+        """Run on_start and submit each job taken by _dispatch; caller must not hold the lock"""
+        for (job_id, method, kwargs, on_start, on_done), pool in started:
+            # Runs before submission so it can never be reported after on_done
+            try:
+                on_start(job_id)
+            except Exception as e:
+                print(f"Error in generation callback for {job_id}: {e}")
+
+            started_at = time.monotonic()
+            try:
+                future = pool.submit(self._target(), job_id, method, kwargs)
+            except Exception as e:
+                # Shut down, or broken by a job that failed meanwhile
+                self._finished(job_id, on_done, None, started_at, pool, error=e)
+                continue
+            future.add_done_callback(
+                lambda f, job_id=job_id, on_done=on_done, started_at=started_at, pool=pool:
+                    self._finished(job_id, on_done, f, started_at, pool)
+            )
+
+    def _finished(self, job_id: str, on_done: Callable, future, started_at: float, pool,
+                  error: BaseException = None):
+        if future is not None:
+            if future.cancelled():
+                # Dropped from a pool that was shut down before the job ran
+                error = CancelledError(f'Generation job {job_id} was cancelled')
+            else:
+                error = future.exception()
+        result, timings = (None, None) if error else future.result()
+
+        broken = None
+        with self._lock:
+            self._running.discard(job_id)
+            self._progress_callbacks.pop(job_id, None)
+            runtime = time.monotonic() - started_at
+            self._avg_runtime = runtime if self._avg_runtime is None else 0.8 * self._avg_runtime + 0.2 * runtime
+            if isinstance(error, BrokenProcessPool) and self._pool is pool:
+                # A worker died; start a fresh pool for the remaining jobs
+                broken, self._pool = pool, None
+            started = self._dispatch()
+        if broken is not None:
+            broken.shutdown(wait=False, cancel_futures=True)
+        self._launch(started)
+
+        # In process mode this runs on the pool's management thread, which
+        # must get back to collecting results
+        callbacks = self._get_callbacks()
+        if callbacks is None:
+            # Shut down; report the job here instead
+            self._call_done(on_done, job_id, result, error, timings)
+            return
+        try:
+            callbacks.submit(self._call_done, on_done, job_id, result, error, timings)
+        except RuntimeError:
+            self._call_done(on_done, job_id, result, error, timings)
+
+    def _call_done(self, on_done: Callable, job_id: str, result, error: Optional[BaseException],
+                   timings: Optional[Dict]):
+        try:
+            on_done(job_id, result, error, timings=timings)
+        except Exception as e:
+            print(f"Error in generation callback for {job_id}: {e}")
+
+    def _get_callbacks(self) -> Optional[ThreadPoolExecutor]:
+        """Thread that runs on_done callbacks, or None once shut down"""
+        with self._lock:
+            if self._closed:
+                return None
+            # Created on first use in each process: a pre-forking master's
+            # thread would not exist in the workers
+            if self._callbacks is None or self._callbacks_pid != os.getpid():
+                # One thread, so jobs are reported in the order they finish
+                self._callbacks = ThreadPoolExecutor(max_workers=1, thread_name_prefix='generation-done')
+                self._callbacks_pid = os.getpid()
+            return self._callbacks
+
+    def _target(self):
+        if self.mode == 'process':
+            return _run_in_worker
+        return self._run_in_thread
+
+    def _run_in_thread(self, job_id: str, method: str, kwargs: Dict):
+        return _timed_call(self.generator, method, kwargs, partial(self._progress, job_id))
+
+    def _progress(self, job_id: str, percent: int, timings: Dict):
+        with self._lock:
+            on_progress = self._progress_callbacks.get(job_id)
+        if on_progress is None:
+            return
+        try:
+            on_progress(job_id, percent, timings)
+        except Exception as e:
+            print(f"Error in generation callback for {job_id}: {e}")
+
+    def _listen_for_progress(self):
+        """Relay progress sent by pool workers to the jobs' callbacks"""
+        while True:
+            message = self._progress_queue.get()
+            if message is None:
+                return
+            self._progress(*message)
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.mode == 'process':
+                context = _worker_context()
+                if self._progress_queue is None:
+                    self._progress_queue = context.Queue()
+                    self._progress_listener = threading.Thread(
+                        target=self._listen_for_progress, name='generation-progress', daemon=True
+                    )
+                    self._progress_listener.start()
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(self.generator.output_dir, self.generator.write_midi, self._progress_queue)
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='generation')
+        return self._pool
+
+    def _estimate_wait(self) -> int:
+        """Seconds until a queue slot is likely to free up"""
+        if self._avg_runtime is None:
+            return self.retry_after
+        return max(self.retry_after, math.ceil(self._avg_runtime * len(self._queue) / self.max_workers))
+
+
+def _worker_context():
+    """
+    Multiprocessing context for pool workers.
+
+    Workers must not inherit the web process's threads, sockets or loaded
+    models, so they are never forked from it directly. A fork server that only
+    preloads this module gives cheap, clean workers without re-running the
+    app's entry point; platforms without one fall back to spawn.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
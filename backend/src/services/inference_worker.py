@@ -0,0 +1,246 @@
+"""
+Out-of-process emotion inference.
+
+One worker process (or a small forked pool sharing the weights) owns the
+model and serves classification over a unix socket. Web processes send face
+crops through a shared memory block they own, so only a few bytes of
+metadata are pickled per batch.
+
+Run it next to the web server (gunicorn.conf.py starts it when
+EMOTION_INFERENCE_MODE=worker):
+    python -m src.services.inference_worker
+"""
+import argparse
+import gc
+import os
+import sys
+import threading
+import numpy as np
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Client, Listener
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List
+
+
+class InferenceWorkerError(Exception):
+    """Raised when the inference worker can't be reached or can't classify"""
+
+    def __init__(self, message: str, state: str = None):
+        super().__init__(message)
+        self.state = state
+
+
+class InferenceClient:
+    """
+    Connection from a web process to the inference worker.
+
+    Calls are serialised over one connection per process; concurrent callers
+    are expected to be coalesced upstream (EmotionService's micro-batcher),
+    so each call carries a whole batch of crops.
+    """
+
+    def __init__(self, socket_path: str, authkey: bytes, timeout: float = 30):
+        self.socket_path = socket_path
+        self.authkey = authkey
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._connection = None
+        self._buffer = None
+        self._pid = None
+        os.register_at_fork(after_in_child=self._forget_parent)
+
+    def status(self) -> Dict:
+        with self._lock:
+            return self._call({'op': 'status'})['status']
+
+    def classify(self, faces: List[np.ndarray]) -> List[List[Dict]]:
+        """Top-k emotion labels for each RGB uint8 face crop"""
+        faces = [np.ascontiguousarray(face, dtype=np.uint8) for face in faces]
+        with self._lock:
+            buffer = self._shared_buffer(sum(face.nbytes for face in faces))
+            offset = 0
+            for face in faces:
+                np.ndarray(face.shape, np.uint8, buffer=buffer.buf, offset=offset)[...] = face
+                offset += face.nbytes
+            reply = self._call({'op': 'classify', 'shm': buffer.name, 'shapes': [face.shape for face in faces]})
+            return reply['results']
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+            if self._buffer is not None:
+                self._buffer.close()
+                self._buffer.unlink()
+                self._buffer = None
+
+    def _call(self, message: Dict) -> Dict:
+        try:
+            if self._connection is None or self._pid != os.getpid():
+                self._connection = Client(self.socket_path, 'AF_UNIX', authkey=self.authkey)
+                self._pid = os.getpid()
+            self._connection.send(message)
+            if not self._connection.poll(self.timeout):
+                raise TimeoutError(f'No reply from inference worker within {self.timeout}s')
+            reply = self._connection.recv()
+        except (OSError, EOFError, TimeoutError) as e:
+            # A late reply would be read as the answer to the next call
+            self._disconnect()
+            raise InferenceWorkerError(f'Inference worker unavailable: {e}', state='unavailable') from e
+        if 'error' in reply:
+            raise InferenceWorkerError(reply['error'], state=reply.get('state'))
+        return reply
+
+    def _shared_buffer(self, size: int) -> SharedMemory:
+        if self._buffer is None or self._buffer.size < size:
+            if self._buffer is not None:
+                self._buffer.close()
+                self._buffer.unlink()
+            # Grown in doublings, so a steady workload settles on one block
+            capacity = 1 << max(20, (size - 1).bit_length())
+            self._buffer = SharedMemory(create=True, size=capacity)
+        return self._buffer
+
+    def _disconnect(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except OSError:
+                pass
+            self._connection = None
+
+    def _forget_parent(self):
+        # The parent's connection and buffer stay the parent's
+        self._lock = threading.Lock()
+        self._connection = None
+        self._buffer = None
+
+
+class InferenceServer:
+    """
+    Serves EmotionService.classify_faces to InferenceClients.
+
+    Each connection gets a thread; the service's micro-batcher merges what
+    they send into shared forward passes. With processes > 1 the model is
+    loaded once and the process forks, so the pool shares its weights.
+    """
+
+    def __init__(self, emotion_service, socket_path: str, authkey: bytes, processes: int = 1):
+        self.emotion_service = emotion_service
+        self.socket_path = socket_path
+        self.authkey = authkey
+        self.processes = max(1, processes)
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        listener = Listener(self.socket_path, 'AF_UNIX', authkey=self.authkey)
+        os.chmod(self.socket_path, 0o660)
+        print(f"Emotion inference worker listening on {self.socket_path}")
+
+        if self.processes == 1:
+            self.emotion_service.load(warm=True)
+            self._accept(listener)
+            return
+
+        self.emotion_service.load()
+        gc.freeze()
+        children = {self._fork(listener) for _ in range(self.processes)}
+        while children:
+            pid, _ = os.wait()
+            children.discard(pid)
+            print(f"Emotion inference process {pid} exited; starting another")
+            children.add(self._fork(listener))
+
+    def _fork(self, listener: Listener) -> int:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                self._accept(listener)
+            finally:
+                os._exit(1)
+        return pid
+
+    def _accept(self, listener: Listener):
+        while True:
+            try:
+                connection = listener.accept()
+            except Exception as e:
+                print(f"Error accepting inference connection: {e}")
+                continue
+            threading.Thread(target=self._serve, args=(connection,),
+                             name='inference-connection', daemon=True).start()
+
+    def _serve(self, connection):
+        from src.services.emotion_service import ModelNotReadyError
+
+        block = None
+        try:
+            while True:
+                try:
+                    message = connection.recv()
+                except EOFError:
+                    return
+                try:
+                    if message['op'] == 'status':
+                        connection.send({'status': self.emotion_service.status()})
+                        continue
+                    if block is None or block.name != message['shm']:
+                        if block is not None:
+                            block.close()
+                        block = _attach(message['shm'])
+                    faces = _read_faces(block, message['shapes'])
+                    results = self.emotion_service.classify_faces(faces)
+                    # Views into the block must be gone before it can be closed
+                    del faces
+                    connection.send({'results': results})
+                except ModelNotReadyError as e:
+                    connection.send({'error': str(e), 'state': e.state})
+                except Exception as e:
+                    print(f"Error classifying for inference client: {e}")
+                    connection.send({'error': str(e)})
+        finally:
+            if block is not None:
+                block.close()
+            connection.close()
+
+
+def _read_faces(block: SharedMemory, shapes: list) -> List[np.ndarray]:
+    faces, offset = [], 0
+    for shape in shapes:
+        faces.append(np.ndarray(shape, np.uint8, buffer=block.buf, offset=offset))
+        offset += faces[-1].nbytes
+    return faces
+
+
+def _attach(name: str) -> SharedMemory:
+    block = SharedMemory(name=name)
+    # The client created and will unlink the block; without this the
+    # resource tracker would unlink it again when this process exits
+    resource_tracker.unregister(block._name, 'shared_memory')
+    return block
+
+
+def main(argv=None) -> int:
+    from src.config import Config
+    from src.services.emotion_service import EmotionService
+
+    parser = argparse.ArgumentParser(description='Serve emotion inference over a unix socket')
+    parser.add_argument('--socket', default=Config.EMOTION_INFERENCE_SOCKET)
+    parser.add_argument('--processes', type=int, default=Config.EMOTION_INFERENCE_PROCESSES)
+    args = parser.parse_args(argv)
+
+    backend_dir = os.path.join(os.path.dirname(__file__), '..', '..')
+    service = EmotionService(
+        Config.EMOTION_MODEL,
+        batch_size=Config.EMOTION_BATCH_SIZE,
+        batch_wait_ms=Config.EMOTION_BATCH_WAIT_MS,
+        torch_threads=Config.EMOTION_TORCH_THREADS,
+        backend=Config.EMOTION_BACKEND,
+        model_dir=os.path.join(backend_dir, Config.EMOTION_MODEL_DIR)
+    )
+    InferenceServer(service, args.socket, Config.SECRET_KEY.encode('utf-8'), args.processes).serve_forever()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import queue
+import threading
+from typing import Dict, List, NamedTuple, Optional
+from src.utils.cache import LRUCache
+
+# Events after which a job never changes again
+TERMINAL_EVENTS = ('completed', 'failed')
+
+
+class JobEvent(NamedTuple):
+    id: int
+    job_id: str
+    type: str
+    data: Dict
+
+    @property
+    def terminal(self) -> bool:
+        return self.type in TERMINAL_EVENTS
+
+
+class _JobChannel:
+    def __init__(self, owner: str):
+        self.owner = owner
+        self.events = []
+        self.subscribers = set()
+
+    @property
+    def finished(self) -> bool:
+        return bool(self.events) and self.events[-1].terminal
+
+
+class JobEventBus:
+    """
+    In-process publish/subscribe for generation job state changes.
+
+    Each job keeps its owner and the events published so far, so a subscriber
+    that connects late (or reconnects with the last event id it saw) is
+    replayed what it missed before receiving live events. Nothing is published
+    for a job after its terminal event.
+    """
+
+    def __init__(self, max_jobs: int = 1024):
+        self._jobs = LRUCache(max_entries=max_jobs)
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def register(self, job_id: str, owner: str):
+        with self._lock:
+            if job_id not in self._jobs:
+                self._jobs.put(job_id, _JobChannel(owner))
+
+    def owner(self, job_id: str) -> Optional[str]:
+        """Owner of a job this process has seen, otherwise None"""
+        channel = self._jobs.peek(job_id)
+        return channel.owner if channel else None
+
+    def publish(self, job_id: str, event_type: str, **data) -> Optional[JobEvent]:
+        with self._lock:
+            channel = self._jobs.get(job_id)
+            if channel is None or channel.finished:
+                return None
+            event = JobEvent(self._next_id, job_id, event_type, data)
+            self._next_id += 1
+            channel.events.append(event)
+            subscribers = list(channel.subscribers)
+
+        for subscriber in subscribers:
+            subscriber.put(event)
+        return event
+
+    def subscribe(self, job_id: str, last_event_id: int = None) -> queue.Queue:
+        """
+        Queue that receives the job's events, starting with any already
+        published after last_event_id.
+        """
+        subscriber = queue.Queue()
+        with self._lock:
+            channel = self._jobs.get(job_id)
+            if channel is None:
+                raise KeyError(job_id)
+            for event in channel.events:
+                if last_event_id is None or event.id > last_event_id:
+                    subscriber.put(event)
+            if not channel.finished:
+                channel.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, job_id: str, subscriber: queue.Queue):
+        with self._lock:
+            channel = self._jobs.peek(job_id)
+            if channel is not None:
+                channel.subscribers.discard(subscriber)
+
+    def history(self, job_id: str) -> List[JobEvent]:
+        with self._lock:
+            channel = self._jobs.peek(job_id)
+            return list(channel.events) if channel else []
+
+    def stats(self) -> Dict:
+        with self._lock:
+            channels = [channel for _, channel in self._jobs.items()]
+            return {
+                'jobs': len(channels),
+                'subscribers': sum(len(channel.subscribers) for channel in channels)
+            }
@@ -1,12 +1,28 @@
 import os
-import random
+import threading
+import uuid
 import mido
 from mido import MidiFile, MidiTrack, Message
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import numpy as np
-from typing import Dict, Tuple
-import wave
-import struct
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from src.services.file_store import sharded_path
+from src.services.synthesizer import Synthesizer, VoiceTable
+from src.utils.timing import StageTimer
+
+TICKS_PER_BEAT = 480
+
+# Bump whenever composition or synthesis changes what a given seed sounds like
+RENDER_VERSION = 5
+
+# In-memory score: one row per note, timed in ticks at TICKS_PER_BEAT
+SCORE_DTYPE = np.dtype([
+    ('tick', np.int64),
+    ('duration', np.int64),
+    ('note', np.int16),
+    ('velocity', np.int16),
+])
 
 class MusicGenerator:
     """
@@ -14,9 +30,13 @@ class MusicGenerator:
     Uses algorithmic composition techniques mapped to valence/arousal coordinates.
     """
     
-    def __init__(self, output_dir: str):
+    def __init__(self, output_dir: str, write_midi: bool = False, preview_sample_rate: int = 22050):
         self.output_dir = output_dir
+        self.write_midi = write_midi
         os.makedirs(output_dir, exist_ok=True)
+        self.synthesizer = Synthesizer()
+        # Auditioning only needs a rough render: lower rate, single precision
+        self.preview_synthesizer = Synthesizer(sample_rate=preview_sample_rate, dtype=np.float32)
         
         # Musical scales for different moods
         self.scales = {
@@ -26,9 +46,26 @@ class MusicGenerator:
             'phrygian': [0, 1, 3, 5, 7, 8, 10],  # Dark, tense
             'pentatonic': [0, 2, 4, 7, 9]  # Simple, peaceful
         }
+        
+        # ADSR envelopes (attack, decay, sustain level, release) per style
+        self.envelopes = {
+            'ambient': (0.4, 0.3, 0.8, 0.8),  # Slow swells, long tails
+            'melodic': (0.02, 0.15, 0.7, 0.2),
+            'rhythmic': (0.005, 0.05, 0.6, 0.05)  # Short, percussive
+        }
+        
+        # Arrangement layers: waveform, mix level and envelope (None = the style's)
+        self.layer_voices = {
+            'melody': {'waveform': 'sine', 'level': 1.0, 'envelope': None},
+            'pad': {'waveform': 'triangle', 'level': 0.45, 'envelope': (0.6, 0.4, 0.8, 1.0)},
+            'bass': {'waveform': 'saw', 'level': 0.6, 'envelope': (0.01, 0.2, 0.6, 0.08)},
+            'percussion': {'waveform': 'noise', 'level': 0.35, 'envelope': (0.001, 0.06, 0.0, 0.02)}
+        }
     
     def generate_music(self, valence: float, arousal: float, duration: int = 30, 
-                      tempo: int = None, style: str = 'auto') -> Tuple[str, str]:
+                      tempo: int = None, style: str = 'auto',
+                      seed: int = None, timer: StageTimer = None,
+                      progress: Callable[[float], None] = None) -> Tuple[Optional[str], str]:
         """
         Generate music based on mood parameters.
         
@@ -38,27 +75,137 @@ class MusicGenerator:
             duration: Duration in seconds
             tempo: BPM (if None, auto-calculated from arousal)
             style: Music style ('auto', 'ambient', 'rhythmic', 'melodic')
+            seed: Seed for the composer; the same seed and parameters give the same piece
+            timer: Optional StageTimer that receives 'composition', 'synthesis',
+                'layer:<name>', 'encoding' and 'midi_io' durations
+            progress: Optional callback receiving the fraction of audio rendered
         
         Returns:
-            Tuple of (midi_path, wav_path)
+            Tuple of (midi_path, wav_path); midi_path is None unless MIDI export is enabled
         """
+        timer = timer or StageTimer()
+        
         # Map mood to musical parameters
         params = self._mood_to_music_params(valence, arousal, tempo, style)
         
-        # Generate unique filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"generated_{timestamp}_{random.randint(1000, 9999)}"
-        midi_path = os.path.join(self.output_dir, f"{filename}.mid")
-        wav_path = os.path.join(self.output_dir, f"{filename}.wav")
+        filename = self._new_filename()
+        wav_path = sharded_path(self.output_dir, filename, 'wav')
         
-        # Create MIDI file
-        self._create_midi(midi_path, params, duration)
+        # Arrange in memory and render straight from the layer scores
+        with timer.stage('composition'):
+            scores = self._arrange(params, duration, np.random.default_rng(seed))
+        self._render_wav(scores, wav_path, params, timer, progress)
         
-        # Convert MIDI to WAV
-        self._midi_to_wav(midi_path, wav_path, params)
+        # MIDI is a side artifact, written only after the audio is done
+        midi_path = None
+        if self.write_midi:
+            midi_path = sharded_path(self.output_dir, filename, 'mid')
+            with timer.stage('midi_io'):
+                self._write_midi(midi_path, scores, params)
         
         return midi_path, wav_path
     
+    def stream_music(self, valence: float, arousal: float, duration: int = 30,
+                     tempo: int = None, style: str = 'auto', seed: int = None,
+                     block_size: int = None, timer: StageTimer = None) -> Iterator[bytes]:
+        """
+        Generate music as a WAV byte stream, synthesized block by block.
+        
+        Composition happens up front so errors surface before the first byte;
+        the returned iterator yields the WAV header and then one PCM chunk per
+        rendered block.
+        """
+        timer = timer or StageTimer()
+        params = self._mood_to_music_params(valence, arousal, tempo, style)
+        with timer.stage('composition'):
+            scores = self._arrange(params, duration, np.random.default_rng(seed))
+        with timer.stage('synthesis'):
+            voices = self._arrangement_to_voices(scores, params)
+        return self.synthesizer.iter_wav(voices, block_size, timer)
+    
+    def preview_music(self, valence: float, arousal: float, duration: int = 30,
+                      tempo: int = None, style: str = 'auto', seed: int = None,
+                      excerpt: float = 6.0) -> bytes:
+        """
+        Render the opening of a piece as a quick, low-fidelity preview.
+        
+        The whole piece is composed as generate_music would, so the same seed
+        previews the same opening, but only notes starting in the first
+        `excerpt` seconds are rendered, on the preview synthesizer.
+        
+        Returns:
+            Complete WAV file contents
+        """
+        params = self._mood_to_music_params(valence, arousal, tempo, style)
+        scores = self._arrange(params, duration, np.random.default_rng(seed))
+        
+        seconds = min(excerpt, duration)
+        last_tick = seconds * params['tempo'] / 60 * TICKS_PER_BEAT
+        scores = {layer: score[score['tick'] < last_tick] for layer, score in scores.items()}
+        
+        synthesizer = self.preview_synthesizer
+        voices = self._arrangement_to_voices(scores, params, synthesizer)
+        return b''.join(synthesizer.iter_wav(voices, num_samples=int(seconds * synthesizer.sample_rate)))
+    
+    def generate_batch(self, variants: List[Dict], max_workers: int = None,
+                       timer: StageTimer = None,
+                       progress: Callable[[float], None] = None) -> List[Tuple[Optional[str], str]]:
+        """
+        Generate several pieces in one pass.
+        
+        Each variant takes the same keyword arguments as generate_music. Mood
+        mappings are computed once per distinct mood, and variants are rendered
+        concurrently on one shared synthesizer. Stage times in timer are summed
+        over all variants; progress receives the fraction of variants finished.
+        
+        Returns:
+            List of (midi_path, wav_path), in variant order
+        """
+        timer = timer or StageTimer()
+        finished = []
+        finished_lock = threading.Lock()
+        params_by_mood = {}
+        for variant in variants:
+            mood = self._mood_key(variant)
+            if mood not in params_by_mood:
+                params_by_mood[mood] = self._mood_to_music_params(*mood)
+        
+        def render(variant):
+            params = params_by_mood[self._mood_key(variant)]
+            filename = self._new_filename()
+            wav_path = sharded_path(self.output_dir, filename, 'wav')
+            
+            with timer.stage('composition'):
+                scores = self._arrange(params, variant['duration'], np.random.default_rng(variant.get('seed')))
+            self._render_wav(scores, wav_path, params, timer)
+            
+            midi_path = None
+            if self.write_midi:
+                midi_path = sharded_path(self.output_dir, filename, 'mid')
+                with timer.stage('midi_io'):
+                    self._write_midi(midi_path, scores, params)
+            
+            if progress is not None:
+                with finished_lock:
+                    finished.append(wav_path)
+                    progress(len(finished) / len(variants))
+            return midi_path, wav_path
+        
+        workers = max(1, min(len(variants), max_workers or os.cpu_count() or 1))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch-render') as pool:
+            return list(pool.map(render, variants))
+    
+    def new_wav_path(self) -> str:
+        """Reserve a unique output path for a generated WAV file"""
+        return sharded_path(self.output_dir, self._new_filename(), 'wav')
+    
+    def _new_filename(self) -> str:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return f"generated_{timestamp}_{uuid.uuid4().hex[:8]}"
+    
+    def _mood_key(self, variant: Dict) -> Tuple:
+        return (variant['valence'], variant['arousal'], variant.get('tempo'), variant.get('style', 'auto'))
+    
     def _mood_to_music_params(self, valence: float, arousal: float, 
                               tempo: int = None, style: str = 'auto') -> Dict:
         """Map mood coordinates to musical parameters"""
@@ -112,7 +259,20 @@ class MusicGenerator:
             else:
                 style = 'melodic'
         
+        # Determine arrangement: calmer or darker moods get a pad under the
+        # melody, anything above the calmest gets a bassline, energetic moods
+        # get a beat. Ambient pieces are already chordal, so they skip the pad.
+        layers = ['melody']
+        if style != 'ambient' and (valence < 0.6 or arousal < 0.5):
+            layers.append('pad')
+        if arousal >= 0.3:
+            layers.append('bass')
+        if arousal >= 0.5 and style != 'ambient':
+            layers.append('percussion')
+        
         return {
+            'layers': layers,
+            'envelope': self.envelopes[style],
             'scale_type': scale_type,
             'scale': self.scales[scale_type],
             'base_note': base_note,
@@ -125,183 +285,196 @@ class MusicGenerator:
             'arousal': arousal
         }
     
-    def _create_midi(self, filepath: str, params: Dict, duration: int):
-        """Create MIDI file with generated music"""
-        mid = MidiFile()
-        track = MidiTrack()
-        mid.tracks.append(track)
-        
-        # Set tempo
-        tempo_microseconds = mido.bpm2tempo(params['tempo'])
-        track.append(mido.MetaMessage('set_tempo', tempo=tempo_microseconds))
-        
+    def _arrange(self, params: Dict, duration: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        """Compose every layer in params['layers'] as an in-memory score, in layer order"""
+        measures = self._measures(params, duration)
+        generators = {
+            'melody': self._compose,
+            'pad': self._generate_pad,
+            'bass': self._generate_bass,
+            'percussion': self._generate_percussion
+        }
+        return {layer: self._fit_to_duration(generators[layer](params, measures, rng), layer, params, duration)
+                for layer in params['layers']}
+    
+    def _fit_to_duration(self, score: np.ndarray, layer: str, params: Dict, duration: int) -> np.ndarray:
+        """Drop notes past duration and shorten the rest so their release tails end by then"""
+        ticks_per_second = params['tempo'] / 60 * TICKS_PER_BEAT
+        end_tick = int(duration * ticks_per_second)
+        release = (self.layer_voices[layer]['envelope'] or params['envelope'])[3]
+        # One spare tick absorbs rounding when ticks become samples
+        last_stop = end_tick - int(np.ceil(release * ticks_per_second)) - 1
+        score = score[score['tick'] < last_stop]
+        score['duration'] = np.clip(score['duration'], 1, last_stop - score['tick'])
+        return score
+    
+    def _measures(self, params: Dict, duration: int) -> int:
         # Calculate number of measures based on duration and tempo
         beats_per_second = params['tempo'] / 60
         total_beats = int(duration * beats_per_second)
-        measures = max(4, total_beats // 4)  # At least 4 measures
-        
+        return max(4, total_beats // 4)  # At least 4 measures
+    
+    def _compose(self, params: Dict, measures: int, rng: np.random.Generator) -> np.ndarray:
+        """Compose the melody layer as an in-memory score (see SCORE_DTYPE)"""
         # Generate melody
         if params['style'] == 'ambient':
-            self._generate_ambient(track, params, measures)
+            return self._generate_ambient(params, measures, rng)
         elif params['style'] == 'rhythmic':
-            self._generate_rhythmic(track, params, measures)
+            return self._generate_rhythmic(params, measures, rng)
         else:
-            self._generate_melodic(track, params, measures)
+            return self._generate_melodic(params, measures, rng)
+    
+    def _score(self, ticks: np.ndarray, durations, notes: np.ndarray, velocity: int) -> np.ndarray:
+        """Pack note columns into a SCORE_DTYPE array; durations may be a scalar"""
+        score = np.empty(len(ticks), dtype=SCORE_DTYPE)
+        score['tick'] = ticks
+        score['duration'] = durations
+        score['note'] = notes
+        score['velocity'] = velocity
+        return score
+    
+    def _generate_melodic(self, params: Dict, measures: int, rng: np.random.Generator) -> np.ndarray:
+        """Generate melodic music: a bouncing scale walk, one note per beat"""
+        scale = np.array(params['scale'])
+        steps = measures * 4
         
-        mid.save(filepath)
+        # Note duration based on density
+        if params['note_density'] == 'high':
+            duration = TICKS_PER_BEAT // 2
+        elif params['note_density'] == 'low':
+            duration = TICKS_PER_BEAT * 2
+        else:
+            duration = TICKS_PER_BEAT
+        
+        # The walk moves one degree on 70% of beats, turning around at the
+        # bottom and two octaves up: a triangle wave over the number of moves
+        moves = rng.random(steps) > 0.3
+        taken = np.concatenate(([0], np.cumsum(moves[:-1])))
+        top = len(scale) * 2
+        position = taken % (2 * top)
+        position = np.where(position > top, 2 * top - position, position)
+        notes = params['base_note'] + scale[position % len(scale)]
+        
+        # Add some variation: octave jumps on about 30% of notes
+        jumps = rng.random(steps) > 0.7
+        notes += np.where(jumps, rng.choice([-12, 0, 12], size=steps), 0)
+        
+        return self._score(np.arange(steps) * duration, duration, notes, params['velocity'])
     
-    def _generate_melodic(self, track: MidiTrack, params: Dict, measures: int):
-        """Generate melodic music"""
+    def _generate_ambient(self, params: Dict, measures: int, rng: np.random.Generator) -> np.ndarray:
+        """Generate ambient/atmospheric music: a root-position triad held every measure"""
         scale = params['scale']
-        base_note = params['base_note']
-        velocity = params['velocity']
-        ticks_per_beat = 480
-        
-        current_note = 0
-        direction = 1
-        
-        for measure in range(measures):
-            for beat in range(4):
-                # Choose note from scale
-                scale_degree = current_note % len(scale)
-                note = base_note + scale[scale_degree]
-                
-                # Add some variation
-                if random.random() > 0.7:
-                    note += random.choice([-12, 0, 12])  # Octave jumps
-                
-                # Note duration based on density
-                if params['note_density'] == 'high':
-                    duration = ticks_per_beat // 2
-                elif params['note_density'] == 'low':
-                    duration = ticks_per_beat * 2
-                else:
-                    duration = ticks_per_beat
-                
-                # Add note
-                track.append(Message('note_on', note=note, velocity=velocity, time=0))
-                track.append(Message('note_off', note=note, velocity=0, time=duration))
-                
-                # Move melodically
-                if random.random() > 0.3:
-                    current_note += direction
-                    if current_note >= len(scale) * 2:
-                        direction = -1
-                    elif current_note <= 0:
-                        direction = 1
+        velocity = max(30, params['velocity'] - 20)  # Softer
+        measure_ticks = TICKS_PER_BEAT * 4
+        
+        chord = params['base_note'] + np.array([scale[0], scale[2], scale[4]])
+        ticks = np.repeat(np.arange(measures) * measure_ticks, len(chord))
+        notes = np.tile(chord, measures)
+        return self._score(ticks, measure_ticks, notes, velocity)
     
-    def _generate_ambient(self, track: MidiTrack, params: Dict, measures: int):
-        """Generate ambient/atmospheric music"""
+    def _generate_rhythmic(self, params: Dict, measures: int, rng: np.random.Generator) -> np.ndarray:
+        """Generate rhythmic/energetic music: random scale tones on a sixteenth-note grid"""
+        scale = np.array(params['scale'])
+        duration = TICKS_PER_BEAT // 4
+        slots = measures * 16
+        
+        # 70% chance of a note on each sixteenth; the rest are rests
+        played = np.flatnonzero(rng.random(slots) > 0.3)
+        notes = params['base_note'] + scale[rng.integers(0, len(scale), size=len(played))]
+        return self._score(played * duration, duration, notes, params['velocity'])
+    
+    def _generate_pad(self, params: Dict, measures: int, rng: np.random.Generator) -> np.ndarray:
+        """Generate a chord pad: the tonic triad an octave down, re-struck every two measures"""
         scale = params['scale']
-        base_note = params['base_note']
-        velocity = max(30, params['velocity'] - 20)  # Softer
-        ticks_per_beat = 480
-        
-        for measure in range(measures):
-            # Long sustained chords
-            chord_notes = [
-                base_note + scale[0],
-                base_note + scale[2],
-                base_note + scale[4]
-            ]
-            
-            # Add chord
-            for note in chord_notes:
-                track.append(Message('note_on', note=note, velocity=velocity, time=0))
-            
-            # Hold for full measure
-            time.sleep(0)  # Placeholder
-            
-            for i, note in enumerate(chord_notes):
-                time_offset = ticks_per_beat * 4 if i == len(chord_notes) - 1 else 0
-                track.append(Message('note_off', note=note, velocity=0, time=time_offset))
+        chord = params['base_note'] - 12 + np.array([scale[0], scale[2], scale[4]])
+        length = TICKS_PER_BEAT * 8
+        strikes = (measures + 1) // 2
+        
+        ticks = np.repeat(np.arange(strikes) * length, len(chord))
+        notes = np.tile(chord, strikes)
+        return self._score(ticks, length, notes, max(30, params['velocity'] - 25))
     
-    def _generate_rhythmic(self, track: MidiTrack, params: Dict, measures: int):
-        """Generate rhythmic/energetic music"""
+    def _generate_bass(self, params: Dict, measures: int, rng: np.random.Generator) -> np.ndarray:
+        """Generate a bassline: root on the downbeats, root or fifth on the others"""
         scale = params['scale']
-        base_note = params['base_note']
-        velocity = params['velocity']
-        ticks_per_beat = 480
-        
-        for measure in range(measures):
-            for beat in range(4):
-                for subdivision in range(4):
-                    if random.random() > 0.3:  # 70% chance of note
-                        scale_degree = random.randint(0, len(scale) - 1)
-                        note = base_note + scale[scale_degree]
-                        
-                        duration = ticks_per_beat // 4
-                        
-                        track.append(Message('note_on', note=note, velocity=velocity, time=0))
-                        track.append(Message('note_off', note=note, velocity=0, time=duration))
+        root = params['base_note'] - 24
+        steps = measures * 4
+        
+        notes = np.full(steps, root)
+        offbeats = np.arange(steps) % 2 == 1
+        fifths = offbeats & (rng.random(steps) > 0.5)
+        notes[fifths] += scale[4]
+        
+        # Half-beat gaps keep the line from droning
+        duration = TICKS_PER_BEAT * 3 // 4
+        return self._score(np.arange(steps) * TICKS_PER_BEAT, duration, notes, params['velocity'])
+    
+    def _generate_percussion(self, params: Dict, measures: int, rng: np.random.Generator) -> np.ndarray:
+        """Generate a beat: low hits on beats 1 and 3, high ticks on eighths, busier with arousal"""
+        slot = TICKS_PER_BEAT // 2
+        slots = np.arange(measures * 8)
+        
+        kicks = slots[slots % 4 == 0]
+        hat_chance = 0.4 + 0.5 * params['arousal']
+        hats = slots[(slots % 4 != 0) & (rng.random(len(slots)) < hat_chance)]
+        
+        onsets = np.concatenate((kicks, hats))
+        notes = np.concatenate((np.full(len(kicks), 36), np.full(len(hats), 96)))
+        order = np.argsort(onsets, kind='stable')
+        return self._score(onsets[order] * slot, slot // 2, notes[order], params['velocity'])
+    
+    def _arrangement_to_voices(self, scores: Dict[str, np.ndarray], params: Dict,
+                               synthesizer: Synthesizer = None) -> List[VoiceTable]:
+        """Convert each layer's score to note events and assign them to its own voice pool"""
+        synthesizer = synthesizer or self.synthesizer
+        tables = []
+        for layer, score in scores.items():
+            voice = self.layer_voices[layer]
+            events = synthesizer.events_from_score(score, TICKS_PER_BEAT, params['tempo'])
+            tables.append(synthesizer.allocate_voices(
+                events,
+                voice['envelope'] or params['envelope'],
+                waveform=voice['waveform'],
+                level=voice['level'],
+                name=layer
+            ))
+        return tables
     
-    def _midi_to_wav(self, midi_path: str, wav_path: str, params: Dict):
-        """Convert MIDI to WAV using simple synthesis"""
-        # Read MIDI file
-        mid = MidiFile(midi_path)
-        
-        # Audio parameters
-        sample_rate = 44100
-        duration_seconds = sum(msg.time for msg in mid.tracks[0]) / mid.ticks_per_beat / (params['tempo'] / 60)
-        num_samples = int(sample_rate * duration_seconds)
-        
-        # Generate audio samples
-        audio_data = np.zeros(num_samples)
-        current_sample = 0
-        active_notes = {}
-        
-        for msg in mid.tracks[0]:
-            # Calculate time in samples
-            if msg.time > 0:
-                time_seconds = msg.time / mid.ticks_per_beat / (params['tempo'] / 60)
-                samples_to_advance = int(time_seconds * sample_rate)
-                current_sample += samples_to_advance
+    def _render_wav(self, scores: Dict[str, np.ndarray], wav_path: str, params: Dict,
+                    timer: StageTimer = None, progress: Callable[[float], None] = None):
+        """Render an arrangement directly to WAV, without going through a MIDI file"""
+        timer = timer or StageTimer()
+        with timer.stage('synthesis'):
+            voices = self._arrangement_to_voices(scores, params)
+        self.synthesizer.write_wav(wav_path, voices, timer, progress)
+    
+    def _write_midi(self, filepath: str, scores: Dict[str, np.ndarray], params: Dict):
+        """Write an arrangement out as a MIDI file with one track per layer"""
+        mid = MidiFile(ticks_per_beat=TICKS_PER_BEAT)
+        
+        for channel, (layer, score) in enumerate(scores.items()):
+            track = MidiTrack()
+            mid.tracks.append(track)
+            track.append(mido.MetaMessage('track_name', name=layer))
+            # Percussion goes on the General MIDI drum channel
+            if layer == 'percussion':
+                channel = 9
             
-            if msg.type == 'note_on' and msg.velocity > 0:
-                active_notes[msg.note] = msg.velocity
-            elif msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0):
-                if msg.note in active_notes:
-                    del active_notes[msg.note]
+            # Set tempo
+            if not channel:
+                tempo_microseconds = mido.bpm2tempo(params['tempo'])
+                track.append(mido.MetaMessage('set_tempo', tempo=tempo_microseconds))
             
-            # Generate audio for active notes
-            if active_notes and current_sample < num_samples:
-                for note, velocity in active_notes.items():
-                    frequency = 440 * (2 ** ((note - 69) / 12))
-                    amplitude = velocity / 127.0 * 0.3
-                    
-                    # Generate samples for this note
-                    end_sample = min(current_sample + 1000, num_samples)
-                    t = np.arange(current_sample, end_sample) / sample_rate
-                    waveform = amplitude * np.sin(2 * np.pi * frequency * t)
-                    audio_data[current_sample:end_sample] += waveform
-        
-        # Normalize audio
-        max_val = np.max(np.abs(audio_data))
-        if max_val > 0:
-            audio_data = audio_data / max_val * 0.8
-        
-        # Convert to 16-bit PCM
-        audio_data = (audio_data * 32767).astype(np.int16)
-        
-        # Write WAV file
-        with wave.open(wav_path, 'w') as wav_file:
-            wav_file.setnchannels(1)  # Mono
-            wav_file.setsampwidth(2)  # 16-bit
-            wav_file.setframerate(sample_rate)
-            wav_file.writeframes(audio_data.tobytes())
-    
-    def cleanup_old_files(self, hours: int = 24):
-        """Remove generated files older than specified hours"""
-        import time
-        current_time = time.time()
-        cutoff_time = current_time - (hours * 3600)
-        
-        for filename in os.listdir(self.output_dir):
-            filepath = os.path.join(self.output_dir, filename)
-            if os.path.isfile(filepath):
-                file_time = os.path.getmtime(filepath)
-                if file_time < cutoff_time:
-                    try:
-                        os.remove(filepath)
-                    except Exception as e:
-                        print(f"Error removing file {filepath}: {e}")
+            # Flatten notes into absolute-time on/off pairs; offs sort before ons at the same tick
+            messages = []
+            for tick, duration, note, velocity in score.tolist():
+                messages.append((tick, 1, Message('note_on', channel=channel, note=note, velocity=velocity)))
+                messages.append((tick + duration, 0, Message('note_off', channel=channel, note=note, velocity=0)))
+            messages.sort(key=lambda m: (m[0], m[1]))
+            
+            last_tick = 0
+            for tick, _, msg in messages:
+                track.append(msg.copy(time=tick - last_tick))
+                last_tick = tick
+        
+        mid.save(filepath)
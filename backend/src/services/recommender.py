@@ -1,12 +1,34 @@
-from typing import List, Dict, Optional
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, List, Dict, Optional
 from src.services.audius_service import AudiusService
 
 
 class EnhancedRecommender:
-    """Enhanced music recommender with focus on Bollywood and Pop music"""
+    """
+    Enhanced music recommender with focus on Bollywood and Pop music
+
+    The Audius calls behind one recommendation are issued concurrently on a
+    shared pool and collected against one latency_budget-second deadline; a
+    source that hasn't answered by then is left out (its call still
+    finishes and fills the response cache for the next request). Results
+    are merged in the same fixed source order as before, whichever arrives
+    first.
+    """
     
-    def __init__(self, audius_service: AudiusService):
+    def __init__(self, audius_service: AudiusService, latency_budget: float = 2.5,
+                 fanout_threads: int = 16):
         self.audius = audius_service
+        self.latency_budget = latency_budget
+        self.fanout_threads = max(1, fanout_threads)
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        self.fanouts = 0
+        self.calls = 0
+        self.dropped = 0
         
         # Major international pop artists
         self.pop_artists = [
@@ -48,18 +70,24 @@ class EnhancedRecommender:
         # Get mood-based parameters
         genre, mood_tag, era = self._mood_to_music_params(valence, arousal, include_classics)
         
-        # Search with genre and mood
-        tracks = self.audius.search_tracks(genre=genre, mood=mood_tag, limit=limit//2)
-        all_tracks.extend(tracks)
+        deadline = time.monotonic() + self.latency_budget
+        
+        # Search with genre and mood, and fetch trending as a fallback, both
+        # concurrently with the artist searches
+        search, trending = self._submit([
+            lambda: self.audius.search_tracks(genre=genre, mood=mood_tag, limit=limit//2),
+            lambda: self.audius.get_trending_tracks(genre=genre, limit=limit)
+        ])
         
         # Get artist-specific recommendations based on mood
-        artist_tracks = self._get_artist_recommendations(valence, arousal, include_classics, limit//2)
+        artist_tracks = self._get_artist_recommendations(valence, arousal, include_classics, limit//2, deadline)
+        search_tracks, trending_tracks = self._collect([search, trending], deadline)
+        all_tracks.extend(search_tracks)
         all_tracks.extend(artist_tracks)
         
-        # If not enough tracks, get trending
+        # If not enough tracks, fill up with trending
         if len(all_tracks) < limit:
-            trending = self.audius.get_trending_tracks(genre=genre, limit=limit)
-            all_tracks.extend(trending)
+            all_tracks.extend(trending_tracks)
         
         # Remove duplicates and limit
         unique_tracks = self._remove_duplicates(all_tracks)[:limit]
@@ -70,17 +98,17 @@ class EnhancedRecommender:
                                      include_bollywood: bool = True,
                                      include_pop: bool = True) -> List[Dict]:
         """Get trending tracks from Bollywood and Pop genres"""
-        all_tracks = []
+        calls = []
         
         if include_bollywood:
             # Search for Bollywood/Indian Pop
-            bollywood_tracks = self.audius.search_tracks(query='Bollywood Hindi Indian', limit=limit//2)
-            all_tracks.extend(bollywood_tracks)
+            calls.append(lambda: self.audius.search_tracks(query='Bollywood Hindi Indian', limit=limit//2))
         
         if include_pop:
             # Get Pop trending tracks
-            pop_tracks = self.audius.get_trending_tracks(genre='Pop', limit=limit//2)
-            all_tracks.extend(pop_tracks)
+            calls.append(lambda: self.audius.get_trending_tracks(genre='Pop', limit=limit//2))
+        
+        all_tracks = [track for tracks in self._collect(self._submit(calls)) for track in tracks]
         
         unique_tracks = self._remove_duplicates(all_tracks)[:limit]
         return self._format_recommendations(unique_tracks)
@@ -104,10 +132,11 @@ class EnhancedRecommender:
         if artist_type == 'classic':
             artists_to_search.extend(self.classic_artists[:5])
         
-        # Search for each artist
+        # Search for every artist at once
         tracks_per_artist = max(2, limit // len(artists_to_search)) if artists_to_search else limit
-        for artist in artists_to_search:
-            tracks = self.audius.search_by_artist(artist, limit=tracks_per_artist)
+        searches = self._submit([lambda artist=artist: self.audius.search_by_artist(artist, limit=tracks_per_artist)
+                                 for artist in artists_to_search])
+        for tracks in self._collect(searches):
             all_tracks.extend(tracks)
         
         # Sort by popularity and limit
@@ -118,11 +147,70 @@ class EnhancedRecommender:
         unique_tracks = self._remove_duplicates(sorted_tracks)[:limit]
         return self._format_recommendations(unique_tracks)
     
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'fanouts': self.fanouts,
+                'calls': self.calls,
+                'dropped': self.dropped,
+                'latency_budget': self.latency_budget
+            }
+    
+    def _submit(self, calls: List[Callable[[], List[Dict]]]) -> List[Future]:
+        """Start Audius calls on the shared pool"""
+        with self._lock:
+            # Created on first use in each process: a pre-forking master's
+            # pool would have no threads in the workers
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.fanout_threads,
+                                                    thread_name_prefix='recommender-fanout')
+                self._executor_pid = os.getpid()
+            executor = self._executor
+        return [executor.submit(call) for call in calls]
+    
+    def _collect(self, futures: List[Future], deadline: float = None) -> List[List[Dict]]:
+        """
+        Results of submitted calls in call order.
+
+        A call that hasn't finished by deadline (default: latency_budget from
+        now), or that raised, contributes an empty list. Late calls are left
+        running so their responses still reach the cache.
+        """
+        if deadline is None:
+            deadline = time.monotonic() + self.latency_budget
+        done, late = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+        with self._lock:
+            self.fanouts += 1
+            self.calls += len(futures)
+            self.dropped += len(late)
+
+        results = []
+        for future in futures:
+            if future not in done:
+                results.append([])
+                continue
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"Error fetching recommendation source: {e}")
+                results.append([])
+        return results
+    
     def _get_artist_recommendations(self, valence: float, arousal: float, 
-                                   include_classics: bool, limit: int) -> List[Dict]:
-        """Get tracks from artists based on mood"""
+                                   include_classics: bool, limit: int, deadline: float = None) -> List[Dict]:
+        """Get tracks from artists based on mood, searching every artist at once"""
         tracks = []
         
+        # Search for tracks from selected artists
+        searches = self._submit([lambda artist=artist: self.audius.search_by_artist(artist, limit=2)
+                                 for artist in self._mood_artists(valence, arousal, include_classics)])
+        for artist_tracks in self._collect(searches, deadline):
+            tracks.extend(artist_tracks)
+        
+        return tracks
+    
+    def _mood_artists(self, valence: float, arousal: float, include_classics: bool) -> List[str]:
+        """Up to five artists to search for a mood"""
         # Select artists based on mood
         if arousal > 0.6 and valence > 0.6:
             # Energetic & Happy - upbeat pop/Bollywood
@@ -144,12 +232,7 @@ class EnhancedRecommender:
         if include_classics:
             artists.extend(self.classic_artists[:2])
         
-        # Search for tracks from selected artists
-        for artist in artists[:5]:
-            artist_tracks = self.audius.search_by_artist(artist, limit=2)
-            tracks.extend(artist_tracks)
-        
-        return tracks
+        return artists[:5]
     
     def _mood_to_music_params(self, valence: float, arousal: float, 
                               include_classics: bool) -> tuple:
@@ -213,10 +296,10 @@ class EnhancedRecommender:
 class BasicRecommender:
     """Basic recommender - maintains backward compatibility while using EnhancedRecommender"""
     
-    def __init__(self, audius_service: AudiusService):
+    def __init__(self, audius_service: AudiusService, enhanced: EnhancedRecommender = None):
         self.audius = audius_service
         # Use EnhancedRecommender internally
-        self.enhanced = EnhancedRecommender(audius_service)
+        self.enhanced = enhanced or EnhancedRecommender(audius_service)
     
     def get_recommendations_by_mood(self, valence: float, arousal: float, 
                                      limit: int = 20) -> List[Dict]:
@@ -0,0 +1,452 @@
+import heapq
+import struct
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple, Union
+from src.utils.timing import StageTimer
+
+# One row per sounding note, in sample positions at the synth's sample rate
+NOTE_EVENT_DTYPE = np.dtype([
+    ('start', np.int64),
+    ('end', np.int64),
+    ('frequency', np.float64),
+    ('velocity', np.float64),
+])
+
+# (attack, decay, sustain level, release); times in seconds
+Envelope = Tuple[float, float, float, float]
+DEFAULT_ENVELOPE = (0.01, 0.1, 0.7, 0.15)
+
+
+class VoiceTable:
+    """
+    Note events assigned to a fixed pool of voices, ready for block rendering.
+
+    Per-note arrays are sorted by (voice, start) so one searchsorted over
+    voice-offset keys finds the note every voice is playing at every sample.
+    """
+
+    def __init__(self, keys: np.ndarray, voice_offsets: np.ndarray, starts: np.ndarray,
+                 gate_lengths: np.ndarray, stops: np.ndarray, increments: np.ndarray,
+                 amplitudes: np.ndarray, voices: np.ndarray, envelope_samples: Tuple,
+                 num_samples: int, wavetable: np.ndarray, level: float = 1.0, name: str = None):
+        self.keys = keys
+        self.voice_offsets = voice_offsets
+        self.starts = starts
+        self.gate_lengths = gate_lengths
+        self.stops = stops
+        self.increments = increments
+        self.amplitudes = amplitudes
+        self.voices = voices
+        self.envelope_samples = envelope_samples
+        self.num_samples = num_samples
+        self.wavetable = wavetable
+        self.level = level
+        self.name = name
+
+        # Start-ordered view for finding which voices a block touches
+        order = np.argsort(starts, kind='stable')
+        self.ordered_starts = starts[order]
+        self.ordered_voices = voices[order]
+        self.running_stop = np.maximum.accumulate(stops[order]) if len(order) else stops
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def peak_amplitude(self) -> float:
+        """Upper bound on the mix: the largest sum of simultaneously sounding amplitudes"""
+        if len(self) == 0:
+            return 0.0
+        times = np.concatenate((self.stops, self.starts))
+        deltas = np.concatenate((-self.amplitudes, self.amplitudes))
+        # Releases sort before attacks at the same sample
+        order = np.lexsort((deltas, times))
+        return float(np.cumsum(deltas[order]).max())
+
+    def active_voices(self, start: int, stop: int) -> int:
+        """Number of voice rows needed to render [start, stop)"""
+        lo = np.searchsorted(self.running_stop, start, side='right')
+        hi = np.searchsorted(self.ordered_starts, stop, side='left')
+        if hi <= lo:
+            return 0
+        return int(self.ordered_voices[lo:hi].max()) + 1
+
+
+class Synthesizer:
+    """
+    Polyphonic wavetable synthesizer that renders note events to 16-bit mono PCM.
+
+    Notes are assigned to a fixed pool of voices, each shaped by an ADSR
+    envelope. Audio is produced in fixed-size blocks as a (voice x sample)
+    matrix computed with whole-array NumPy operations into scratch buffers
+    that are allocated once and reused across blocks and renders, so cost
+    scales with audio length and allocation does not grow with note count.
+
+    Several voice tables (the layers of an arrangement) can be rendered
+    together: each block of every layer is computed on its own thread, since
+    the NumPy kernels release the GIL, and the layers are summed into one mix.
+    """
+
+    def __init__(self, sample_rate: int = 44100, table_size: int = 8192,
+                 block_size: int = 1 << 14, max_polyphony: int = 16, layer_threads: int = 4,
+                 dtype=np.float64):
+        if table_size & (table_size - 1):
+            raise ValueError('table_size must be a power of two')
+        self.sample_rate = sample_rate
+        self.table_size = table_size
+        self.block_size = block_size
+        self.max_polyphony = max_polyphony
+        self.layer_threads = layer_threads
+        # Working precision; float32 halves memory traffic at some cost in phase accuracy
+        self.dtype = np.dtype(dtype)
+
+        # Single-cycle wavetables and MIDI note -> Hz lookup, built once
+        phase = np.arange(table_size) / table_size
+        harmonics = np.arange(1, 9)[:, None]
+        self.wavetables = {
+            'sine': np.sin(2 * np.pi * phase),
+            'triangle': 1.0 - 4.0 * np.abs(phase - 0.5),
+            # First eight partials only, to keep aliasing down
+            'saw': (np.sin(2 * np.pi * harmonics * phase) / harmonics).sum(axis=0) * (2 / np.pi),
+            # One fixed cycle of noise; pitch sets how often it repeats
+            'noise': np.random.default_rng(0).uniform(-1.0, 1.0, table_size)
+        }
+        self.wavetables = {name: table.astype(self.dtype) for name, table in self.wavetables.items()}
+        self.wavetable = self.wavetables['sine']
+        self.note_frequencies = 440.0 * 2 ** ((np.arange(128) - 69) / 12)
+        self._ramp = np.arange(block_size, dtype=np.int64)
+
+        # Scratch buffer sets, checked out for the duration of one render
+        self._scratch_pool = []
+        self._scratch_lock = threading.Lock()
+        self.buffer_allocations = 0
+        self.blocks_rendered = 0
+        self._layer_pool = None
+        self._layer_pool_lock = threading.Lock()
+
+    def events_from_score(self, score: np.ndarray, ticks_per_beat: int, tempo: int) -> np.ndarray:
+        """
+        Build a note-event table straight from an in-memory score.
+
+        Args:
+            score: Structured array with 'tick', 'duration', 'note' and 'velocity' fields
+            ticks_per_beat: Resolution the score is timed in
+            tempo: BPM
+
+        Returns:
+            Structured array of NOTE_EVENT_DTYPE sorted by start sample
+        """
+        samples_per_tick = 60.0 / (tempo * ticks_per_beat) * self.sample_rate
+
+        events = np.zeros(len(score), dtype=NOTE_EVENT_DTYPE)
+        events['start'] = np.round(score['tick'] * samples_per_tick)
+        events['end'] = np.round((score['tick'] + score['duration']) * samples_per_tick)
+        events['frequency'] = self.note_frequencies[score['note'].astype(np.intp)]
+        events['velocity'] = score['velocity']
+        events.sort(order='start', kind='stable')
+        return events
+
+    def envelope_samples(self, envelope: Envelope = None) -> Tuple[int, int, float, int]:
+        attack, decay, sustain, release = envelope or DEFAULT_ENVELOPE
+        return (
+            max(1, int(attack * self.sample_rate)),
+            max(1, int(decay * self.sample_rate)),
+            sustain,
+            max(1, int(release * self.sample_rate))
+        )
+
+    def allocate_voices(self, events: np.ndarray, envelope: Envelope = None, waveform: str = 'sine',
+                        level: float = 1.0, name: str = None) -> VoiceTable:
+        """
+        Assign note events to voices.
+
+        Each note takes the lowest free voice and holds it through its release.
+        When all max_polyphony voices are busy, the voice that would free up
+        soonest is stolen and its note is cut off.
+
+        Args:
+            events: Note-event table (NOTE_EVENT_DTYPE)
+            envelope: ADSR envelope for every note
+            waveform: Key into self.wavetables
+            level: Mix level when rendered alongside other tables
+            name: Layer name, used for per-layer timings
+        """
+        env = self.envelope_samples(envelope)
+        release = env[3]
+        count = len(events)
+
+        order = np.argsort(events['start'], kind='stable')
+        starts = events['start'][order]
+        ends = np.maximum(events['end'][order], starts)
+        stops = ends + release
+        voices = np.zeros(count, dtype=np.int64)
+
+        free = list(range(self.max_polyphony))
+        busy = []  # (stop, voice, note index)
+        for i, (start, stop) in enumerate(zip(starts.tolist(), stops.tolist())):
+            while busy and busy[0][0] <= start:
+                heapq.heappush(free, heapq.heappop(busy)[1])
+            if free:
+                voice = heapq.heappop(free)
+            else:
+                _, voice, stolen = heapq.heappop(busy)
+                ends[stolen] = min(ends[stolen], start)
+                stops[stolen] = start
+            voices[i] = voice
+            heapq.heappush(busy, (stop, voice, i))
+
+        num_samples = int(stops.max()) if count else 0
+        by_voice = np.lexsort((starts, voices))
+        starts = starts[by_voice]
+        voices = voices[by_voice]
+
+        # Keys place every voice in its own disjoint range of sample positions
+        span = num_samples + 1
+        voice_offsets = np.arange(self.max_polyphony, dtype=np.int64) * span
+        frequencies = events['frequency'][order][by_voice]
+        velocities = events['velocity'][order][by_voice]
+
+        return VoiceTable(
+            keys=voice_offsets[voices] + starts,
+            voice_offsets=voice_offsets,
+            starts=starts,
+            gate_lengths=(ends[by_voice] - starts).astype(self.dtype),
+            stops=stops[by_voice],
+            increments=(frequencies * self.table_size / self.sample_rate).astype(self.dtype),
+            amplitudes=(velocities / 127.0 * 0.3).astype(self.dtype),
+            voices=voices,
+            envelope_samples=env,
+            num_samples=num_samples,
+            wavetable=self.wavetables[waveform],
+            level=level,
+            name=name
+        )
+
+    def gain(self, tables: Union[VoiceTable, Sequence[VoiceTable]]) -> float:
+        """Gain that puts the loudest possible chord of the mix at 0.8 full scale"""
+        peak = sum(table.level * table.peak_amplitude() for table in self._as_tables(tables))
+        return 0.8 / peak if peak > 0 else 0.0
+
+    def _mix_block(self, tables: List[VoiceTable], start: int, length: int, scratches: List[Dict],
+                   timer: StageTimer = None) -> np.ndarray:
+        """Render every table's block and sum them into the first table's scratch"""
+        timer = timer or StageTimer()
+        if len(tables) == 1:
+            return self._render_layer_block(tables[0], start, length, scratches[0], timer)
+
+        pool = self._get_layer_pool()
+        futures = [
+            pool.submit(self._render_layer_block, table, start, length, scratch, timer)
+            for table, scratch in zip(tables, scratches)
+        ]
+        blocks = [future.result() for future in futures]
+        mix = blocks[0]
+        for block in blocks[1:]:
+            mix += block
+        return mix
+
+    def _render_layer_block(self, table: VoiceTable, start: int, length: int, scratch: Dict,
+                            timer: StageTimer) -> np.ndarray:
+        with timer.stage(f"layer:{table.name or 'default'}"):
+            block = self._render_block(table, start, length, scratch)
+            if table.level != 1.0:
+                block *= table.level
+        return block
+
+    def _render_block(self, table: VoiceTable, start: int, length: int, scratch: Dict) -> np.ndarray:
+        """Render samples [start, start + length) into scratch['mix'] and return that view"""
+        mix = scratch['mix'][:length]
+        mix.fill(0.0)
+        # Layers render their blocks concurrently on the layer pool
+        with self._scratch_lock:
+            self.blocks_rendered += 1
+
+        voices = table.active_voices(start, start + length)
+        if voices == 0:
+            return mix
+
+        query = scratch['query'][:voices, :length]
+        gather = scratch['gather'][:voices, :length]
+        index = scratch['index'][:voices, :length]
+        offset = scratch['offset'][:voices, :length]
+        env = scratch['env'][:voices, :length]
+        work = scratch['work'][:voices, :length]
+        floats = scratch['floats'][:voices, :length]
+        valid = scratch['valid'][:voices, :length]
+        mask = scratch['mask'][:voices, :length]
+        voice_offsets = table.voice_offsets[:voices, None]
+
+        # Key of every (voice, sample) cell, then the last note starting at or before it
+        np.add(voice_offsets, self._ramp[None, :length], out=query)
+        query += start
+        index[...] = np.searchsorted(table.keys, query.ravel(), side='right').reshape(index.shape)
+        index -= 1
+        np.clip(index, 0, len(table) - 1, out=index)
+
+        # A cell belongs to that note only if it is on the same voice, at or
+        # after its start and before its release ends
+        np.take(table.keys, index, out=gather, mode='clip')
+        np.greater_equal(gather, voice_offsets, out=valid)
+        np.less_equal(gather, query, out=mask)
+        valid &= mask
+        np.subtract(query, gather, out=offset)
+
+        np.take(table.stops, index, out=gather, mode='clip')
+        gather += voice_offsets
+        np.less(query, gather, out=mask)
+        valid &= mask
+
+        self._envelope(table, index, offset, env, work, floats)
+        env *= valid
+        np.take(table.amplitudes, index, out=work, mode='clip')
+        env *= work
+
+        # Wavetable lookup at each cell's phase, folded into one cycle with a mask
+        np.take(table.increments, index, out=floats, mode='clip')
+        floats *= offset
+        np.copyto(index, floats, casting='unsafe')
+        index &= self.table_size - 1
+        np.take(table.wavetable, index, out=work, mode='clip')
+        work *= env
+        np.sum(work, axis=0, out=mix)
+        return mix
+
+    def _envelope(self, table: VoiceTable, index: np.ndarray, offset: np.ndarray,
+                  env: np.ndarray, work: np.ndarray, gate: np.ndarray):
+        """ADSR level of every cell, written to env"""
+        attack, decay, sustain, release = table.envelope_samples
+
+        # Attack/decay/sustain follow the offset, frozen at the gate length once released
+        np.take(table.gate_lengths, index, out=gate, mode='clip')
+        np.minimum(offset, gate, out=work)
+        np.multiply(work, 1.0 / attack, out=env)
+        work -= attack
+        work *= -(1.0 - sustain) / decay
+        work += 1.0
+        np.maximum(work, sustain, out=work)
+        np.minimum(env, work, out=env)
+
+        # Linear release from wherever the envelope was at note-off
+        np.subtract(offset, gate, out=work)
+        np.maximum(work, 0.0, out=work)
+        work *= -1.0 / release
+        work += 1.0
+        np.maximum(work, 0.0, out=work)
+        env *= work
+
+    def iter_pcm16(self, tables: Union[VoiceTable, Sequence[VoiceTable]], block_size: int = None,
+                   timer: StageTimer = None, num_samples: int = None) -> Iterator[np.ndarray]:
+        """
+        Render one voice table, or the mix of several, as 16-bit PCM blocks.
+
+        Gain comes from the voice tables rather than the rendered signal, so each
+        block can be emitted as soon as it is synthesized. Yielded arrays are
+        views into a scratch buffer, valid until the next block is requested.
+        Mixed block rendering is timed as 'synthesis', each layer's share of it
+        as 'layer:<name>', and PCM conversion as 'encoding'. num_samples cuts
+        the render short (or pads it with silence).
+        """
+        tables = self._as_tables(tables)
+        timer = timer or StageTimer()
+        block_size = min(block_size or self.block_size, self.block_size)
+        if num_samples is None:
+            num_samples = max((table.num_samples for table in tables), default=0)
+        gain = self.gain(tables) * 32767
+        scratches = [self._acquire_scratch() for _ in tables]
+        try:
+            for start in range(0, num_samples, block_size):
+                length = min(block_size, num_samples - start)
+                with timer.stage('synthesis'):
+                    audio = self._mix_block(tables, start, length, scratches, timer)
+                with timer.stage('encoding'):
+                    audio *= gain
+                    pcm = scratches[0]['pcm'][:length]
+                    np.copyto(pcm, audio, casting='unsafe')
+                yield pcm
+        finally:
+            for scratch in scratches:
+                self._release_scratch(scratch)
+
+    def wav_header(self, num_samples: int) -> bytes:
+        """RIFF header for a 16-bit mono WAV holding num_samples samples"""
+        data_size = num_samples * 2
+        return struct.pack(
+            '<4sI4s4sIHHIIHH4sI',
+            b'RIFF', 36 + data_size, b'WAVE',
+            b'fmt ', 16, 1, 1, self.sample_rate, self.sample_rate * 2, 2, 16,
+            b'data', data_size
+        )
+
+    def iter_wav(self, tables: Union[VoiceTable, Sequence[VoiceTable]], block_size: int = None,
+                 timer: StageTimer = None, num_samples: int = None) -> Iterator[bytes]:
+        """Yield a complete WAV file as its header followed by PCM blocks"""
+        tables = self._as_tables(tables)
+        if num_samples is None:
+            num_samples = max((table.num_samples for table in tables), default=0)
+        yield self.wav_header(num_samples)
+        for pcm in self.iter_pcm16(tables, block_size, timer, num_samples):
+            yield pcm.tobytes()
+
+    def write_wav(self, wav_path: str, tables: Union[VoiceTable, Sequence[VoiceTable]],
+                  timer: StageTimer = None, progress: Callable[[float], None] = None):
+        """
+        Render one voice table, or the mix of several, block by block into a WAV file.
+
+        progress, if given, is called with the fraction written after every block.
+        """
+        tables = self._as_tables(tables)
+        timer = timer or StageTimer()
+        num_samples = max((table.num_samples for table in tables), default=0)
+        written = 0
+        with open(wav_path, 'wb') as wav_file:
+            wav_file.write(self.wav_header(num_samples))
+            for pcm in self.iter_pcm16(tables, timer=timer):
+                with timer.stage('encoding'):
+                    wav_file.write(pcm.tobytes())
+                written += len(pcm)
+                if progress is not None:
+                    progress(written / num_samples)
+
+    def allocation_stats(self) -> Dict:
+        """Scratch buffer sets ever allocated versus blocks rendered with them"""
+        with self._scratch_lock:
+            return {
+                'buffer_allocations': self.buffer_allocations,
+                'blocks_rendered': self.blocks_rendered
+            }
+
+    def _as_tables(self, tables: Union[VoiceTable, Sequence[VoiceTable]]) -> List[VoiceTable]:
+        return [tables] if isinstance(tables, VoiceTable) else list(tables)
+
+    def _get_layer_pool(self) -> ThreadPoolExecutor:
+        with self._layer_pool_lock:
+            if self._layer_pool is None:
+                self._layer_pool = ThreadPoolExecutor(max_workers=self.layer_threads,
+                                                      thread_name_prefix='layer-render')
+            return self._layer_pool
+
+    def _acquire_scratch(self) -> Dict:
+        with self._scratch_lock:
+            if self._scratch_pool:
+                return self._scratch_pool.pop()
+            self.buffer_allocations += 1
+
+        shape = (self.max_polyphony, self.block_size)
+        return {
+            'query': np.empty(shape, dtype=np.int64),
+            'gather': np.empty(shape, dtype=np.int64),
+            'index': np.empty(shape, dtype=np.intp),
+            'offset': np.empty(shape, dtype=self.dtype),
+            'env': np.empty(shape, dtype=self.dtype),
+            'work': np.empty(shape, dtype=self.dtype),
+            'floats': np.empty(shape, dtype=self.dtype),
+            'valid': np.empty(shape, dtype=bool),
+            'mask': np.empty(shape, dtype=bool),
+            'mix': np.empty(self.block_size, dtype=self.dtype),
+            'pcm': np.empty(self.block_size, dtype=np.int16)
+        }
+
+    def _release_scratch(self, scratch: Dict):
+        with self._scratch_lock:
+            self._scratch_pool.append(scratch)
@@ -0,0 +1,130 @@
+import os
+import re
+from typing import Dict, Iterable, List, Tuple
+from src.utils.helpers import map_emotion_to_mood
+
+DEFAULT_LEXICON = os.path.join(os.path.dirname(__file__), '..', 'data', 'text_emotion_lexicon.tsv')
+
+# Words, keeping contractions whole ("don't"), and the punctuation that ends a clause
+TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)*|[.!?;:,]")
+CLAUSE_BREAKS = frozenset('.!?;:,')
+NEGATIONS = frozenset({
+    'not', 'no', 'never', 'nothing', 'nobody', 'none', 'neither', 'nor', 'without',
+    'hardly', 'barely', 'cannot', 'cant', 'dont', 'doesnt', 'didnt', 'isnt', 'wasnt', 'arent', 'aint'
+})
+# Multipliers for the next lexicon match
+MODIFIERS = {
+    'very': 1.5, 'really': 1.5, 'so': 1.3, 'too': 1.3, 'extremely': 2.0, 'incredibly': 2.0,
+    'super': 1.5, 'totally': 1.5, 'absolutely': 1.8, 'completely': 1.5, 'utterly': 1.8,
+    'deeply': 1.7, 'truly': 1.5, 'quite': 1.2, 'pretty': 1.1, 'most': 1.3, 'more': 1.2,
+    'slightly': 0.5, 'somewhat': 0.6, 'mildly': 0.5, 'kinda': 0.7, 'sorta': 0.7, 'little': 0.6
+}
+# Share of a negated term's weight taken away from its emotion ("not happy")
+NEGATED_WEIGHT = -0.5
+# Emotions in tie-break order
+EMOTIONS = ('happy', 'sad', 'angry', 'calm', 'anxious')
+
+
+def load_lexicon(path: str = DEFAULT_LEXICON) -> Dict[str, Tuple[str, float]]:
+    """term -> (emotion, weight) from a tab-separated file; lines starting with # are skipped"""
+    lexicon = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip() or line.startswith('#'):
+                continue
+            term, emotion, weight = line.rstrip('\n').split('\t')
+            lexicon[term] = (emotion, float(weight))
+    return lexicon
+
+
+class TextEmotionAnalyzer:
+    """
+    Lexicon-based emotion scoring for free text.
+
+    The lexicon is compiled once into a trie over words, and text is scanned
+    in a single pass that takes the longest term starting at each word, so
+    matching costs the same per word however many terms the lexicon holds
+    and never matches inside a longer word ("mad" in "made"). A negation
+    flips the sign (at reduced weight) of the terms in the next
+    negation_window words of its clause; intensifiers and softeners scale
+    the term that follows them.
+    """
+
+    def __init__(self, lexicon: Dict[str, Tuple[str, float]], negation_window: int = 3):
+        self.negation_window = negation_window
+        self.terms = len(lexicon)
+        self._trie = {}
+        for term, entry in lexicon.items():
+            node = self._trie
+            for word in TOKEN.findall(term.lower()):
+                node = node.setdefault(word, {})
+            node[None] = entry
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_LEXICON, **kwargs) -> 'TextEmotionAnalyzer':
+        return cls(load_lexicon(path), **kwargs)
+
+    def scores(self, text: str) -> Tuple[Dict[str, float], int]:
+        """Per-emotion score and number of lexicon matches in text"""
+        tokens = TOKEN.findall(text.lower())
+        scores = {}
+        matches = 0
+        negated = 0
+        boost = 1.0
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token in CLAUSE_BREAKS:
+                negated, boost = 0, 1.0
+                i += 1
+                continue
+
+            # Longest lexicon term starting here; phrases win over negation ("not bad")
+            entry, end = None, i
+            node = self._trie.get(token)
+            j = i
+            while node is not None:
+                if None in node:
+                    entry, end = node[None], j
+                j += 1
+                node = node.get(tokens[j]) if j < len(tokens) else None
+
+            if entry is not None:
+                emotion, weight = entry
+                weight *= boost * (NEGATED_WEIGHT if negated else 1.0)
+                scores[emotion] = scores.get(emotion, 0.0) + weight
+                matches += 1
+                negated = max(0, negated - (end - i + 1))
+                boost = 1.0
+                i = end + 1
+                continue
+
+            if token in NEGATIONS or token.endswith("n't"):
+                negated = self.negation_window
+            elif token in MODIFIERS:
+                boost *= MODIFIERS[token]
+            else:
+                negated = max(0, negated - 1)
+                boost = 1.0
+            i += 1
+        return scores, matches
+
+    def analyze(self, text: str) -> Dict:
+        scores, _ = self.scores(text)
+        emotion, score = 'neutral', 0.0
+        for candidate in sorted(scores, key=lambda e: EMOTIONS.index(e) if e in EMOTIONS else len(EMOTIONS)):
+            if scores[candidate] > score:
+                emotion, score = candidate, scores[candidate]
+        mood_coords = map_emotion_to_mood(emotion)
+        return {
+            'emotion': emotion,
+            'confidence': min(0.5 + score * 0.1, 0.95),
+            'valence': mood_coords['valence'],
+            'arousal': mood_coords['arousal']
+        }
+
+    def analyze_many(self, texts: Iterable[str]) -> List[Dict]:
+        """analyze() over many texts, scoring repeated texts once"""
+        results = {}
+        return [dict(results[text]) if text in results else results.setdefault(text, self.analyze(text))
+                for text in texts]
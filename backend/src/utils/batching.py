@@ -0,0 +1,118 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+
+class MicroBatcher:
+    """
+    Groups concurrent requests into batches for a single worker thread.
+
+    The worker takes the first waiting item, then keeps collecting until it
+    has max_batch_size items or max_wait_ms has passed since that first item
+    arrived, and hands the whole batch to process_batch. Each caller gets a
+    Future for its own result; if the batch fails, every Future in it fails.
+
+    Args:
+        process_batch: Maps a list of items to a list of results, in order
+        max_batch_size: Largest batch handed to process_batch
+        max_wait_ms: Longest a batch is held open waiting for more items
+        name: Worker thread name
+    """
+
+    def __init__(self, process_batch: Callable[[List[Any]], List[Any]], max_batch_size: int = 8,
+                 max_wait_ms: float = 5.0, name: str = 'micro-batcher'):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()  # (enqueued_at, item, future), or None to stop
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._batch_sizes = {}
+        self._queue_waits = deque(maxlen=2048)
+        self._batch_times = deque(maxlen=512)
+
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item: Any) -> Future:
+        future = Future()
+        self._queue.put((time.perf_counter(), item, future))
+        return future
+
+    def shutdown(self):
+        self._queue.put(None)
+        self._worker.join()
+
+    def stats(self) -> Dict:
+        """Batch-size histogram and queue-wait / batch-time percentiles in milliseconds"""
+        with self._stats_lock:
+            waits = sorted(self._queue_waits)
+            times = sorted(self._batch_times)
+            return {
+                'batches': self._batches,
+                'items': self._items,
+                'mean_batch_size': self._items / self._batches if self._batches else 0.0,
+                'batch_sizes': dict(sorted(self._batch_sizes.items())),
+                'queue_wait_ms': percentiles(waits),
+                'batch_time_ms': percentiles(times),
+                'queued': self._queue.qsize(),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000
+            }
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = first[0] + self.max_wait
+            stopping = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+
+            self._process(batch)
+            if stopping:
+                return
+
+    def _process(self, batch: list):
+        started = time.perf_counter()
+        # Callers that cancelled while queued are left out of the batch
+        live = [(item, future) for _, item, future in batch if future.set_running_or_notify_cancel()]
+        if live:
+            try:
+                results = self.process_batch([item for item, _ in live])
+                for (_, future), result in zip(live, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in live:
+                    future.set_exception(e)
+
+        finished = time.perf_counter()
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+            self._queue_waits.extend((started - enqueued_at) * 1000 for enqueued_at, _, _ in batch)
+            self._batch_times.append((finished - started) * 1000)
+
+
+def percentiles(values: list) -> Dict:
+    """p50/p90/p99/max of already sorted values"""
+    if not values:
+        return {'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0}
+    pick = lambda q: round(values[min(len(values) - 1, int(q * len(values)))], 3)
+    return {'p50': pick(0.5), 'p90': pick(0.9), 'p99': pick(0.99), 'max': round(values[-1], 3)}
@@ -1,9 +1,15 @@
 import jwt
 import bcrypt
+import hashlib
+import os
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify
 from src.config import Config
+from src.utils.cache import LRUCache
+
+# (path, size, mtime_ns) -> content hash, so each file is hashed once
+_etag_cache = LRUCache(max_entries=4096)
 
 def hash_password(password: str) -> str:
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
@@ -51,3 +57,18 @@ def map_emotion_to_mood(emotion: str) -> dict:
         'calm': {'valence': 0.6, 'arousal': 0.2}
     }
     return mapping.get(emotion.lower(), {'valence': 0.5, 'arousal': 0.5})
+
+
+def content_etag(path: str) -> str:
+    """Strong ETag for a file, derived from its content"""
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    etag = _etag_cache.get(key)
+    if etag is None:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        etag = digest.hexdigest()[:32]
+        _etag_cache.put(key, etag)
+    return etag
@@ -0,0 +1,33 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class StageTimer:
+    """
+    Accumulates wall-clock time per named stage.
+
+    A stage may be entered many times (once per rendered block, say); its
+    durations are summed. Stages may be timed from several threads at once.
+    """
+
+    def __init__(self):
+        self.durations = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.durations)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Import the app as `src.…`, the same way run.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,104 @@
+import threading
+import time
+import pytest
+from src.services.audius_cache import AudiusResponseCache, response_key
+
+TIMEOUT = 5
+
+
+class Upstream:
+    """Counts fetches and returns a new value for each"""
+
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self):
+        self.gate.wait(TIMEOUT)
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError('upstream down')
+        return f'response {self.calls}'
+
+
+def age(cache, seconds):
+    """Pretend every cached response was fetched seconds earlier"""
+    for key, (value, fetched_at) in cache._entries.items():
+        cache._entries.put(key, (value, fetched_at - seconds))
+
+
+def wait_for(condition):
+    deadline = time.time() + TIMEOUT
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_keys_ignore_spacing_and_query_case():
+    assert response_key('search', {'query': ' Arijit  Singh', 'limit': 10}) == \
+        response_key('search', {'limit': 10, 'query': 'arijit singh', 'offset': None})
+    assert response_key('user', {'handle': 'Arijit'}) != response_key('user', {'handle': 'arijit'})
+
+
+def test_fresh_responses_are_served_from_cache():
+    cache = AudiusResponseCache(ttls={'search': 60})
+    upstream = Upstream()
+
+    assert cache.get_or_fetch('search', {'query': 'calm'}, upstream) == 'response 1'
+    assert cache.get_or_fetch('search', {'query': 'CALM'}, upstream) == 'response 1'
+    assert upstream.calls == 1
+    assert cache.stats()['endpoints']['search'] == {'hits': 1, 'stale_hits': 0, 'misses': 1}
+
+
+def test_stale_response_is_served_while_one_refresh_runs():
+    cache = AudiusResponseCache(ttls={'trending': 60}, stale_seconds=600)
+    upstream = Upstream()
+    cache.get_or_fetch('trending', {}, upstream)
+    age(cache, 120)
+
+    upstream.gate.clear()
+    served = [cache.get_or_fetch('trending', {}, upstream) for _ in range(5)]
+    upstream.gate.set()
+
+    assert served == ['response 1'] * 5
+    wait_for(lambda: cache.stats()['refreshes'] == 1)
+    assert upstream.calls == 2
+    assert cache.get_or_fetch('trending', {}, upstream) == 'response 2'
+    assert cache.stats()['stale_hits'] == 5
+
+
+def test_failed_refresh_keeps_the_stale_copy():
+    cache = AudiusResponseCache(ttls={'trending': 60}, stale_seconds=600)
+    upstream = Upstream()
+    cache.get_or_fetch('trending', {}, upstream)
+    age(cache, 120)
+
+    upstream.fail = True
+    assert cache.get_or_fetch('trending', {}, upstream) == 'response 1'
+    wait_for(lambda: cache.stats()['refresh_errors'] == 1)
+    assert cache.get_or_fetch('trending', {}, upstream) == 'response 1'
+
+
+def test_expired_responses_are_refetched_inline():
+    cache = AudiusResponseCache(ttls={'search': 60}, stale_seconds=30)
+    upstream = Upstream()
+    cache.get_or_fetch('search', {'query': 'x'}, upstream)
+    age(cache, 100)
+
+    assert cache.get_or_fetch('search', {'query': 'x'}, upstream) == 'response 2'
+    assert cache.stats()['refreshes'] == 0
+
+
+def test_failures_are_not_cached():
+    cache = AudiusResponseCache()
+    upstream = Upstream()
+    upstream.fail = True
+
+    with pytest.raises(ConnectionError):
+        cache.get_or_fetch('search', {'query': 'x'}, upstream)
+    upstream.fail = False
+
+    assert cache.get_or_fetch('search', {'query': 'x'}, upstream) == 'response 2'
+    assert cache.stats()['entries'] == 1
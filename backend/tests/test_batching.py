@@ -0,0 +1,84 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from src.utils.batching import MicroBatcher, percentiles
+
+TIMEOUT = 5
+
+
+class Recorder:
+    def __init__(self, hold=None):
+        self.batches = []
+        self.hold = hold
+
+    def __call__(self, items):
+        if self.hold is not None:
+            self.hold.wait(TIMEOUT)
+        self.batches.append(list(items))
+        return [item * 10 for item in items]
+
+
+def test_concurrent_calls_are_merged_into_one_batch():
+    process = Recorder()
+    batcher = MicroBatcher(process, max_batch_size=8, max_wait_ms=200)
+    start = threading.Barrier(6)
+
+    def call(item):
+        start.wait(TIMEOUT)
+        return batcher.submit(item).result(TIMEOUT)
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(call, range(6)))
+    batcher.shutdown()
+
+    assert results == [0, 10, 20, 30, 40, 50]
+    assert len(process.batches) == 1
+    assert sorted(process.batches[0]) == list(range(6))
+    assert batcher.stats()['batch_sizes'] == {6: 1}
+
+
+def test_batches_are_capped_at_max_batch_size():
+    hold = threading.Event()
+    process = Recorder(hold)
+    batcher = MicroBatcher(process, max_batch_size=3, max_wait_ms=50)
+
+    futures = [batcher.submit(item) for item in range(7)]
+    hold.set()
+
+    assert [future.result(TIMEOUT) for future in futures] == [item * 10 for item in range(7)]
+    batcher.shutdown()
+    assert all(len(batch) <= 3 for batch in process.batches)
+    assert [item for batch in process.batches for item in batch] == list(range(7))
+
+
+def test_a_failing_batch_fails_every_caller():
+    def process(items):
+        raise ValueError('bad batch')
+
+    batcher = MicroBatcher(process, max_batch_size=4, max_wait_ms=50)
+    futures = [batcher.submit(item) for item in range(3)]
+
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(TIMEOUT)
+    batcher.shutdown()
+
+
+def test_cancelled_callers_are_left_out():
+    hold = threading.Event()
+    process = Recorder(hold)
+    batcher = MicroBatcher(process, max_batch_size=1, max_wait_ms=0)
+
+    blocking = batcher.submit('first')
+    cancelled = batcher.submit('second')
+    assert cancelled.cancel()
+    hold.set()
+
+    assert blocking.result(TIMEOUT) == 'first' * 10
+    batcher.shutdown()
+    assert process.batches == [['first']]
+
+
+def test_percentiles():
+    assert percentiles([]) == {'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0}
+    assert percentiles(list(range(1, 101))) == {'p50': 51, 'p90': 91, 'p99': 100, 'max': 100}
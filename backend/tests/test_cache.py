@@ -0,0 +1,38 @@
+from src.utils.cache import LRUCache
+
+
+def test_evicts_least_recently_used_past_max_entries():
+    evicted = []
+    cache = LRUCache(max_entries=2, on_evict=lambda key, value: evicted.append(key))
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+
+    assert evicted == ['b']
+    assert 'a' in cache and 'c' in cache
+    assert cache.stats()['evictions'] == 1
+
+
+def test_evicts_past_max_size_but_keeps_the_newest_entry():
+    cache = LRUCache(max_entries=10, max_size=10, sizeof=len)
+    cache.put('a', 'xxxx')
+    cache.put('b', 'xxxx')
+    cache.put('c', 'xxxx')
+    assert [key for key, _ in cache.items()] == ['b', 'c']
+    assert cache.size == 8
+
+    cache.put('huge', 'x' * 50)
+    assert [key for key, _ in cache.items()] == ['huge']
+
+
+def test_peek_and_pop_do_not_count_as_lookups():
+    cache = LRUCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.peek('a') == 1
+    cache.put('c', 3)
+
+    assert 'a' not in cache
+    assert cache.pop('b') == 2 and cache.pop('b') is None
+    assert cache.stats()['hits'] == 0
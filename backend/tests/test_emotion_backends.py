@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from src.services.emotion_backends import BACKENDS, create_backend, top_k_scores
+
+
+@pytest.mark.parametrize('name', BACKENDS)
+def test_backends_are_created_without_loading(name, tmp_path):
+    backend = create_backend(name, 'org/model', str(tmp_path))
+
+    assert backend.name == name
+    assert backend.image_processor is None
+
+
+def test_onnx_backends_keep_separate_model_files(tmp_path):
+    fp32 = create_backend('onnx', 'org/model', str(tmp_path))
+    int8 = create_backend('onnx-int8', 'org/model', str(tmp_path))
+
+    assert fp32.model_path.endswith('model.onnx') and int8.model_path.endswith('model.int8.onnx')
+    assert 'org--model' in fp32.model_path
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_backend('tensorrt', 'org/model')
+
+
+def test_top_k_scores_match_softmax_order():
+    logits = np.array([[1.0, 3.0, 2.0], [0.0, 0.0, 5.0]])
+    labels = {0: 'sad', 1: 'happy', 2: 'angry'}
+
+    first, second = top_k_scores(logits, labels, k=2)
+
+    assert [item['label'] for item in first] == ['happy', 'angry']
+    expected = np.exp(3.0) / np.exp([1.0, 3.0, 2.0]).sum()
+    assert first[0]['score'] == pytest.approx(expected, rel=1e-6)
+    assert second[0]['label'] == 'angry'
+    assert len(top_k_scores(logits, labels, k=10)[0]) == 3
@@ -0,0 +1,61 @@
+import cv2
+import numpy as np
+from src.services.emotion_cache import EmotionResultCache, content_hash, dhash, hamming
+
+RESULT = {'emotion': 'happy', 'confidence': 0.9, 'valence': 0.8, 'arousal': 0.6}
+
+
+def photo(seed=0):
+    rng = np.random.default_rng(seed)
+    img = cv2.resize(rng.integers(0, 256, (12, 12, 3), dtype=np.uint8), (240, 240), interpolation=cv2.INTER_CUBIC)
+    return img
+
+
+def reencoded(img, quality):
+    return cv2.imdecode(cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])[1], cv2.IMREAD_COLOR)
+
+
+def test_dhash_is_stable_under_reencoding_and_distinguishes_images():
+    original = photo()
+
+    assert hamming(dhash(original), dhash(reencoded(original, 60))) <= 4
+    assert hamming(dhash(original), dhash(photo(seed=1))) > 10
+
+
+def test_exact_hit_never_computes_the_fingerprint():
+    cache = EmotionResultCache(perceptual_distance=4)
+    cache.put(content_hash(b'image'), RESULT, fingerprint=1)
+
+    def fingerprint():
+        raise AssertionError('decoded on an exact hit')
+
+    assert cache.get(content_hash(b'image'), fingerprint) == RESULT
+    assert cache.stats()['exact_hits'] == 1
+
+
+def test_near_duplicate_is_a_perceptual_hit():
+    original = photo()
+    cache = EmotionResultCache(perceptual_distance=6)
+    cache.put(content_hash(b'original'), RESULT, dhash(original))
+
+    copy = reencoded(original, 50)
+    assert cache.get(content_hash(b'copy'), lambda: dhash(copy)) == RESULT
+    assert cache.get(content_hash(b'other'), lambda: dhash(photo(seed=1))) is None
+
+    stats = cache.stats()
+    assert stats['perceptual_hits'] == 1 and stats['misses'] == 1
+
+
+def test_exact_only_cache_ignores_fingerprints():
+    cache = EmotionResultCache()
+    cache.put(content_hash(b'original'), RESULT)
+
+    assert cache.get(content_hash(b'copy'), lambda: 0) is None
+
+
+def test_returned_results_are_copies():
+    cache = EmotionResultCache()
+    cache.put('digest', RESULT)
+    cache.get('digest')['emotion'] = 'sad'
+
+    assert cache.get('digest')['emotion'] == 'happy'
@@ -0,0 +1,124 @@
+import threading
+import cv2
+import numpy as np
+import pytest
+from src.services.emotion_service import EmotionService, ModelNotReadyError, emotion_result, group_mood
+
+TIMEOUT = 5
+
+
+class FakeBackend:
+    """Stands in for an inference backend; scores every face 'happy'"""
+
+    name = 'fake'
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.loads = 0
+        self.batches = []
+        self.id2label = {0: 'happy', 1: 'sad'}
+        self.image_processor = None
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def load(self):
+        self.gate.wait(TIMEOUT)
+        self.loads += 1
+        if self.fail:
+            raise RuntimeError('no weights')
+        self.image_processor = lambda images, return_tensors: {'pixel_values': np.zeros((1, 3, 4, 4))}
+
+    def logits(self, pixel_values):
+        self.batches.append(len(pixel_values))
+        return np.tile([2.0, 0.0], (len(pixel_values), 1))
+
+
+def make_service(backend, **kwargs):
+    service = EmotionService('fake/model', retry_after=9, **kwargs)
+    service.backend = backend
+    return service
+
+
+FACE = np.zeros((8, 8, 3), dtype=np.uint8)
+
+
+def test_construction_does_not_load_the_model():
+    backend = FakeBackend()
+    service = make_service(backend)
+
+    assert service.status()['state'] == 'pending'
+    assert backend.loads == 0
+
+
+def test_warmup_loads_in_the_background_with_one_forward_pass():
+    backend = FakeBackend()
+    service = make_service(backend)
+
+    service.start_warmup()
+
+    assert service.wait_ready(TIMEOUT)
+    assert backend.loads == 1 and backend.batches == [1]
+    assert service.status()['load_seconds'] is not None
+
+
+def test_lazy_service_loads_on_the_first_face():
+    backend = FakeBackend()
+    service = make_service(backend)
+
+    scores = service.classify_face(FACE)
+
+    assert scores[0]['label'] == 'happy'
+    assert service.ready and backend.loads == 1
+
+
+def test_failed_load_turns_requests_away_and_retries():
+    backend = FakeBackend(fail=True)
+    service = make_service(backend)
+    service.start_warmup()
+    service.wait_ready(TIMEOUT)
+
+    backend.fail = False
+    backend.gate.clear()
+    with pytest.raises(ModelNotReadyError) as raised:
+        service.classify_face(FACE)
+    assert raised.value.retry_after == 9
+
+    # The rejected request started another load in the background
+    backend.gate.set()
+    assert service.wait_ready(TIMEOUT)
+    assert backend.loads == 2
+    assert service.status()['error'] is None
+
+
+def jpeg(width=120, height=80):
+    return cv2.imencode('.jpg', np.full((height, width, 3), 128, dtype=np.uint8))[1].tobytes()
+
+
+def test_analyze_images_classifies_every_face_largest_first():
+    backend = FakeBackend()
+    service = make_service(backend, batch_wait_ms=50)
+    service.face_detector.detect = lambda img: [(0, 0, 10, 10), (20, 20, 30, 30)]
+
+    results = service.analyze_images([jpeg(), b'not an image', jpeg()])
+
+    assert [box['box'] for box in results[0]['faces']] == [[20, 20, 30, 30], [0, 0, 10, 10]]
+    assert results[0]['faces'][0]['emotion'] == 'happy'
+    assert 'error' in results[1]
+    assert len(results[2]['faces']) == 2
+    # All four faces went to the classifier in shared batches
+    assert sum(backend.batches) == 4 and len(backend.batches) < 4
+
+
+def test_group_mood_averages_faces():
+    faces = [
+        emotion_result([{'label': 'Happy', 'score': 0.6}, {'label': 'Sad', 'score': 0.4}]),
+        emotion_result([{'label': 'Sad', 'score': 0.9}, {'label': 'Happy', 'score': 0.1}]),
+    ]
+
+    mood = group_mood(faces)
+
+    assert mood['emotion'] == 'sad'
+    assert mood['confidence'] == pytest.approx(0.65)
+    assert mood['valence'] == pytest.approx((faces[0]['valence'] + faces[1]['valence']) / 2)
+    assert mood['faces'] == 2
+    assert group_mood([]) is None
@@ -0,0 +1,90 @@
+import time
+import cv2
+import numpy as np
+import pytest
+from src.services.emotion_stream import EmotionStreamService
+from src.services.face_detection import FaceDetector
+
+BOX = (60, 40, 50, 50)
+
+
+class FakeEmotionService:
+    """Finds the face at BOX and labels faces with a scripted list of emotions"""
+
+    def __init__(self, emotions, faces=(BOX,)):
+        self.face_detector = FaceDetector(detect_size=0)
+        self.face_detector.detect = self.detect
+        self.faces = list(faces)
+        self.emotions = list(emotions)
+        self.detections = 0
+
+    def detect(self, img):
+        self.detections += 1
+        return list(self.faces)
+
+    def classify_face(self, face):
+        emotion = self.emotions.pop(0)
+        return [{'label': emotion, 'score': 0.8}, {'label': 'neutral', 'score': 0.2}]
+
+
+def frame(shift=0):
+    rng = np.random.default_rng(0)
+    img = np.full((160, 200, 3), 90, dtype=np.uint8)
+    x, y, w, h = BOX
+    patch = cv2.resize(rng.integers(0, 256, (10, 10, 3), dtype=np.uint8), (w, h), interpolation=cv2.INTER_CUBIC)
+    img[y:y + h, x + shift:x + shift + w] = patch
+    return cv2.imencode('.png', img)[1].tobytes()
+
+
+def test_face_is_tracked_and_classified_every_nth_frame():
+    emotion_service = FakeEmotionService(['happy', 'happy'])
+    streams = EmotionStreamService(emotion_service, classify_every=3, window=1)
+    session = streams.open('user')
+
+    results = [streams.process_frame(session, frame(shift)) for shift in (0, 2, 4, 6)]
+
+    assert emotion_service.detections == 1
+    assert [r['tracked'] for r in results] == [False, True, True, True]
+    assert results[-1]['box'] == [BOX[0] + 6, BOX[1], BOX[2], BOX[3]]
+    assert [r['classified'] for r in results] == [True, False, False, True]
+    assert [r['changed'] for r in results] == [True, False, False, False]
+
+
+def test_mood_is_smoothed_over_the_window():
+    emotion_service = FakeEmotionService(['happy', 'happy', 'sad', 'sad', 'sad'])
+    streams = EmotionStreamService(emotion_service, classify_every=1, window=3)
+    session = streams.open('user')
+
+    moods = [streams.process_frame(session, frame()) for _ in range(5)]
+
+    assert [r['mood']['emotion'] for r in moods] == ['happy', 'happy', 'happy', 'sad', 'sad']
+    assert [r['changed'] for r in moods] == [True, False, False, True, False]
+    assert moods[-1]['mood']['samples'] == 3
+
+
+def test_frames_without_a_face_are_not_classified():
+    emotion_service = FakeEmotionService([], faces=())
+    streams = EmotionStreamService(emotion_service)
+    session = streams.open('user')
+
+    result = streams.process_frame(session, frame())
+
+    assert result['face'] is False and result['classified'] is False and result['mood'] is None
+
+
+def test_bad_frame_is_rejected():
+    streams = EmotionStreamService(FakeEmotionService([]))
+    with pytest.raises(ValueError):
+        streams.process_frame(streams.open('user'), b'not an image')
+
+
+def test_sessions_belong_to_their_user_and_expire():
+    streams = EmotionStreamService(FakeEmotionService([]), idle_seconds=30)
+    session = streams.open('alice')
+
+    assert streams.get(session.id, 'alice') is session
+    assert streams.get(session.id, 'bob') is None
+
+    session.last_seen = time.time() - 60
+    assert streams.get(session.id, 'alice') is None
+    assert streams.stats()['sessions'] == 0
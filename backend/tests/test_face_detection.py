@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+import pytest
+from src.services.face_detection import FaceDetector, image_size
+
+
+def jpeg(width, height):
+    img = np.zeros((height, width, 3), dtype=np.uint8)
+    img[:, width // 2:] = 255
+    return cv2.imencode('.jpg', img)[1].tobytes()
+
+
+@pytest.mark.parametrize('width, reduction', [(500, 1), (1400, 2), (2600, 4), (8000, 8)])
+def test_decode_reduces_to_cover_the_detection_size(width, reduction):
+    detector = FaceDetector(detect_size=640)
+    img, chosen = detector.decode(jpeg(width, width // 2))
+
+    assert chosen == reduction
+    assert max(img.shape[:2]) == pytest.approx(width / reduction, abs=1)
+    assert max(img.shape[:2]) >= 640 or reduction == 1
+
+
+def test_decode_rejects_invalid_images():
+    assert image_size(b'not an image') is None
+    with pytest.raises(ValueError):
+        FaceDetector().decode(b'not an image')
+
+
+def test_boxes_found_on_the_proxy_map_back_to_the_image(monkeypatch):
+    detector = FaceDetector(detect_size=100)
+    proxies = []
+
+    def detect_haar(proxy):
+        proxies.append(proxy.shape[:2])
+        return [(10, 5, 30, 40), (90, 30, 20, 30)]
+
+    monkeypatch.setattr(detector, '_detect_haar', detect_haar)
+    faces = detector.detect(np.zeros((200, 400, 3), dtype=np.uint8))
+
+    assert proxies == [(50, 100)]
+    # The second box runs off the proxy's edge and is clamped to the image
+    assert faces == [(40, 20, 120, 160), (360, 120, 40, 80)]
+
+
+def test_small_crops_come_from_the_full_resolution_image():
+    image_bytes = jpeg(2600, 1300)
+    detector = FaceDetector(detect_size=640, min_crop=224)
+    img, reduction = detector.decode(image_bytes)
+
+    small = detector.crop(image_bytes, img, reduction, (10, 10, 50, 50))
+    large = detector.crop(image_bytes, img, reduction, (10, 10, 300, 300))
+
+    assert small.shape[:2] == (50 * reduction, 50 * reduction)
+    assert large.shape[:2] == (300, 300)
+
+
+def test_image_without_faces():
+    with pytest.raises(ValueError):
+        FaceDetector().largest_face(jpeg(320, 240))
@@ -0,0 +1,74 @@
+import os
+import time
+from src.services.file_store import GeneratedFileStore, sharded_path
+
+
+def artifact(root, stem, size=10, extension='wav'):
+    path = sharded_path(str(root), stem, extension)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    return path
+
+
+def test_files_sharing_a_stem_share_a_shard(tmp_path):
+    wav = sharded_path(str(tmp_path), 'generated_1', 'wav')
+    midi = sharded_path(str(tmp_path), 'generated_1', 'mid')
+
+    assert os.path.dirname(wav) == os.path.dirname(midi) != str(tmp_path)
+    assert os.path.isdir(os.path.dirname(wav))
+
+
+def test_sweep_removes_only_expired_files(tmp_path):
+    store = GeneratedFileStore(str(tmp_path), ttl_seconds=60)
+    short = store.register(artifact(tmp_path, 'short'), ttl_seconds=10)
+    default = store.register(artifact(tmp_path, 'default'))
+
+    assert store.sweep(now=time.time()) == 0
+    assert store.sweep(now=time.time() + 30) == 1
+    assert not os.path.exists(short) and os.path.exists(default)
+
+    assert store.sweep(now=time.time() + 120) == 1
+    assert store.stats()['files'] == 0
+    assert store.stats()['bytes_removed'] == 20
+
+
+def test_sweep_enforces_the_disk_budget_soonest_due_first(tmp_path):
+    store = GeneratedFileStore(str(tmp_path), ttl_seconds=3600, max_bytes=25)
+    first = store.register(artifact(tmp_path, 'first'), ttl_seconds=100)
+    second = store.register(artifact(tmp_path, 'second'), ttl_seconds=200)
+    third = store.register(artifact(tmp_path, 'third'), ttl_seconds=300)
+
+    assert store.sweep() == 1
+    assert not os.path.exists(first)
+    assert os.path.exists(second) and os.path.exists(third)
+    assert store.stats()['bytes'] == 20
+
+
+def test_reregistering_does_not_double_count(tmp_path):
+    store = GeneratedFileStore(str(tmp_path))
+    path = artifact(tmp_path, 'same')
+    store.register(path)
+    store.register(path)
+
+    assert store.stats()['files'] == 1
+    assert store.stats()['bytes'] == 10
+
+
+def test_index_is_shared_between_stores(tmp_path):
+    path = GeneratedFileStore(str(tmp_path)).register(artifact(tmp_path, 'shared'), ttl_seconds=1)
+
+    assert GeneratedFileStore(str(tmp_path)).sweep(now=time.time() + 5) == 1
+    assert not os.path.exists(path)
+
+
+def test_sweeper_thread_stops(tmp_path):
+    store = GeneratedFileStore(str(tmp_path))
+    path = store.register(artifact(tmp_path, 'expired'), ttl_seconds=-1)
+    store.start_sweeper(interval=0.01)
+
+    deadline = time.time() + 5
+    while os.path.exists(path) and time.time() < deadline:
+        time.sleep(0.01)
+    store.stop()
+
+    assert not os.path.exists(path)
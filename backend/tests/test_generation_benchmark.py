@@ -0,0 +1,43 @@
+import pytest
+from benchmarks.generation_benchmark import STAGES, compare, parse_moods, run_point
+from src.utils.timing import StageTimer
+
+POINT = {'style': 'melodic', 'duration': 15, 'tempo': 120, 'valence': 0.5, 'arousal': 0.5}
+
+
+def test_stage_timer_sums_repeated_stages():
+    timer = StageTimer()
+    timer.add('synthesis', 0.25)
+    with timer.stage('synthesis'):
+        pass
+    timer.add('encoding', 0.5)
+
+    durations = timer.as_dict()
+    assert 0.25 <= durations['synthesis'] < 0.5
+    assert durations['encoding'] == 0.5
+
+
+def test_run_point_reports_realtime_factor_and_stages(tmp_path):
+    result = run_point(POINT, str(tmp_path), write_midi=False, repeat=1)
+
+    assert result['audio_seconds'] > 0
+    assert result['realtime_factor'] == pytest.approx(result['wall_seconds'] / result['audio_seconds'], abs=1e-4)
+    assert set(result['stages']) == set(STAGES)
+    assert result['stages']['midi_io'] == 0.0
+    assert result['allocations']['buffer_allocations'] >= 1
+    assert not any(tmp_path.rglob('*.wav'))
+
+
+def test_compare_flags_points_slower_than_the_threshold():
+    baseline = {'results': [dict(POINT, wall_seconds=1.0), dict(POINT, style='ambient', wall_seconds=1.0)]}
+    results = [dict(POINT, wall_seconds=1.2), dict(POINT, style='ambient', wall_seconds=1.1),
+               dict(POINT, style='rhythmic', wall_seconds=9.0)]
+
+    regressions = compare(results, baseline, threshold=0.15)
+
+    assert [regression['point'] for regression in regressions] == ['melodic/15s/120bpm/v0.5/a0.5']
+    assert regressions[0]['change'] == 0.2
+
+
+def test_parse_moods():
+    assert parse_moods('0.2:0.8,0.5:0.5') == [(0.2, 0.8), (0.5, 0.5)]
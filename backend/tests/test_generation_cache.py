@@ -0,0 +1,73 @@
+import os
+from src.services.generation_cache import GenerationCache, deterministic_parameters
+
+PARAMETERS = {'valence': 0.61, 'arousal': 0.42, 'duration': 30, 'tempo': None, 'style': 'auto'}
+
+
+def rendered(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(b'x' * size)
+    return str(path)
+
+
+def test_put_moves_the_file_into_the_cache(tmp_path):
+    cache = GenerationCache(str(tmp_path / 'cache'))
+    key = cache.key_for(PARAMETERS)
+    source = rendered(tmp_path, 'out.wav', 10)
+
+    path = cache.put(key, source)
+
+    assert not os.path.exists(source)
+    assert cache.get(key) == path
+    assert cache.get(cache.key_for(dict(PARAMETERS, duration=31))) is None
+
+
+def test_eviction_deletes_the_file(tmp_path):
+    cache = GenerationCache(str(tmp_path / 'cache'), max_entries=10, max_bytes=25)
+    first = cache.put('first', rendered(tmp_path, 'a.wav', 10))
+    cache.put('second', rendered(tmp_path, 'b.wav', 10))
+    cache.put('third', rendered(tmp_path, 'c.wav', 10))
+
+    assert not os.path.exists(first)
+    assert cache.get('first') is None
+    assert cache.get('third') is not None
+
+
+def test_index_is_rebuilt_from_disk(tmp_path):
+    cache = GenerationCache(str(tmp_path / 'cache'))
+    path = cache.put('kept', rendered(tmp_path, 'a.wav', 10))
+
+    assert GenerationCache(str(tmp_path / 'cache')).get('kept') == path
+
+
+def test_missing_file_is_a_miss(tmp_path):
+    cache = GenerationCache(str(tmp_path / 'cache'))
+    os.remove(cache.put('gone', rendered(tmp_path, 'a.wav', 10)))
+
+    assert cache.get('gone') is None
+
+
+def test_key_depends_on_version(tmp_path):
+    old = GenerationCache(str(tmp_path / 'cache'), version=1)
+    new = GenerationCache(str(tmp_path / 'cache'), version=2)
+
+    assert old.key_for(PARAMETERS) == old.key_for(dict(PARAMETERS))
+    assert old.key_for(PARAMETERS) != new.key_for(PARAMETERS)
+
+
+def test_nearby_moods_share_a_seed():
+    seeded = deterministic_parameters(PARAMETERS, quantum=0.05)
+    nearby = deterministic_parameters(dict(PARAMETERS, valence=0.62), quantum=0.05)
+    far = deterministic_parameters(dict(PARAMETERS, valence=0.9), quantum=0.05)
+
+    assert seeded['seed'] == nearby['seed'] != far['seed']
+    # The coordinates themselves are rendered as sent
+    assert nearby['valence'] == 0.62
+
+
+def test_user_seed_and_variation_change_the_seed():
+    base = deterministic_parameters(PARAMETERS, quantum=0.05)['seed']
+
+    assert deterministic_parameters(PARAMETERS, quantum=0.05, user_seed=7)['seed'] != base
+    assert deterministic_parameters(PARAMETERS, quantum=0.05, variation=1)['seed'] != base
+    assert deterministic_parameters(PARAMETERS, quantum=0.05, variation=0)['seed'] == base
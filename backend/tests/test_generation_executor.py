@@ -0,0 +1,138 @@
+import threading
+from concurrent.futures import CancelledError
+import pytest
+from src.services.generation_executor import GenerationExecutor, QueueFullError
+
+TIMEOUT = 5
+
+
+class BlockingGenerator:
+    """Stands in for MusicGenerator; every job waits until released"""
+
+    output_dir = None
+    write_midi = False
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def generate_music(self, timer=None, progress=None, **kwargs):
+        self.release.wait(TIMEOUT)
+        if progress is not None:
+            progress(1.0)
+        return None, kwargs['name']
+
+
+class Recorder:
+    def __init__(self):
+        self.started = []
+        self.done = {}
+        self._finished = {}
+
+    def on_start(self, job_id):
+        self.started.append(job_id)
+
+    def on_done(self, job_id, result, error, timings=None):
+        self.done[job_id] = (result, error, timings)
+        self._finished.setdefault(job_id, threading.Event()).set()
+
+    def wait(self, job_id):
+        assert self._finished.setdefault(job_id, threading.Event()).wait(TIMEOUT)
+        return self.done[job_id]
+
+
+@pytest.fixture
+def generator():
+    generator = BlockingGenerator()
+    yield generator
+    generator.release.set()
+
+
+def make_executor(generator, **kwargs):
+    return GenerationExecutor(generator, mode='thread', **kwargs)
+
+
+def submit(executor, recorder, job_id):
+    return executor.submit(job_id, {'name': job_id}, recorder.on_start, recorder.on_done)
+
+
+def test_reports_result_and_timings(generator):
+    executor = make_executor(generator, max_workers=1)
+    recorder = Recorder()
+    generator.release.set()
+
+    assert submit(executor, recorder, 'a') == 0
+    result, error, timings = recorder.wait('a')
+
+    assert recorder.started == ['a']
+    assert result == (None, 'a') and error is None
+    assert isinstance(timings, dict)
+    executor.shutdown()
+
+
+def test_rejects_jobs_once_the_queue_is_full(generator):
+    executor = make_executor(generator, max_workers=1, max_queue=2, retry_after=7)
+    recorder = Recorder()
+
+    assert submit(executor, recorder, 'running') == 0
+    assert submit(executor, recorder, 'first') == 1
+    assert submit(executor, recorder, 'second') == 2
+    assert executor.queue_position('second') == 2
+    assert executor.retry_after_if_full() == 7
+
+    with pytest.raises(QueueFullError) as raised:
+        submit(executor, recorder, 'rejected')
+    assert raised.value.retry_after == 7
+
+    generator.release.set()
+    for job_id in ('running', 'first', 'second'):
+        assert recorder.wait(job_id)[1] is None
+    assert 'rejected' not in recorder.started
+    executor.shutdown()
+
+
+def test_reserved_slots_count_against_the_workers(generator):
+    executor = make_executor(generator, max_workers=1, retry_after=3)
+    recorder = Recorder()
+    generator.release.set()
+
+    assert executor.reserve('stream') is None
+    assert executor.reserve('another stream') == 3
+    assert submit(executor, recorder, 'queued') == 1
+
+    executor.release('stream')
+    assert recorder.wait('queued')[1] is None
+    executor.shutdown()
+
+
+def test_shutdown_reports_queued_jobs_as_cancelled(generator):
+    executor = make_executor(generator, max_workers=1)
+    recorder = Recorder()
+    submit(executor, recorder, 'running')
+    submit(executor, recorder, 'queued')
+
+    generator.release.set()
+    executor.shutdown()
+
+    assert recorder.wait('running')[1] is None
+    assert isinstance(recorder.wait('queued')[1], CancelledError)
+    assert recorder.started == ['running']
+
+
+def test_slow_on_done_does_not_hold_up_the_next_job(generator):
+    executor = make_executor(generator, max_workers=1)
+    recorder = Recorder()
+    next_started = threading.Event()
+
+    def slow_on_done(job_id, result, error, timings=None):
+        # Only returns once the queued job has been started
+        next_started.wait(TIMEOUT)
+        recorder.on_done(job_id, result, error, timings)
+
+    executor.submit('slow', {'name': 'slow'}, recorder.on_start, slow_on_done)
+    executor.submit('next', {'name': 'next'}, lambda job_id: next_started.set(), recorder.on_done)
+    generator.release.set()
+
+    assert next_started.wait(TIMEOUT)
+    assert recorder.wait('slow')[1] is None
+    assert recorder.wait('next')[1] is None
+    executor.shutdown()
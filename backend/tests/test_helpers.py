@@ -0,0 +1,16 @@
+import os
+from src.utils.helpers import content_etag
+
+
+def test_etag_follows_content(tmp_path):
+    first = tmp_path / 'a.wav'
+    copy = tmp_path / 'b.wav'
+    first.write_bytes(b'RIFF one')
+    copy.write_bytes(b'RIFF one')
+
+    assert content_etag(str(first)) == content_etag(str(copy))
+
+    first.write_bytes(b'RIFF two')
+    stat = os.stat(first)
+    os.utime(first, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert content_etag(str(first)) != content_etag(str(copy))
@@ -0,0 +1,102 @@
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+import pytest
+from src.services.inference_worker import InferenceClient, InferenceWorkerError
+
+AUTHKEY = b'test-key'
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the worker process. The fake service labels each face with its
+# shape and pixel sum, so the test can see what arrived.
+WORKER = '''
+import sys
+from src.services.emotion_service import ModelNotReadyError
+from src.services.inference_worker import InferenceServer
+
+
+class FakeEmotionService:
+    def __init__(self, state):
+        self.state = state
+
+    def load(self, warm=False):
+        pass
+
+    def status(self):
+        return {'state': self.state, 'error': None}
+
+    def classify_faces(self, faces):
+        if self.state != 'ready':
+            raise ModelNotReadyError(self.state, 5)
+        return [[{'label': 'x'.join(map(str, face.shape)), 'score': float(face.sum())}] for face in faces]
+
+
+socket_path, state, authkey = sys.argv[1:]
+InferenceServer(FakeEmotionService(state), socket_path, authkey.encode()).serve_forever()
+'''
+
+
+@pytest.fixture
+def serve(tmp_path):
+    """Start a worker process for a fake service in the given state; returns a client"""
+    started = []
+
+    def serve(state='ready'):
+        socket_path = str(tmp_path / f'{state}.sock')
+        # A separate interpreter, as gunicorn.conf.py starts it
+        process = subprocess.Popen([sys.executable, '-c', WORKER, socket_path, state, AUTHKEY.decode()],
+                                   cwd=BACKEND_DIR, stdout=subprocess.DEVNULL)
+        client = InferenceClient(socket_path, AUTHKEY, timeout=5)
+        started.append((process, client))
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            try:
+                client.status()
+                break
+            except InferenceWorkerError:
+                time.sleep(0.05)
+        return client
+
+    yield serve
+    for process, client in started:
+        client.close()
+        process.kill()
+        process.wait()
+
+
+def test_faces_travel_through_shared_memory(serve):
+    client = serve()
+    faces = [np.full((4, 3, 3), 2, dtype=np.uint8), np.ones((2, 5, 3), dtype=np.uint8)]
+
+    assert client.status()['state'] == 'ready'
+    results = client.classify(faces)
+
+    assert results == [[{'label': '4x3x3', 'score': 72.0}], [{'label': '2x5x3', 'score': 30.0}]]
+
+
+def test_buffer_grows_for_larger_batches(serve):
+    client = serve()
+    client.classify([np.zeros((8, 8, 3), dtype=np.uint8)])
+    first = client._buffer.name
+
+    big = np.ones((1024, 1024, 3), dtype=np.uint8)
+    assert client.classify([big])[0][0]['score'] == float(big.size)
+    assert client._buffer.name != first
+
+
+def test_model_not_ready_is_reported_with_its_state(serve):
+    client = serve('loading')
+
+    with pytest.raises(InferenceWorkerError) as raised:
+        client.classify([np.zeros((2, 2, 3), dtype=np.uint8)])
+    assert raised.value.state == 'loading'
+
+
+def test_missing_worker_is_unavailable(tmp_path):
+    client = InferenceClient(str(tmp_path / 'nobody.sock'), AUTHKEY, timeout=1)
+
+    with pytest.raises(InferenceWorkerError) as raised:
+        client.status()
+    assert raised.value.state == 'unavailable'
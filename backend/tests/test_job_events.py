@@ -0,0 +1,76 @@
+import queue
+import pytest
+from src.services.job_events import JobEventBus
+
+
+def drain(subscriber):
+    events = []
+    while True:
+        try:
+            events.append(subscriber.get_nowait())
+        except queue.Empty:
+            return events
+
+
+def test_late_subscriber_is_replayed_then_receives_live_events():
+    bus = JobEventBus()
+    bus.register('job', 'user')
+    bus.publish('job', 'queued', position=1)
+    bus.publish('job', 'processing')
+
+    subscriber = bus.subscribe('job')
+    bus.publish('job', 'progress', percent=50)
+
+    events = drain(subscriber)
+    assert [event.type for event in events] == ['queued', 'processing', 'progress']
+    assert events[0].data == {'position': 1}
+    assert events[2].data == {'percent': 50}
+
+
+def test_reconnect_replays_only_missed_events():
+    bus = JobEventBus()
+    bus.register('job', 'user')
+    seen = bus.publish('job', 'processing')
+    bus.publish('job', 'progress', percent=10)
+    bus.publish('job', 'progress', percent=20)
+
+    events = drain(bus.subscribe('job', last_event_id=seen.id))
+
+    assert [event.data['percent'] for event in events] == [10, 20]
+
+
+def test_nothing_is_published_after_a_terminal_event():
+    bus = JobEventBus()
+    bus.register('job', 'user')
+    subscriber = bus.subscribe('job')
+    bus.publish('job', 'completed', download_url='/x')
+
+    assert bus.publish('job', 'progress', percent=100) is None
+    assert [event.type for event in drain(subscriber)] == ['completed']
+    # A finished job replays its history without registering the subscriber
+    late = bus.subscribe('job')
+    assert [event.type for event in drain(late)] == ['completed']
+    assert bus.stats()['subscribers'] == 1
+
+
+def test_owner_and_unknown_jobs():
+    bus = JobEventBus(max_jobs=1)
+    bus.register('old', 'alice')
+    assert bus.owner('old') == 'alice'
+
+    bus.register('new', 'bob')
+    assert bus.owner('old') is None
+    assert bus.publish('old', 'processing') is None
+    with pytest.raises(KeyError):
+        bus.subscribe('old')
+
+
+def test_unsubscribed_queue_gets_no_more_events():
+    bus = JobEventBus()
+    bus.register('job', 'user')
+    subscriber = bus.subscribe('job')
+    bus.unsubscribe('job', subscriber)
+    bus.publish('job', 'processing')
+
+    assert drain(subscriber) == []
+    assert [event.type for event in bus.history('job')] == ['processing']
@@ -0,0 +1,109 @@
+import os
+import struct
+import numpy as np
+import pytest
+from src.services.music_generator import MusicGenerator
+from src.utils.timing import StageTimer
+
+
+@pytest.fixture
+def generator(tmp_path):
+    return MusicGenerator(str(tmp_path))
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_midi_is_only_written_when_enabled(tmp_path):
+    plain = MusicGenerator(str(tmp_path / 'plain'))
+    with_midi = MusicGenerator(str(tmp_path / 'midi'), write_midi=True)
+
+    no_midi, plain_wav = plain.generate_music(0.7, 0.6, duration=5, seed=3)
+    midi_path, midi_wav = with_midi.generate_music(0.7, 0.6, duration=5, seed=3)
+
+    assert no_midi is None
+    assert os.path.getsize(midi_path) > 0
+    # The audio is rendered from the in-memory score either way
+    assert read(plain_wav) == read(midi_wav)
+
+
+def test_stream_matches_generated_file(generator):
+    _, wav_path = generator.generate_music(0.3, 0.8, duration=8, style='rhythmic', seed=11)
+    streamed = b''.join(generator.stream_music(0.3, 0.8, duration=8, style='rhythmic', seed=11, block_size=4096))
+
+    assert streamed == read(wav_path)
+
+
+def test_stream_starts_with_complete_header(generator):
+    chunks = generator.stream_music(0.5, 0.5, duration=5, seed=1, block_size=2048)
+    header = next(chunks)
+
+    assert len(header) == 44 and header[:4] == b'RIFF'
+    assert len(next(chunks)) == 2048 * 2
+
+
+def test_batch_renders_each_variant_like_a_single_generation(generator):
+    variants = [
+        {'valence': 0.8, 'arousal': 0.7, 'duration': 5, 'style': 'melodic', 'seed': 1},
+        {'valence': 0.8, 'arousal': 0.7, 'duration': 5, 'style': 'melodic', 'seed': 2},
+        {'valence': 0.2, 'arousal': 0.3, 'duration': 5, 'style': 'ambient', 'seed': 1},
+    ]
+    fractions = []
+
+    paths = generator.generate_batch(variants, max_workers=3, progress=fractions.append)
+
+    assert len({wav_path for _, wav_path in paths}) == 3
+    for variant, (_, wav_path) in zip(variants, paths):
+        _, single = generator.generate_music(**variant)
+        assert read(wav_path) == read(single)
+    assert read(paths[0][1]) != read(paths[1][1])
+    assert sorted(fractions) == [1 / 3, 2 / 3, 1.0]
+
+
+@pytest.mark.parametrize('style', ['melodic', 'ambient', 'rhythmic'])
+def test_seeded_generation_is_deterministic(generator, style):
+    _, first = generator.generate_music(0.6, 0.4, duration=6, style=style, seed=42)
+    _, again = generator.generate_music(0.6, 0.4, duration=6, style=style, seed=42)
+
+    assert first != again
+    assert read(first) == read(again)
+
+
+def test_different_seeds_compose_different_pieces(generator):
+    _, first = generator.generate_music(0.6, 0.4, duration=6, style='melodic', seed=1)
+    _, second = generator.generate_music(0.6, 0.4, duration=6, style='melodic', seed=2)
+
+    assert read(first) != read(second)
+
+
+def test_melody_stays_in_key(generator):
+    params = generator._mood_to_music_params(0.7, 0.5, None, 'melodic')
+    melody = generator._arrange(params, 20, np.random.default_rng(5))['melody']
+
+    pitch_classes = set(((melody['note'] - params['base_note']) % 12).tolist())
+    assert pitch_classes <= set(params['scale'])
+    assert np.all(np.diff(melody['tick']) > 0)
+    assert melody['note'].min() >= 0 and melody['note'].max() <= 127
+
+
+def test_layers_are_rendered_within_the_requested_duration(generator):
+    timer = StageTimer()
+    _, wav_path = generator.generate_music(0.8, 0.8, duration=10, style='rhythmic', seed=3, timer=timer)
+    params = generator._mood_to_music_params(0.8, 0.8, None, 'rhythmic')
+
+    samples = (os.path.getsize(wav_path) - 44) // 2
+    assert samples <= 10 * generator.synthesizer.sample_rate
+    for layer in params['layers']:
+        assert timer.as_dict()[f'layer:{layer}'] > 0
+
+
+def test_preview_is_a_short_low_rate_excerpt(generator):
+    preview = generator.preview_music(0.6, 0.6, duration=30, seed=9, excerpt=4.0)
+
+    sample_rate, = struct.unpack('<I', preview[24:28])
+    assert sample_rate == generator.preview_synthesizer.sample_rate < generator.synthesizer.sample_rate
+    assert len(preview) == 44 + 4 * sample_rate * 2
+    assert generator.preview_music(0.6, 0.6, duration=30, seed=9, excerpt=4.0) == preview
+    assert generator.preview_music(0.6, 0.6, duration=2, seed=9, excerpt=4.0)[40:44] == struct.pack('<I', 2 * sample_rate * 2)
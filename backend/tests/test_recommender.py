@@ -0,0 +1,88 @@
+import threading
+import time
+from src.services.recommender import EnhancedRecommender
+
+
+def tracks(prefix, count):
+    return [{'id': f'{prefix}-{i}', 'title': prefix, 'user': {'name': prefix}, 'play_count': 0}
+            for i in range(count)]
+
+
+class FakeAudius:
+    """Answers every call after delay seconds; a source listed in slow takes slow_delay"""
+
+    host = 'https://audius.test'
+
+    def __init__(self, delay=0.2, per_call=2, trending=5, slow=(), slow_delay=5.0, failing=()):
+        self.delay = delay
+        self.per_call = per_call
+        self.trending = trending
+        self.slow = set(slow)
+        self.slow_delay = slow_delay
+        self.failing = set(failing)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _answer(self, source, count):
+        with self._lock:
+            self.calls.append(source)
+        time.sleep(self.slow_delay if source in self.slow else self.delay)
+        if source in self.failing:
+            raise ConnectionError(f'{source} is down')
+        return tracks(source, count)
+
+    def search_tracks(self, query=None, genre=None, mood=None, limit=20):
+        return self._answer('search', self.per_call)
+
+    def get_trending_tracks(self, genre=None, limit=20):
+        return self._answer('trending', self.trending)
+
+    def search_by_artist(self, artist_name, limit=20):
+        return self._answer(artist_name, self.per_call)
+
+
+def test_sources_are_fetched_concurrently():
+    audius = FakeAudius(delay=0.2)
+    recommender = EnhancedRecommender(audius, latency_budget=5)
+
+    started = time.monotonic()
+    results = recommender.get_recommendations_by_mood(0.8, 0.8, limit=20)
+    elapsed = time.monotonic() - started
+
+    # Search, trending and five artists: about 1.4s one after another
+    assert len(audius.calls) == 7
+    assert elapsed < 0.6
+    assert len(results) == 2 + 5 * 2 + 5
+
+
+def test_trending_is_dropped_when_the_first_wave_fills_the_limit():
+    audius = FakeAudius(delay=0.05, per_call=4)
+    recommender = EnhancedRecommender(audius, latency_budget=5)
+
+    results = recommender.get_recommendations_by_mood(0.8, 0.8, limit=10)
+
+    assert 'trending' in audius.calls
+    assert len(results) == 10
+    assert not any(track['id'].startswith('trending') for track in results)
+
+
+def test_slow_source_is_left_out_at_the_budget():
+    audius = FakeAudius(delay=0.05, slow=['Ed Sheeran'], slow_delay=3.0)
+    recommender = EnhancedRecommender(audius, latency_budget=0.5)
+
+    started = time.monotonic()
+    results = recommender.get_recommendations_by_mood(0.8, 0.8, limit=20)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 1.5
+    assert not any(track['artist'] == 'Ed Sheeran' for track in results)
+    assert recommender.stats()['dropped'] == 1
+
+
+def test_failed_source_contributes_nothing():
+    audius = FakeAudius(delay=0.01, failing=['search'])
+    recommender = EnhancedRecommender(audius, latency_budget=5)
+
+    results = recommender.get_recommendations_by_mood(0.2, 0.2, limit=20)
+
+    assert results and not any(track['id'].startswith('search') for track in results)
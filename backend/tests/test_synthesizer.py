@@ -0,0 +1,98 @@
+import struct
+import numpy as np
+from src.services.synthesizer import NOTE_EVENT_DTYPE, Synthesizer
+
+
+def make_events(notes):
+    """(start, end, midi note, velocity) tuples in samples -> note-event table"""
+    events = np.zeros(len(notes), dtype=NOTE_EVENT_DTYPE)
+    for row, (start, end, note, velocity) in zip(events, notes):
+        row['start'], row['end'] = start, end
+        row['frequency'] = 440.0 * 2 ** ((note - 69) / 12)
+        row['velocity'] = velocity
+    return events
+
+
+def render(synth, table, block_size=None):
+    return b''.join(synth.iter_wav(table, block_size))
+
+
+def test_wav_header_matches_rendered_length():
+    synth = Synthesizer(sample_rate=8000, block_size=1024)
+    table = synth.allocate_voices(make_events([(0, 4000, 60, 100), (2000, 6000, 64, 90)]))
+    wav = render(synth, table)
+
+    riff_size, = struct.unpack('<I', wav[4:8])
+    data_size, = struct.unpack('<I', wav[40:44])
+    assert wav[:4] == b'RIFF' and wav[8:12] == b'WAVE'
+    assert data_size == table.num_samples * 2 == len(wav) - 44
+    assert riff_size == len(wav) - 8
+
+
+def test_render_is_deterministic_and_independent_of_block_size():
+    synth = Synthesizer(sample_rate=8000, block_size=4096)
+    table = synth.allocate_voices(make_events([(0, 3000, 57, 110), (500, 5000, 69, 80), (4000, 9000, 72, 127)]))
+
+    first = render(synth, table)
+    assert render(synth, table) == first
+    assert render(synth, table, block_size=333) == first
+
+
+def test_mix_stays_below_full_scale():
+    synth = Synthesizer(sample_rate=8000, block_size=2048)
+    chord = [(0, 8000, note, 127) for note in (60, 64, 67, 72)]
+    pcm = np.frombuffer(render(synth, synth.allocate_voices(make_events(chord)))[44:], dtype=np.int16)
+
+    peak = np.abs(pcm.astype(np.int32)).max()
+    assert 0 < peak <= int(0.8 * 32767) + 1
+
+
+def test_write_wav_matches_stream(tmp_path):
+    synth = Synthesizer(sample_rate=8000, block_size=1024)
+    table = synth.allocate_voices(make_events([(0, 2500, 62, 100), (1200, 7000, 65, 70)]))
+    fractions = []
+    path = tmp_path / 'out.wav'
+
+    synth.write_wav(str(path), table, progress=fractions.append)
+
+    assert path.read_bytes() == render(synth, table)
+    assert fractions[-1] == 1.0
+
+
+def test_notes_take_the_lowest_free_voice():
+    synth = Synthesizer(sample_rate=8000, max_polyphony=4)
+    release = synth.envelope_samples()[3]
+    table = synth.allocate_voices(make_events([
+        (0, 1000, 60, 100),
+        (100, 1000, 64, 100),
+        (1000 + release, 2000, 67, 100),
+    ]))
+
+    by_start = dict(zip(table.starts.tolist(), table.voices.tolist()))
+    assert by_start == {0: 0, 100: 1, 1000 + release: 0}
+
+
+def test_steals_the_voice_that_frees_up_soonest():
+    synth = Synthesizer(sample_rate=8000, max_polyphony=2)
+    table = synth.allocate_voices(make_events([
+        (0, 1000, 60, 100),
+        (100, 4000, 64, 100),
+        (500, 3000, 67, 100),
+    ]))
+
+    assert table.voices.max() == 1
+    stolen = table.starts.tolist().index(0)
+    assert table.stops[stolen] == 500
+    assert table.gate_lengths[stolen] == 500
+
+
+def test_scratch_buffers_are_reused_across_renders():
+    synth = Synthesizer(sample_rate=8000, block_size=512)
+    table = synth.allocate_voices(make_events([(0, 6000, 60, 100), (3000, 9000, 67, 100)]))
+
+    render(synth, table)
+    render(synth, table)
+    stats = synth.allocation_stats()
+
+    assert stats['buffer_allocations'] == 1
+    assert stats['blocks_rendered'] >= 2 * (table.num_samples // 512)
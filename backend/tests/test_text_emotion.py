@@ -0,0 +1,74 @@
+import pytest
+from src.services.text_emotion import NEGATED_WEIGHT, TextEmotionAnalyzer, load_lexicon
+
+LEXICON = {
+    'happy': ('happy', 1.0),
+    'mad': ('angry', 1.0),
+    'sad': ('sad', 1.0),
+    'not bad': ('calm', 0.6),
+    'over the moon': ('happy', 2.0),
+    'worried': ('anxious', 1.0),
+}
+
+
+@pytest.fixture
+def analyzer():
+    return TextEmotionAnalyzer(LEXICON)
+
+
+def test_terms_match_whole_words_only(analyzer):
+    assert analyzer.scores('I made dinner and felt maddening sadness') == ({}, 0)
+    assert analyzer.scores('So MAD!') == ({'angry': 1.3}, 1)
+
+
+def test_negation_takes_weight_away(analyzer):
+    scores, matches = analyzer.scores("I'm not happy")
+
+    assert scores == {'happy': NEGATED_WEIGHT} and matches == 1
+    assert analyzer.analyze("I'm not happy")['emotion'] == 'neutral'
+    assert analyzer.analyze("I don't feel happy")['emotion'] == 'neutral'
+
+
+def test_negation_ends_with_its_window_and_clause(analyzer):
+    assert analyzer.scores('not at all, happy')[0] == {'happy': 1.0}
+    assert analyzer.scores('not that I was ever happy')[0] == {'happy': 1.0}
+    assert analyzer.scores('never really happy')[0] == {'happy': 1.5 * NEGATED_WEIGHT}
+
+
+def test_longest_phrase_wins(analyzer):
+    assert analyzer.scores('over the moon')[0] == {'happy': 2.0}
+    # A lexicon phrase beats the negation it starts with
+    assert analyzer.scores('not bad at all')[0] == {'calm': 0.6}
+
+
+def test_modifiers_scale_the_next_term(analyzer):
+    assert analyzer.scores('extremely worried')[0] == {'anxious': 2.0}
+    assert analyzer.scores('slightly sad')[0] == {'sad': 0.5}
+    assert analyzer.scores('very, sad')[0] == {'sad': 1.0}
+
+
+def test_analyze_picks_the_strongest_emotion(analyzer):
+    result = analyzer.analyze('a bit sad but over the moon')
+
+    assert result['emotion'] == 'happy'
+    assert result['confidence'] == pytest.approx(0.7)
+    assert analyzer.analyze('')['emotion'] == 'neutral'
+
+
+def test_analyze_many_scores_repeats_once(analyzer):
+    results = analyzer.analyze_many(['so happy', 'sad', 'so happy'])
+
+    assert [r['emotion'] for r in results] == ['happy', 'sad', 'happy']
+    assert results[0] == results[2] and results[0] is not results[2]
+
+
+def test_bundled_lexicon():
+    lexicon = load_lexicon()
+    analyzer = TextEmotionAnalyzer(lexicon)
+
+    assert len(lexicon) > 5000
+    assert {emotion for emotion, _ in lexicon.values()} == {'happy', 'sad', 'angry', 'calm', 'anxious'}
+    assert len({weight for _, weight in lexicon.values()}) > 3
+    assert analyzer.analyze('I am absolutely furious about this')['emotion'] == 'angry'
+    assert analyzer.analyze('feeling peaceful and relaxed today')['emotion'] == 'calm'
+    assert analyzer.analyze('I made it home')['emotion'] == 'neutral'